@@ -0,0 +1,455 @@
+"""
+Parametrized plot aggregations behind /analytics/aggregate
+
+A request names group-by dimensions, metrics and filters. Its shape (which
+dimensions, which op on which field, which filter operators) is compiled to a
+pipeline template once and cached; filter values are bound into the template
+per request. Results are cached as well and dropped as soon as the plots
+generation moves, which every write through PlotRollups.upsert_plots bumps.
+
+The fixed /analytics/* charts are presets over the same engine.
+
+The `percentile` op compiles to $percentile, which needs MongoDB 7.0 or newer;
+older servers reject it and the request fails with a 400 naming the version.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+from pydantic import BaseModel, validator
+from pymongo.errors import OperationFailure
+
+from app.plot_schema import NUMERIC_COLUMNS, DIMENSION_FIELDS
+
+# Per-plot values computed from stored fields
+DERIVED_FIELDS = {"Biomass_total_kg": {"$add": ["$Biomass_above_kg", "$Biomass_below_kg"]}}
+
+METRIC_FIELDS = set(NUMERIC_COLUMNS) | set(DERIVED_FIELDS)
+METRIC_OPS = {"count", "avg", "sum", "min", "max", "percentile"}
+GROUP_DIMENSIONS = DIMENSION_FIELDS + ["year_month"]
+FILTER_FIELDS = set(DIMENSION_FIELDS) | set(NUMERIC_COLUMNS) | {"Timestamp"}
+FILTER_OPS = {"eq", "ne", "in", "nin", "gt", "gte", "lt", "lte"}
+# First server release with the $percentile accumulator
+PERCENTILE_MIN_SERVER = "7.0"
+
+
+# =======================
+#   REQUEST MODELS
+# =======================
+class Metric(BaseModel):
+    op: str = "avg"
+    field: Optional[str] = None
+    p: Optional[float] = None  # percentile rank in [0, 1]
+    name: Optional[str] = None
+
+    @validator("op")
+    def op_must_be_known(cls, v):
+        if v not in METRIC_OPS:
+            raise ValueError(f"op must be one of {sorted(METRIC_OPS)}")
+        return v
+
+    @validator("field", always=True)
+    def field_must_be_numeric(cls, v, values):
+        if values.get("op") == "count":
+            return None
+        if v not in METRIC_FIELDS:
+            raise ValueError(f"unknown numeric field: {v}")
+        return v
+
+    @validator("p", always=True)
+    def p_needed_for_percentile(cls, v, values):
+        if values.get("op") != "percentile":
+            return None
+        if v is None or not 0 <= v <= 1:
+            raise ValueError("percentile needs p between 0 and 1")
+        return v
+
+    @property
+    def alias(self) -> str:
+        if self.name:
+            return self.name
+        if self.op == "count":
+            return "count"
+        if self.op == "percentile":
+            return f"p{self.p * 100:g}_{self.field}"
+        return f"{self.op}_{self.field}"
+
+
+class Filter(BaseModel):
+    field: str
+    op: str = "eq"
+    value: Any
+
+    @validator("field")
+    def field_must_be_filterable(cls, v):
+        if v not in FILTER_FIELDS:
+            raise ValueError(f"cannot filter on {v}")
+        return v
+
+    @validator("op")
+    def op_must_be_known(cls, v):
+        if v not in FILTER_OPS:
+            raise ValueError(f"op must be one of {sorted(FILTER_OPS)}")
+        return v
+
+    @validator("value")
+    def coerce_value(cls, v, values):
+        if values.get("op") in ("in", "nin") and not isinstance(v, list):
+            raise ValueError("in/nin filters take a list")
+        if values.get("field") == "Timestamp":
+            parse = lambda s: datetime.fromisoformat(s.replace("Z", "+00:00")) if isinstance(s, str) else s
+            return [parse(s) for s in v] if isinstance(v, list) else parse(v)
+        return v
+
+
+class AggregateRequest(BaseModel):
+    group_by: List[str] = []
+    group_names: Dict[str, str] = {}  # dimension → key name in _id (multi-dimension groups)
+    metrics: List[Metric] = [Metric(op="count")]
+    filters: List[Filter] = []
+    sort: List[str] = []  # metric names or _id keys, "-" prefix for descending
+    limit: Optional[int] = None
+
+    @validator("group_by", each_item=True)
+    def dimension_must_be_known(cls, v):
+        if v not in GROUP_DIMENSIONS:
+            raise ValueError(f"group_by must be among {GROUP_DIMENSIONS}")
+        return v
+
+    @validator("metrics")
+    def metric_names_unique(cls, v):
+        aliases = [m.alias for m in v]
+        if not v or len(set(aliases)) != len(aliases) or "_id" in aliases:
+            raise ValueError("metrics need distinct names")
+        return v
+
+    @validator("filters")
+    def filters_unique(cls, v):
+        # One $match condition per (field, op): a repeat would silently replace the first
+        pairs = [(f.field, f.op) for f in v]
+        duplicates = sorted({f"{field} {op}" for field, op in pairs if pairs.count((field, op)) > 1})
+        if duplicates:
+            raise ValueError(f"duplicate filters: {', '.join(duplicates)}")
+        return v
+
+    @validator("limit")
+    def limit_must_be_positive(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("limit must be greater than 0")
+        return v
+
+    def shape(self) -> Tuple:
+        """Everything that decides the pipeline's structure (not the filter values)"""
+        return (
+            tuple(self.group_by),
+            tuple(sorted(self.group_names.items())),
+            tuple((m.op, m.field, m.p, m.alias) for m in self.metrics),
+            tuple((f.field, f.op) for f in self.filters),
+            tuple(self.sort),
+            self.limit,
+        )
+
+    def values(self) -> List[Any]:
+        return [f.value for f in self.filters]
+
+
+# =======================
+#   COMPILER
+# =======================
+class _Param:
+    """Placeholder for the i-th filter value in a compiled pipeline"""
+
+    __slots__ = ("index",)
+
+    def __init__(self, index: int):
+        self.index = index
+
+
+def _field_expr(field: str):
+    return DERIVED_FIELDS.get(field, f"${field}")
+
+
+def _group_key(group_by: Tuple[str, ...], names: Dict[str, str]):
+    """_id expression plus its sortable paths"""
+    parts = {}
+    for dimension in group_by:
+        if dimension == "year_month":
+            parts["year"] = {"$year": "$Timestamp"}
+            parts["month"] = {"$month": "$Timestamp"}
+        else:
+            parts[names.get(dimension, dimension)] = f"${dimension}"
+
+    if not parts:
+        return None, []
+    if len(parts) == 1 and group_by != ("year_month",):
+        return next(iter(parts.values())), ["_id"]
+    return parts, [f"_id.{key}" for key in parts]
+
+
+def _accumulator(op: str, field: Optional[str], p: Optional[float]):
+    if op == "count":
+        return {"$sum": 1}
+    if op == "percentile":
+        return {"$percentile": {"input": _field_expr(field), "p": [p], "method": "approximate"}}
+    return {f"${op}": _field_expr(field)}
+
+
+def _match_stage(filters: Tuple[Tuple[str, str], ...]) -> List[Dict[str, Any]]:
+    match: Dict[str, Dict[str, Any]] = {}
+    for i, (field, op) in enumerate(filters):
+        match.setdefault(field, {})[f"${op}"] = _Param(i)
+    return [{"$match": match}] if match else []
+
+
+@lru_cache(maxsize=int(os.getenv("AGG_PIPELINE_CACHE_SIZE", 256)))
+def compile_pipeline(shape: Tuple) -> List[Dict[str, Any]]:
+    """Pipeline template for a request shape; filter values are _Param placeholders"""
+    group_by, names, metrics, filters, sort, limit = shape
+    pipeline = _match_stage(filters)
+
+    group_id, id_paths = _group_key(group_by, dict(names))
+    group = {"_id": group_id}
+    for op, field, p, alias in metrics:
+        group[alias] = _accumulator(op, field, p)
+    pipeline.append({"$group": group})
+
+    # $percentile yields a one-element array
+    percentiles = {alias: {"$arrayElemAt": [f"${alias}", 0]} for op, _, _, alias in metrics if op == "percentile"}
+    if percentiles:
+        pipeline.append({"$set": percentiles})
+
+    sortable = set(id_paths) | {alias for *_, alias in metrics}
+    order = {}
+    for key in sort:
+        path = key.lstrip("-")
+        if f"_id.{path}" in sortable:
+            path = f"_id.{path}"
+        if path not in sortable:
+            raise ValueError(f"cannot sort on {path}")
+        order[path] = -1 if key.startswith("-") else 1
+    for path in id_paths:
+        order.setdefault(path, 1)  # ties (and the default) follow the group key
+    if order:
+        pipeline.append({"$sort": order})
+
+    if limit:
+        pipeline.append({"$limit": limit})
+    return pipeline
+
+
+def bind(node, values: List[Any]):
+    """Copy of a compiled template with the filter values filled in"""
+    if isinstance(node, _Param):
+        return values[node.index]
+    if isinstance(node, dict):
+        return {k: bind(v, values) for k, v in node.items()}
+    if isinstance(node, list):
+        return [bind(v, values) for v in node]
+    return node
+
+
+# =======================
+#   PRESETS
+# =======================
+PRESETS = {
+    "plots_overview": AggregateRequest(
+        group_by=["Project_Type"], metrics=[Metric(op="count")], sort=["-count"]
+    ),
+    "ndvi_by_project": AggregateRequest(
+        group_by=["Project_Type"], metrics=[Metric(field="NDVI", name="avgNDVI")], sort=["-avgNDVI"]
+    ),
+    "ndvi_by_project_source": AggregateRequest(
+        group_by=["Project_Type", "Data_Source"],
+        group_names={"Project_Type": "type", "Data_Source": "source"},
+        metrics=[Metric(field="NDVI", name="avgNDVI")],
+    ),
+    "biomass_trend": AggregateRequest(
+        group_by=["Monitoring_Year"],
+        metrics=[
+            Metric(field="Biomass_above_kg", name="avgAbove"),
+            Metric(field="Biomass_below_kg", name="avgBelow"),
+            Metric(op="sum", field="Biomass_total_kg", name="total"),
+        ],
+    ),
+    # Both flux series come out of one pass and are split afterwards
+    "fluxes": AggregateRequest(
+        group_by=["Monitoring_Year"],
+        metrics=[
+            Metric(field="CO2_Flux_mg_m2_day", name="avgCO2"),
+            Metric(field="CH4_Flux_mg_m2_day", name="avgCH4"),
+        ],
+    ),
+    "ndvi_monthly": AggregateRequest(
+        group_by=["year_month"], metrics=[Metric(field="NDVI", name="avgNDVI")]
+    ),
+}
+
+
+# One $facet pass computes every dashboard series; sorting happens afterwards
+DASHBOARD_FACETS = {
+    "by_type": AggregateRequest(
+        group_by=["Project_Type"],
+        metrics=[Metric(op="count"), Metric(field="NDVI", name="avgNDVI")],
+    ),
+    "by_year": AggregateRequest(
+        group_by=["Monitoring_Year"],
+        metrics=PRESETS["biomass_trend"].metrics + PRESETS["fluxes"].metrics,
+    ),
+    "by_month": PRESETS["ndvi_monthly"],
+}
+
+
+@lru_cache(maxsize=64)
+def compile_dashboard(filters: Tuple[Tuple[str, str], ...]) -> List[Dict[str, Any]]:
+    """Shared $match, then one $facet sub-pipeline per series"""
+    facets = {name: compile_pipeline(request.shape()) for name, request in DASHBOARD_FACETS.items()}
+    return _match_stage(filters) + [{"$facet": facets}]
+
+
+def dashboard_filters(
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    project_type: Optional[str] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> List[Filter]:
+    """Dashboard query parameters as filters; bbox is (min_lon, min_lat, max_lon, max_lat)"""
+    filters = []
+    if year_from is not None:
+        filters.append(Filter(field="Monitoring_Year", op="gte", value=year_from))
+    if year_to is not None:
+        filters.append(Filter(field="Monitoring_Year", op="lte", value=year_to))
+    if project_type:
+        filters.append(Filter(field="Project_Type", value=project_type))
+    if bbox is not None:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        filters.append(Filter(field="GPS_Long", op="gte", value=min_lon))
+        filters.append(Filter(field="GPS_Long", op="lte", value=max_lon))
+        filters.append(Filter(field="GPS_Lat", op="gte", value=min_lat))
+        filters.append(Filter(field="GPS_Lat", op="lte", value=max_lat))
+    return filters
+
+
+def _nulls_last_desc(rows: List[Dict[str, Any]], field: str) -> List[Dict[str, Any]]:
+    return sorted(rows, key=lambda r: (r[field] is not None, r[field] or 0), reverse=True)
+
+
+# =======================
+#   ENGINE
+# =======================
+class AggregationEngine:
+    """Runs AggregateRequests against db.aggregate_plots with a generation-checked result cache"""
+
+    def __init__(self, db, generation: Callable[[], int], cache_size: int = None):
+        self.db = db
+        self.generation = generation
+        if cache_size is None:
+            cache_size = int(os.getenv("AGG_RESULT_CACHE_SIZE", 512))
+        self.cache_size = cache_size
+        self.results: "OrderedDict[Tuple, Tuple[int, List[Dict[str, Any]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def current_generation(self) -> int:
+        return await asyncio.to_thread(self.generation)
+
+    async def _cached(self, key: Tuple, pipeline: Callable[[], List[Dict[str, Any]]], generation: int = None):
+        if generation is None:
+            generation = await self.current_generation()
+
+        cached = self.results.get(key)
+        if cached is not None and cached[0] == generation:
+            self.results.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        rows = await self.db.aggregate_plots(pipeline())
+        self.results[key] = (generation, rows)
+        self.results.move_to_end(key)
+        while len(self.results) > self.cache_size:
+            self.results.popitem(last=False)
+        return rows
+
+    async def run(self, request: AggregateRequest) -> List[Dict[str, Any]]:
+        shape, values = request.shape(), request.values()
+        key = (shape, json.dumps(values, default=str))
+        try:
+            return await self._cached(key, lambda: bind(compile_pipeline(shape), values))
+        except OperationFailure as e:
+            if "$percentile" in str(e) and any(m.op == "percentile" for m in request.metrics):
+                raise ValueError(f"percentile metrics need MongoDB {PERCENTILE_MIN_SERVER} or newer") from e
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        compiled = compile_pipeline.cache_info()
+        return {
+            "results_cached": len(self.results),
+            "result_hits": self.hits,
+            "result_misses": self.misses,
+            "pipelines_compiled": compiled.currsize,
+            "pipeline_hits": compiled.hits,
+        }
+
+    # ----------------- PRESETS -----------------
+    async def plots_overview(self) -> Dict[str, Any]:
+        by_type = await self.run(PRESETS["plots_overview"])
+        return {"total_plots": sum(row["count"] for row in by_type), "by_type": by_type}
+
+    async def ndvi_by_project(self) -> List[Dict[str, Any]]:
+        return await self.run(PRESETS["ndvi_by_project"])
+
+    async def ndvi_by_project_source(self) -> List[Dict[str, Any]]:
+        return await self.run(PRESETS["ndvi_by_project_source"])
+
+    async def biomass_trend(self) -> List[Dict[str, Any]]:
+        return await self.run(PRESETS["biomass_trend"])
+
+    async def fluxes(self) -> Dict[str, List[Dict[str, Any]]]:
+        rows = await self.run(PRESETS["fluxes"])
+        return {
+            "co2": [{"_id": row["_id"], "avgCO2": row["avgCO2"]} for row in rows],
+            "ch4": [{"_id": row["_id"], "avgCH4": row["avgCH4"]} for row in rows],
+        }
+
+    async def ndvi_monthly(self) -> List[Dict[str, Any]]:
+        return await self.run(PRESETS["ndvi_monthly"])
+
+    # ----------------- DASHBOARD -----------------
+    @staticmethod
+    def dashboard_etag(filters: List[Filter], generation: int) -> str:
+        """Changes only when the filters change or plots are written"""
+        spec = json.dumps([[f.field, f.op, f.value] for f in filters], default=str)
+        return f'W/"{generation}-{hashlib.sha1(spec.encode()).hexdigest()[:16]}"'
+
+    async def dashboard(self, filters: List[Filter], generation: int = None) -> Dict[str, Any]:
+        shape = tuple((f.field, f.op) for f in filters)
+        values = [f.value for f in filters]
+        key = ("dashboard", shape, json.dumps(values, default=str))
+        rows = await self._cached(key, lambda: bind(compile_dashboard(shape), values), generation)
+
+        facets = rows[0] if rows else {name: [] for name in DASHBOARD_FACETS}
+        by_type, by_year = facets["by_type"], facets["by_year"]
+        return {
+            "total_plots": sum(row["count"] for row in by_type),
+            "by_type": sorted(
+                ({"_id": row["_id"], "count": row["count"]} for row in by_type),
+                key=lambda r: r["count"],
+                reverse=True,
+            ),
+            "ndvi": _nulls_last_desc([{"_id": row["_id"], "avgNDVI": row["avgNDVI"]} for row in by_type], "avgNDVI"),
+            "biomass": [
+                {"_id": row["_id"], "avgAbove": row["avgAbove"], "avgBelow": row["avgBelow"], "total": row["total"]}
+                for row in by_year
+            ],
+            "fluxes": {
+                "co2": [{"_id": row["_id"], "avgCO2": row["avgCO2"]} for row in by_year],
+                "ch4": [{"_id": row["_id"], "avgCH4": row["avgCH4"]} for row in by_year],
+            },
+            "trend": facets["by_month"],
+        }
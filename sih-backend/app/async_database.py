@@ -0,0 +1,309 @@
+"""
+BlueCarbon Database Layer - async MongoDB connection (Motor)
+"""
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.mongo_options import mongo_client_options
+from app.pagination import keyset_after, keyset_sort
+from app.registry_stats import (
+    STATS_ID,
+    empty_stats,
+    project_delta,
+    balance_delta,
+    transaction_delta,
+    stats_update,
+)
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+class AsyncBlueCarbonDatabase:
+    """Async MongoDB connection for BlueCarbon API, same method surface as BlueCarbonDatabase"""
+
+    def __init__(self):
+        # Motor connects lazily, so nothing here touches the network
+        self.client = AsyncIOMotorClient(os.getenv("MONGO_URI"), **mongo_client_options())
+        self.db = self.client["bluecarbon"]
+
+        # Collections
+        self.projects = self.db["projects"]
+        self.transactions = self.db["transactions"]
+        self.users = self.db["users"]
+        self.plots = self.db["plots"]
+        self.registry_stats = self.db["registry_stats"]
+
+        # Blocking handle on the same pool for background workers that run in threads
+        self.sync_db = self.client.delegate["bluecarbon"]
+
+    async def connect(self):
+        """Ping the server and report collection sizes"""
+        try:
+            await self.client.admin.command("ping")
+            logger.info(f"✅ Connected to MongoDB '{self.db.name}' database (async)")
+            logger.info(f"   📊 Projects: {await self.projects.count_documents({})}")
+            logger.info(f"   💸 Transactions: {await self.transactions.count_documents({})}")
+            logger.info(f"   👥 Users: {await self.users.count_documents({})}")
+        except Exception as e:
+            logger.error(f"❌ MongoDB connection failed: {e}")
+            raise
+
+    # ----------------- REGISTRY STATS -----------------
+    async def _bump_stats(self, inc: Dict[str, int]):
+        """$inc the registry-wide counters next to the write that moved them"""
+        await self.registry_stats.update_one({"_id": STATS_ID}, stats_update(inc), upsert=True)
+
+    async def get_registry_stats(self) -> Dict[str, Any]:
+        """Project count, credit totals and transaction counts in one read"""
+        doc = await self.registry_stats.find_one({"_id": STATS_ID}, {"_id": 0})
+        return doc or empty_stats()
+
+    # ----------------- PROJECTS -----------------
+    async def count_projects(self) -> int:
+        """Count registered projects"""
+        return await self.projects.count_documents({})
+
+    async def get_project(self, project_id: str, projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        """Get project by ID"""
+        return await self.projects.find_one({"project_id": project_id}, projection)
+
+    async def get_projects(
+        self, limit: int = 100, skip: int = 0, projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get list of projects with pagination"""
+        pipeline = [
+            {"$sort": {"created_at": -1}},
+            {"$skip": skip},
+            {"$limit": limit},
+        ]
+        if projection:
+            pipeline.append({"$project": projection})
+        return await self.projects.aggregate(pipeline).to_list(length=None)
+
+    async def get_projects_page(
+        self, limit: int = 10, after: Optional[Tuple] = None, projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """Projects newest first, resuming after a (created_at, _id) cursor"""
+        query = keyset_after("created_at", after)
+        cursor = self.projects.find(query, projection).sort(keyset_sort("created_at"))
+        return await cursor.limit(limit).to_list(length=None)
+
+    async def store_project(self, project_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Store new project"""
+        try:
+            project_data["created_at"] = datetime.now(timezone.utc)
+            project_data["updated_at"] = datetime.now(timezone.utc)
+            if "status" not in project_data:
+                project_data["status"] = "active"
+            if "balances" not in project_data:
+                project_data["balances"] = {
+                    "total_issued": 0,
+                    "total_retired": 0,
+                    "circulating": 0,
+                    "last_updated": project_data["created_at"],
+                }
+
+            result = await self.projects.insert_one(project_data)
+            await self._bump_stats(project_delta(project_data))
+            project_data["_id"] = str(result.inserted_id)
+            logger.info(f"✅ Project stored: {project_data['project_id']}")
+            return project_data
+        except Exception as e:
+            logger.error(
+                f"❌ Failed to store project {project_data.get('project_id', 'unknown')}: {e}"
+            )
+            raise
+
+    async def set_project_status(self, project_id: str, status: str):
+        """Set project status (pending → active/failed for async registrations)"""
+        await self.projects.update_one(
+            {"project_id": project_id},
+            {"$set": {"status": status, "updated_at": datetime.now(timezone.utc)}},
+        )
+
+    async def set_project_token_id(self, project_id: str, token_id: int):
+        """Persist the on-chain token id of a project (never changes once registered)"""
+        await self.projects.update_one(
+            {"project_id": project_id}, {"$set": {"token_id": token_id}}
+        )
+
+    async def get_project_token_ids(self) -> Dict[str, Optional[int]]:
+        """project_id → token_id (None where not resolved yet) for every project"""
+        docs = await self.projects.find({}, {"project_id": 1, "token_id": 1}).to_list(length=None)
+        return {doc["project_id"]: doc.get("token_id") for doc in docs}
+
+    async def update_project_balance(
+        self, project_id: str, amount: int, operation: str = "issue"
+    ):
+        """Update project balances"""
+        try:
+            if operation == "issue":
+                inc_updates = {
+                    "balances.total_issued": amount,
+                    "balances.circulating": amount,
+                }
+            elif operation == "retire":
+                inc_updates = {
+                    "balances.total_retired": amount,
+                    "balances.circulating": -amount,
+                }
+            else:
+                raise ValueError(f"Unknown operation: {operation}")
+
+            result = await self.projects.update_one(
+                {"project_id": project_id},
+                {
+                    "$inc": inc_updates,
+                    "$set": {
+                        "updated_at": datetime.now(timezone.utc),
+                        "balances.last_updated": datetime.now(timezone.utc),
+                    },
+                },
+            )
+
+            if result.modified_count > 0:
+                await self._bump_stats(balance_delta(inc_updates))
+                logger.info(
+                    f"💰 Updated balance for {project_id}: "
+                    f"{'+' if operation == 'issue' else '-'}{amount}"
+                )
+            else:
+                logger.warning(f"⚠️  No project found: {project_id}")
+
+        except Exception as e:
+            logger.error(f"❌ Failed to update balance for {project_id}: {e}")
+            raise
+
+    # ----------------- TRANSACTIONS -----------------
+    async def log_transaction(
+        self,
+        tx_type: str,
+        tx_hash: str,
+        details: Dict[str, Any],
+        status: str = "confirmed",
+    ) -> Dict[str, Any]:
+        """Log blockchain transaction"""
+        try:
+            project_id = details.get("project_id")
+            doc = {
+                "type": tx_type,
+                "tx_hash": tx_hash,
+                "project_id": project_id,
+                "details": details,
+                "status": status,
+                "timestamp": datetime.now(timezone.utc),
+                "created_at": datetime.now(timezone.utc),
+            }
+
+            result = await self.transactions.insert_one(doc)
+            await self._bump_stats(transaction_delta(tx_type))
+            doc["_id"] = str(result.inserted_id)
+            logger.info(f"📝 Transaction logged: {tx_hash[:16]}... for project {project_id}")
+            return doc
+        except Exception as e:
+            logger.error(f"❌ Failed to log transaction: {e}")
+            raise
+
+    async def get_transaction(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """Get a logged transaction by hash"""
+        return await self.transactions.find_one({"tx_hash": tx_hash})
+
+    async def get_pending_transactions(self) -> List[Dict[str, Any]]:
+        """Get transactions submitted but not yet settled (including claims a crash left behind)"""
+        return await self.transactions.find({"status": {"$in": ["pending", "settling"]}}).to_list(length=None)
+
+    async def claim_transaction(self, tx_hash: str) -> bool:
+        """Atomically move a pending tx to settling; False if another worker got there first"""
+        result = await self.transactions.update_one(
+            {"tx_hash": tx_hash, "status": "pending"},
+            {"$set": {"status": "settling", "settling_at": datetime.now(timezone.utc)}},
+        )
+        return result.modified_count == 1
+
+    async def release_claim(self, tx_hash: str) -> bool:
+        """Hand a settling tx back to pending after a settlement that moved nothing"""
+        result = await self.transactions.update_one(
+            {"tx_hash": tx_hash, "status": "settling"},
+            {"$set": {"status": "pending"}, "$unset": {"settling_at": ""}},
+        )
+        return result.modified_count == 1
+
+    async def mark_balance_applied(self, tx_hash: str):
+        """Record that a settling tx's balance change is in, so a retry never repeats it"""
+        await self.transactions.update_one({"tx_hash": tx_hash}, {"$set": {"balance_applied": True}})
+
+    async def update_transaction_status(
+        self, tx_hash: str, status: str, block_number: Optional[int] = None
+    ):
+        """Mark a logged transaction confirmed/failed once its receipt is in"""
+        await self.transactions.update_one(
+            {"tx_hash": tx_hash},
+            {
+                "$set": {
+                    "status": status,
+                    "block_number": block_number,
+                    "confirmed_at": datetime.now(timezone.utc),
+                }
+            },
+        )
+        logger.info(f"🧾 Transaction {tx_hash[:16]}... {status}")
+
+    async def get_transaction_history(
+        self, project_id: Optional[str] = None, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Get transaction history for a project or all"""
+        query = {} if not project_id else {"project_id": project_id}
+
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"timestamp": -1}},
+            {"$limit": limit},
+        ]
+
+        return await self.transactions.aggregate(pipeline).to_list(length=None)
+
+    async def get_transactions_page(
+        self,
+        project_id: Optional[str] = None,
+        limit: int = 50,
+        after: Optional[Tuple] = None,
+        projection: Optional[Dict[str, int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Transactions newest first (one project or all), resuming after a (timestamp, _id) cursor"""
+        query = keyset_after("timestamp", after)
+        if project_id:
+            query["project_id"] = project_id
+        cursor = self.transactions.find(query, projection).sort(keyset_sort("timestamp"))
+        return await cursor.limit(limit).to_list(length=None)
+
+    # ----------------- USERS -----------------
+    async def get_user_by_wallet(self, wallet_address: str) -> Optional[Dict[str, Any]]:
+        """Get user by wallet address"""
+        return await self.users.find_one({"wallet_address": wallet_address})
+
+    async def get_user_balance(self, wallet_address: str, project_id: str) -> int:
+        """Get user's balance for specific project"""
+        user = await self.get_user_by_wallet(wallet_address)
+        if not user or "balances" not in user:
+            return 0
+
+        for balance in user.get("balances", []):
+            if balance.get("project_id") == project_id:
+                return balance.get("balance", 0)
+        return 0
+
+    # ----------------- PLOTS -----------------
+    async def count_plots(self) -> int:
+        """Count monitoring plots"""
+        return await self.plots.count_documents({})
+
+    async def aggregate_plots(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run an aggregation pipeline over the plots collection"""
+        return await self.plots.aggregate(pipeline).to_list(length=None)
@@ -1,156 +1,470 @@
-"""
-Blockchain Client for BlueCarbon (Celo Alfajores) with Contract Registry
-"""
-
-import os
-import json
-from web3 import Web3
-from dotenv import load_dotenv
-from typing import Dict, Any
-
-# Load env variables
-load_dotenv()
-
-
-class BlueCarbonClient:
-    def __init__(self):
-        # Connect to Celo Alfajores
-        self.w3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL")))
-        if not self.w3.is_connected():
-            raise ConnectionError("❌ Failed to connect to Celo Alfajores")
-
-        print(f"✅ Connected to Celo Alfajores - Block: {self.w3.eth.block_number}")
-
-        # --- Load Registry Contract ---
-        registry_address = Web3.to_checksum_address(os.getenv("REGISTRY_ADDRESS"))
-        registry_abi_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)), "..", "abi", "ContractRegistry.json"
-        )
-
-        with open(registry_abi_path, "r") as f:
-            registry_abi = json.load(f)
-
-        self.registry = self.w3.eth.contract(address=registry_address, abi=registry_abi)
-        print(f"📒 Registry loaded at {registry_address}")
-
-        # --- Fetch BlueCarbon contract address from registry ---
-        bluecarbon_address = self.registry.functions.getContract("BlueCarbon").call()
-        if bluecarbon_address == "0x0000000000000000000000000000000000000000":
-            raise ValueError("❌ No BlueCarbon contract registered in ContractRegistry")
-
-        print(f"📌 BlueCarbon address from registry: {bluecarbon_address}")
-
-        # --- Load BlueCarbon contract ABI ---
-        bluecarbon_abi_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)), "..", "abi", "BlueCarbon.json"
-        )
-
-        with open(bluecarbon_abi_path, "r") as f:
-            bluecarbon_abi = json.load(f)
-
-        self.contract = self.w3.eth.contract(address=bluecarbon_address, abi=bluecarbon_abi)
-        self.contract_address = bluecarbon_address
-
-        print(f"📄 BlueCarbon contract loaded at {self.contract_address}")
-
-    # --------- READ METHODS --------- #
-    def get_project_token_id(self, project_id: str) -> int:
-        """Fetch token ID for a project by its projectId"""
-        return self.contract.functions.getProjectTokenId(project_id).call()
-
-    def get_balance_of(self, account: str, token_id: int) -> int:
-        """Check ERC1155 balance of a user for a given tokenId"""
-        return self.contract.functions.balanceOf(
-            Web3.to_checksum_address(account), token_id
-        ).call()
-
-    def get_token_metadata(self, token_id: int) -> str:
-        """Fetch IPFS CID metadata of a token"""
-        return self.contract.functions.getTokenMetadataCID(token_id).call()
-
-    def get_token_proof(self, token_id: int) -> str:
-        """Fetch proof CID for issued credits"""
-        return self.contract.functions.getTokenProofCID(token_id).call()
-
-    # --------- WRITE METHODS --------- #
-    def _send_transaction(self, txn, private_key: str) -> Dict[str, Any]:
-        """Helper to sign, send, and wait for confirmation"""
-        acct = self.w3.eth.account.from_key(private_key)
-        signed = self.w3.eth.account.sign_transaction(txn, private_key)
-        tx_hash = self.w3.eth.send_raw_transaction(signed.rawTransaction)
-        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-
-        return {
-            "tx_hash": tx_hash.hex(),
-            "status": receipt.status,
-            "blockNumber": receipt.blockNumber,
-        }
-
-    def register_project(
-        self, project_id: str, metadata_cid: str, private_key: str
-    ) -> Dict[str, Any]:
-        """Register a new project on-chain (admin only)"""
-        acct = self.w3.eth.account.from_key(private_key)
-        nonce = self.w3.eth.get_transaction_count(acct.address)
-
-        txn = self.contract.functions.registerProject(
-            project_id, metadata_cid
-        ).build_transaction(
-            {
-                "from": acct.address,
-                "nonce": nonce,
-                "chainId": int(os.getenv("CHAIN_ID")),
-                "gas": 300000,
-                "gasPrice": self.w3.eth.gas_price,
-            }
-        )
-
-        result = self._send_transaction(txn, private_key)
-        print(f"📝 Project registered: {project_id} → Tx: {result['tx_hash']}")
-        return result
-
-    def issue_credits(
-        self, to_address: str, project_id: str, amount: int, proof_cid: str, private_key: str
-    ) -> Dict[str, Any]:
-        """Issue carbon credits (minter only)"""
-        acct = self.w3.eth.account.from_key(private_key)
-        nonce = self.w3.eth.get_transaction_count(acct.address)
-
-        txn = self.contract.functions.issueCredits(
-            Web3.to_checksum_address(to_address), project_id, amount, proof_cid
-        ).build_transaction(
-            {
-                "from": acct.address,
-                "nonce": nonce,
-                "chainId": int(os.getenv("CHAIN_ID")),
-                "gas": 300000,
-                "gasPrice": self.w3.eth.gas_price,
-            }
-        )
-
-        result = self._send_transaction(txn, private_key)
-        print(f"💰 Issued {amount} credits for project {project_id} → Tx: {result['tx_hash']}")
-        return result
-
-    def retire_credits(self, token_id: int, amount: int, private_key: str) -> Dict[str, Any]:
-        """Retire carbon credits (user)"""
-        acct = self.w3.eth.account.from_key(private_key)
-        nonce = self.w3.eth.get_transaction_count(acct.address)
-
-        txn = self.contract.functions.retireCredits(token_id, amount).build_transaction(
-            {
-                "from": acct.address,
-                "nonce": nonce,
-                "chainId": int(os.getenv("CHAIN_ID")),
-                "gas": 300000,
-                "gasPrice": self.w3.eth.gas_price,
-            }
-        )
-
-        result = self._send_transaction(txn, private_key)
-        print(f"🔥 Retired {amount} credits (Token {token_id}) → Tx: {result['tx_hash']}")
-        return result
-
-
-# Global instance
-bluecarbon_client = BlueCarbonClient()
+"""
+Blockchain Client for BlueCarbon (Celo Alfajores) with Contract Registry
+"""
+
+import logging
+import os
+import json
+import functools
+from web3 import Web3
+from dotenv import load_dotenv
+import threading
+import time
+from typing import Callable, Dict, Any, List, Optional
+from pymongo.errors import DuplicateKeyError
+from web3.exceptions import TransactionNotFound
+from web3.logs import DISCARD
+
+from app.metrics import CONTRACT_SECONDS, RECEIPT_WAIT_SECONDS, rpc_metrics_middleware
+from app.rpc_batch import RpcBatcher
+from app.rpc_pool import PooledHTTPProvider, rpc_urls
+
+logger = logging.getLogger(__name__)
+
+# Load env variables
+load_dotenv()
+
+
+def is_nonce_error(error: Exception) -> bool:
+    """True if the node rejected a tx because its nonce was already used"""
+    message = str(error).lower()
+    return (
+        "nonce too low" in message
+        or "already known" in message
+        # Another tx already sits at this nonce in the node's queue
+        or "replacement transaction underpriced" in message
+    )
+
+
+class NonceManager:
+    """
+    Hands out nonces per signing account so txs from one key can be pipelined.
+
+    Per address it keeps the next fresh nonce, `gaps` (nonces given back while
+    later ones were already out; handed out again first) and `leases` (nonces
+    allocated but not yet sent or given back). The counter only moves back to
+    the chain's pending nonce when no live lease could still be sent above it;
+    a lease older than NONCE_LEASE_SECONDS is treated as abandoned.
+
+    Without a store the state lives in this process. With a store (a pymongo
+    collection) it is a document per address updated by compare-and-swap, so
+    several worker processes can share a key.
+    """
+
+    def __init__(self, w3: Web3, store=None):
+        self.w3 = w3
+        self.store = store
+        self.lease_seconds = float(os.getenv("NONCE_LEASE_SECONDS", 120))
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {}
+
+    def _chain_nonce(self, address: str) -> int:
+        return self.w3.eth.get_transaction_count(address, "pending")
+
+    # ----------------- TRANSITIONS -----------------
+    @staticmethod
+    def _take(state: Dict[str, Any], now: float) -> int:
+        if state["gaps"]:
+            nonce = state["gaps"].pop(0)
+        else:
+            nonce = state["next_nonce"]
+            state["next_nonce"] += 1
+        state["leases"].append([nonce, now])
+        return nonce
+
+    @staticmethod
+    def _drop_lease(state: Dict[str, Any], nonce: int) -> bool:
+        leases = [lease for lease in state["leases"] if lease[0] != nonce]
+        held = len(leases) != len(state["leases"])
+        state["leases"] = leases
+        return held
+
+    def _give_back(self, state: Dict[str, Any], nonce: int):
+        if not self._drop_lease(state, nonce):
+            return  # already spent or given back
+        if nonce == state["next_nonce"] - 1:
+            state["next_nonce"] = nonce
+            # Gaps now at the top of the range shrink the counter too
+            while state["gaps"] and state["gaps"][-1] == state["next_nonce"] - 1:
+                state["next_nonce"] = state["gaps"].pop()
+        else:
+            state["gaps"] = sorted(set(state["gaps"]) | {nonce})
+
+    def _catch_up(self, state: Dict[str, Any], chain_nonce: int, now: float):
+        # Anything below the chain's pending nonce is spent, whoever sent it
+        state["gaps"] = [gap for gap in state["gaps"] if gap >= chain_nonce]
+        state["leases"] = [lease for lease in state["leases"] if lease[0] >= chain_nonce]
+        if chain_nonce >= state["next_nonce"]:
+            state["next_nonce"] = chain_nonce
+            return
+        if any(now - at < self.lease_seconds for _, at in state["leases"]):
+            # A nonce above chain_nonce may still be sent; moving back would hand it out twice
+            return
+        # The counter ran ahead of txs the node dropped or never got: restart from the chain
+        state.update(next_nonce=chain_nonce, gaps=[], leases=[])
+
+    # ----------------- STORAGE -----------------
+    def _update(self, address: str, transition, *args):
+        """Apply transition(state, *args) atomically and return its result"""
+        if self.store is None:
+            if address not in self._state:
+                # Seeded outside the lock: one slow RPC must not stall every address
+                chain_nonce = self._chain_nonce(address)
+                with self._lock:
+                    self._state.setdefault(address, {"next_nonce": chain_nonce, "gaps": [], "leases": []})
+            with self._lock:
+                return transition(self._state[address], *args)
+
+        while True:
+            doc = self.store.find_one({"_id": address})
+            if doc is None:
+                doc = {"_id": address, "next_nonce": self._chain_nonce(address), "gaps": [], "leases": []}
+                try:
+                    self.store.insert_one(dict(doc))
+                except DuplicateKeyError:
+                    continue  # another worker seeded it first
+            current = {"next_nonce": doc["next_nonce"], "gaps": doc.get("gaps", []), "leases": doc.get("leases", [])}
+            state = {
+                "next_nonce": current["next_nonce"],
+                "gaps": list(current["gaps"]),
+                "leases": [list(lease) for lease in current["leases"]],
+            }
+            result = transition(state, *args)
+            # Compare-and-swap: lost races re-read and retry
+            swapped = self.store.update_one({"_id": address, **current}, {"$set": state})
+            if swapped.matched_count:
+                return result
+
+    # ----------------- API -----------------
+    def allocate(self, address: str) -> int:
+        """Reserve a nonce: the lowest given-back one, else the next fresh one"""
+        return self._update(address, self._take, time.time())
+
+    def sent(self, address: str, nonce: int):
+        """The node accepted (or already has) a tx at this nonce"""
+        self._update(address, self._drop_lease, nonce)
+
+    def release(self, address: str, nonce: int):
+        """Give back a nonce whose tx never reached the node"""
+        self._update(address, self._give_back, nonce)
+
+    def resync(self, address: str):
+        """Catch up with the chain's pending nonce after a rejection"""
+        chain_nonce = self._chain_nonce(address)
+        self._update(address, self._catch_up, chain_nonce, time.time())
+        logger.info(f"🔢 Nonce for {address} resynced against chain nonce {chain_nonce}")
+
+
+class GasOracle:
+    """
+    Serves the gas price from memory, refreshed by a background thread, and a
+    gas limit per contract function estimated once and padded by a safety margin.
+    """
+
+    def __init__(self, w3: Web3):
+        self.w3 = w3
+        self.refresh_interval = float(os.getenv("GAS_PRICE_REFRESH_SECONDS", 15))
+        self.margin = float(os.getenv("GAS_LIMIT_MARGIN", 0.2))
+        self.default_limit = int(os.getenv("DEFAULT_GAS_LIMIT", 300000))
+        self._gas_price = None
+        self._limits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def refresh(self):
+        self._gas_price = self.w3.eth.gas_price
+
+    def _refresh_forever(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️  Gas price refresh failed: {e}")
+
+    def gas_price(self) -> int:
+        """Latest gas price; the first call fetches it and starts the refresher"""
+        if self._gas_price is None:
+            with self._lock:
+                if self._gas_price is None:
+                    self.refresh()
+                    self._refresher = threading.Thread(target=self._refresh_forever, daemon=True)
+                    self._refresher.start()
+        return self._gas_price
+
+    def gas_limit(self, fn_name: str, contract_fn, sender: str) -> int:
+        """Cached estimate for a contract function plus margin (falls back to DEFAULT_GAS_LIMIT)"""
+        limit = self._limits.get(fn_name)
+        if limit is not None:
+            return limit
+        try:
+            limit = int(contract_fn.estimate_gas({"from": sender}) * (1 + self.margin))
+        except Exception as e:
+            # A call that would revert can't be estimated; don't cache the fallback
+            logger.warning(f"⚠️  Gas estimate for {fn_name} failed ({e}), using {self.default_limit}")
+            return self.default_limit
+        self._limits[fn_name] = limit
+        return limit
+
+    def observe(self, fn_name: str, gas_used: int):
+        """Raise a cached limit when a mined tx came within the margin of it"""
+        padded = int(gas_used * (1 + self.margin))
+        if padded > self._limits.get(fn_name, 0):
+            self._limits[fn_name] = padded
+
+
+ABI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "abi")
+
+
+@functools.lru_cache(maxsize=None)
+def load_abi(name: str):
+    """Parse abi/<name>.json once per process"""
+    with open(os.path.join(ABI_DIR, f"{name}.json"), "r") as f:
+        return json.load(f)
+
+
+class BlueCarbonClient:
+    def __init__(self):
+        # Nothing here touches the network; connect() does that at startup
+        # RPC_URLS (or RPC_URL): reads to the fastest healthy node, writes to the first
+        self.provider = PooledHTTPProvider(rpc_urls())
+        self.provider.watch()
+        self.w3 = Web3(self.provider)
+        self.w3.middleware_onion.add(rpc_metrics_middleware, "metrics")
+        self.registry = self.w3.eth.contract(
+            address=Web3.to_checksum_address(os.getenv("REGISTRY_ADDRESS")),
+            abi=load_abi("ContractRegistry"),
+        )
+        self.contract = None
+        self.contract_address = None
+
+        self.nonces = NonceManager(self.w3)
+        self.gas = GasOracle(self.w3)
+        # Coalesce concurrent contract reads into JSON-RPC batches
+        self.batcher = RpcBatcher(self.w3) if os.getenv("RPC_BATCHING", "1") == "1" else None
+
+    def connect(self):
+        """Check the RPC node and resolve the BlueCarbon contract from the registry"""
+        # Connect to Celo Alfajores
+        if not self.w3.is_connected():
+            raise ConnectionError("❌ Failed to connect to Celo Alfajores")
+
+        logger.info(f"✅ Connected to Celo Alfajores - Block: {self.w3.eth.block_number}")
+        logger.info(f"📒 Registry loaded at {self.registry.address}")
+
+        # --- Fetch BlueCarbon contract address from registry ---
+        bluecarbon_address = self.registry.functions.getContract("BlueCarbon").call()
+        if bluecarbon_address == "0x0000000000000000000000000000000000000000":
+            raise ValueError("❌ No BlueCarbon contract registered in ContractRegistry")
+
+        logger.info(f"📌 BlueCarbon address from registry: {bluecarbon_address}")
+
+        self.contract = self.w3.eth.contract(address=bluecarbon_address, abi=load_abi("BlueCarbon"))
+        self.contract_address = bluecarbon_address
+
+        logger.info(f"📄 BlueCarbon contract loaded at {self.contract_address}")
+
+    # --------- READ METHODS --------- #
+    def _call(self, contract_fn):
+        """eth_call a contract function (batched with concurrent reads), timed under its name"""
+        with CONTRACT_SECONDS.time(function=contract_fn.fn_name, kind="call"):
+            if self.batcher is not None:
+                return self.batcher.call(contract_fn)
+            return contract_fn.call()
+
+    def _call_many(self, contract_fns: List, block_identifier="latest") -> List[Any]:
+        """Several reads in as few round trips as the batcher allows"""
+        if self.batcher is not None:
+            return self.batcher.call_many(contract_fns, block_identifier)
+        return [contract_fn.call(block_identifier=block_identifier) for contract_fn in contract_fns]
+
+    def get_project_token_id(self, project_id: str) -> int:
+        """Fetch token ID for a project by its projectId"""
+        return self._call(self.contract.functions.getProjectTokenId(project_id))
+
+    def get_balance_of(self, account: str, token_id: int) -> int:
+        """Check ERC1155 balance of a user for a given tokenId"""
+        return self._call(
+            self.contract.functions.balanceOf(Web3.to_checksum_address(account), token_id)
+        )
+
+    def get_token_metadata(self, token_id: int) -> str:
+        """Fetch IPFS CID metadata of a token"""
+        return self._call(self.contract.functions.getTokenMetadataCID(token_id))
+
+    def get_token_proof(self, token_id: int) -> str:
+        """Fetch proof CID for issued credits"""
+        return self._call(self.contract.functions.getTokenProofCID(token_id))
+
+    def token_exists(self, token_id: int) -> bool:
+        """Whether any supply of a token has ever been minted"""
+        return self._call(self.contract.functions.exists(token_id))
+
+    def get_project_token_ids(self, project_ids: List[str]) -> Dict[str, int]:
+        """getProjectTokenId for several projects (0 = not registered)"""
+        fns = [self.contract.functions.getProjectTokenId(project_id) for project_id in project_ids]
+        return dict(zip(project_ids, self._call_many(fns)))
+
+    def get_balances_batch(self, accounts: List[str], token_ids: List[int]) -> List[int]:
+        """balanceOfBatch over (accounts[i], token_ids[i]) pairs, chunked for large inputs"""
+        chunk_size = int(os.getenv("BALANCE_BATCH_SIZE", 500))
+        balances = []
+        for i in range(0, len(accounts), chunk_size):
+            balances.extend(
+                self._call(
+                    self.contract.functions.balanceOfBatch(
+                        [Web3.to_checksum_address(a) for a in accounts[i : i + chunk_size]],
+                        token_ids[i : i + chunk_size],
+                    )
+                )
+            )
+        return balances
+
+    def get_total_supply(self, token_id: int) -> int:
+        """Registry-wide supply of one token (totalSupply is overloaded in the ABI)"""
+        return self._call(self.contract.get_function_by_signature("totalSupply(uint256)")(token_id))
+
+    def get_total_supplies(self, token_ids: List[int], block_identifier="latest") -> Dict[int, int]:
+        """totalSupply for several tokens, optionally as of a given block"""
+        total_supply = self.contract.get_function_by_signature("totalSupply(uint256)")
+        fns = [total_supply(token_id) for token_id in token_ids]
+        return dict(zip(token_ids, self._call_many(fns, block_identifier)))
+
+    def get_receipts(self, tx_hashes: List[str]) -> Dict[str, Any]:
+        """Fetch receipts for a batch of tx hashes; hashes not yet mined are left out"""
+        receipts = {}
+        for tx_hash in tx_hashes:
+            try:
+                receipts[tx_hash] = self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+        return receipts
+
+    def registered_token_id(self, receipt) -> Optional[int]:
+        """Token id from a ProjectRegistered event in a receipt, if it has one"""
+        events = self.contract.events.ProjectRegistered().process_receipt(receipt, errors=DISCARD)
+        return events[0].args.tokenId if events else None
+
+    # --------- WRITE METHODS --------- #
+    def _send_transaction(
+        self, txn, private_key: str, wait: bool = True, fn_name: str = "", on_sent: Optional[Callable[[], None]] = None
+    ) -> Dict[str, Any]:
+        """Helper to sign, send, and (unless wait=False) wait for confirmation"""
+        signed = self.w3.eth.account.sign_transaction(txn, private_key)
+        tx_hash = self.w3.eth.send_raw_transaction(signed.rawTransaction)
+        if on_sent:
+            on_sent()
+        if not wait:
+            return {"tx_hash": tx_hash.hex(), "status": "pending"}
+
+        with RECEIPT_WAIT_SECONDS.time(function=fn_name, mode="sync"):
+            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+
+        result = {
+            "tx_hash": tx_hash.hex(),
+            "status": receipt.status,
+            "blockNumber": receipt.blockNumber,
+            "gasUsed": receipt.gasUsed,
+        }
+        token_id = self.registered_token_id(receipt)
+        if token_id is not None:
+            result["token_id"] = token_id
+        return result
+
+    def _transact(self, contract_fn, private_key: str, wait: bool = True) -> Dict[str, Any]:
+        """Build a contract call from local nonce/gas state, then sign and send it"""
+        acct = self.w3.eth.account.from_key(private_key)
+        fn_name = contract_fn.fn_name
+        gas = self.gas.gas_limit(fn_name, contract_fn, acct.address)
+
+        for attempt in range(2):
+            nonce = self.nonces.allocate(acct.address)
+            try:
+                txn = contract_fn.build_transaction(
+                    {
+                        "from": acct.address,
+                        "nonce": nonce,
+                        "chainId": int(os.getenv("CHAIN_ID")),
+                        "gas": gas,
+                        "gasPrice": self.gas.gas_price(),
+                    }
+                )
+                with CONTRACT_SECONDS.time(function=fn_name, kind="transact"):
+                    result = self._send_transaction(
+                        txn,
+                        private_key,
+                        wait=wait,
+                        fn_name=fn_name,
+                        # Once the node has the tx the nonce is spent, whatever the receipt wait does
+                        on_sent=functools.partial(self.nonces.sent, acct.address, nonce),
+                    )
+            except Exception as e:
+                if is_nonce_error(e):
+                    # Used by another tx: never hand it out again
+                    self.nonces.sent(acct.address, nonce)
+                    if attempt == 0:
+                        logger.warning(f"⚠️  Nonce {nonce} rejected for {acct.address}, resyncing from chain")
+                        self.nonces.resync(acct.address)
+                        continue
+                    raise
+                # No-op when the tx was already sent
+                self.nonces.release(acct.address, nonce)
+                raise
+
+            if "gasUsed" in result:
+                self.gas.observe(fn_name, result["gasUsed"])
+            return result
+
+    def register_project(
+        self, project_id: str, metadata_cid: str, private_key: str, wait: bool = True
+    ) -> Dict[str, Any]:
+        """Register a new project on-chain (admin only)"""
+        result = self._transact(
+            self.contract.functions.registerProject(project_id, metadata_cid),
+            private_key,
+            wait=wait,
+        )
+        logger.info(f"📝 Project registered: {project_id} → Tx: {result['tx_hash']}")
+        return result
+
+    def issue_credits(
+        self,
+        to_address: str,
+        project_id: str,
+        amount: int,
+        proof_cid: str,
+        private_key: str,
+        wait: bool = True,
+    ) -> Dict[str, Any]:
+        """Issue carbon credits (minter only)"""
+        result = self._transact(
+            self.contract.functions.issueCredits(
+                Web3.to_checksum_address(to_address), project_id, amount, proof_cid
+            ),
+            private_key,
+            wait=wait,
+        )
+        logger.info(f"💰 Issued {amount} credits for project {project_id} → Tx: {result['tx_hash']}")
+        return result
+
+    def retire_credits(
+        self, token_id: int, amount: int, private_key: str, wait: bool = True
+    ) -> Dict[str, Any]:
+        """Retire carbon credits (user)"""
+        result = self._transact(
+            self.contract.functions.retireCredits(token_id, amount), private_key, wait=wait
+        )
+        logger.info(f"🔥 Retired {amount} credits (Token {token_id}) → Tx: {result['tx_hash']}")
+        return result
+
+    def update_registry(self, name: str, new_address: str, private_key: str) -> Dict[str, Any]:
+        """Point a registry name at a new contract address (admin only)"""
+        result = self._transact(
+            self.registry.functions.updateContract(name, new_address), private_key
+        )
+        logger.info(f"📒 Registry updated: {name} → {new_address} → Tx: {result['tx_hash']}")
+        return result
+
+
+# Global instance
+bluecarbon_client = BlueCarbonClient()
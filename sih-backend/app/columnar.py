@@ -0,0 +1,378 @@
+"""
+In-process columnar analytics over the plots dataset
+
+Loads plots into NumPy column arrays (float64 metrics, categorical codes for
+Project_Type/Data_Source, datetime64 for Timestamp) and answers the
+/analytics/* group-bys with bincount reductions. A change stream on `plots`
+keeps the arrays current after the initial load; after an error it resumes
+from the last resume token, or reloads when the oplog no longer reaches back
+that far. Change streams need a replica set (Atlas always is one): on a
+standalone mongod the store reloads every COLUMNAR_RELOAD_SECONDS instead.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Any, List, Iterable, Optional
+
+import numpy as np
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.plot_schema import NUMERIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+CATEGORICAL_COLUMNS = ["Project_Type", "Data_Source"]
+# InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost: the oplog
+# no longer reaches back to our resume token, so only a full reload catches up
+RESUME_LOST_CODES = {260, 280, 286}
+WATCH_RETRY_SECONDS = 2
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+
+def change_streams_unsupported(error: OperationFailure) -> bool:
+    return error.code == CHANGE_STREAMS_UNSUPPORTED or "only supported on replica sets" in str(error)
+
+
+class PlotColumnStore:
+    def __init__(self, db=None, capacity: int = 1024):
+        self.plots = db["plots"] if db is not None else None
+        self.size = 0
+        self.rows: Dict[Any, int] = {}  # plot _id → row
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.numeric = {c: np.full(capacity, np.nan) for c in NUMERIC_COLUMNS}
+        self.year = np.full(capacity, -1, dtype=np.int32)
+        self.timestamp = np.full(capacity, np.datetime64("NaT"), dtype="datetime64[s]")
+        self.codes = {c: np.full(capacity, -1, dtype=np.int32) for c in CATEGORICAL_COLUMNS}
+        self.categories: Dict[str, List[Any]] = {c: [] for c in CATEGORICAL_COLUMNS}
+        self._category_codes: Dict[str, Dict[Any, int]] = {c: {} for c in CATEGORICAL_COLUMNS}
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stream = None
+        self._resume_token = None
+        # Set once the server turns out to have no change streams: poll with reloads
+        self.polling = False
+        self.reload_seconds = float(os.getenv("COLUMNAR_RELOAD_SECONDS", 60))
+        # Derived group codes, reused until the next write
+        self._version = 0
+        self._memo: Dict[str, Any] = {}
+        self._stop = threading.Event()
+
+    # ----------------- STORAGE -----------------
+    @property
+    def capacity(self) -> int:
+        return len(self.valid)
+
+    def _grow(self, needed: int):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+
+        def extend(array, fill):
+            grown = np.full(capacity, fill, dtype=array.dtype)
+            grown[: len(array)] = array
+            return grown
+
+        self.valid = extend(self.valid, False)
+        self.numeric = {c: extend(a, np.nan) for c, a in self.numeric.items()}
+        self.year = extend(self.year, -1)
+        self.timestamp = extend(self.timestamp, np.datetime64("NaT"))
+        self.codes = {c: extend(a, -1) for c, a in self.codes.items()}
+
+    def _code(self, column: str, value) -> int:
+        codes = self._category_codes[column]
+        if value not in codes:
+            codes[value] = len(self.categories[column])
+            self.categories[column].append(value)
+        return codes[value]
+
+    def _write_row(self, row: int, plot: Dict[str, Any]):
+        for column, array in self.numeric.items():
+            value = plot.get(column)
+            numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+            array[row] = value if numeric else np.nan
+        year = plot.get("Monitoring_Year")
+        self.year[row] = year if isinstance(year, int) else -1
+        timestamp = plot.get("Timestamp")
+        self.timestamp[row] = (
+            np.datetime64(timestamp.replace(tzinfo=None), "s")
+            if timestamp is not None
+            else np.datetime64("NaT")
+        )
+        for column in CATEGORICAL_COLUMNS:
+            self.codes[column][row] = self._code(column, plot.get(column))
+        self.valid[row] = True
+
+    def upsert(self, plots: Iterable[Dict[str, Any]]):
+        """Insert or overwrite plots (keyed by _id, falling back to ID)"""
+        with self._lock:
+            for plot in plots:
+                key = plot.get("_id", plot.get("ID"))
+                row = self.rows.get(key)
+                if row is None:
+                    row = self.size
+                    self._grow(row + 1)
+                    self.rows[key] = row
+                    self.size += 1
+                self._write_row(row, plot)
+            self._version += 1
+
+    def append_columns(
+        self,
+        keys: List[Any],
+        numeric: Dict[str, np.ndarray],
+        year: np.ndarray,
+        timestamp: np.ndarray,
+        categorical: Dict[str, List[Any]],
+    ):
+        """Vectorized bulk append of new plots already split into columns"""
+        with self._lock:
+            start, n = self.size, len(keys)
+            self._grow(start + n)
+            end = start + n
+            for column, array in self.numeric.items():
+                if column in numeric:
+                    array[start:end] = numeric[column]
+            self.year[start:end] = year
+            self.timestamp[start:end] = timestamp
+            for column, values in categorical.items():
+                uniques, inverse = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+                mapping = np.array([self._code(column, u) for u in uniques], dtype=np.int32)
+                self.codes[column][start:end] = mapping[inverse]
+            self.valid[start:end] = True
+            self.rows.update(zip(keys, range(start, end)))
+            self.size = end
+            self._version += 1
+
+    def delete(self, key):
+        with self._lock:
+            row = self.rows.pop(key, None)
+            if row is not None:
+                self.valid[row] = False
+                self._version += 1
+
+    def load(self, batch_size: int = 10000, watch: bool = True) -> int:
+        """Full load from the plots collection (a reload also drops plots deleted meanwhile)"""
+        if watch and not self.polling:
+            # Open the change stream first so writes made during the scan are replayed
+            try:
+                self._stream = self.plots.watch(full_document="updateLookup")
+            except OperationFailure as e:
+                if not change_streams_unsupported(e):
+                    raise
+                self._fall_back_to_polling(e)
+        batch, seen = [], set()
+        for plot in self.plots.find({}, batch_size=batch_size):
+            batch.append(plot)
+            seen.add(plot.get("_id", plot.get("ID")))
+            if len(batch) >= batch_size:
+                self.upsert(batch)
+                batch = []
+        self.upsert(batch)
+        for key in set(self.rows) - seen:
+            self.delete(key)
+        logger.info(f"🧮 Columnar store loaded {self.size} plots")
+        return self.size
+
+    # ----------------- CHANGE FEED -----------------
+    def _fall_back_to_polling(self, error: OperationFailure):
+        self.polling = True
+        self._stream = None
+        logger.warning(
+            f"⚠️  Plots change stream unavailable ({error}); reloading every {self.reload_seconds:g}s instead"
+        )
+
+    def _poll(self):
+        """Without change streams: a full reload (which also drops deleted plots) per interval"""
+        while not self._stop.wait(self.reload_seconds):
+            try:
+                self.load(watch=False)
+            except Exception as e:
+                logger.warning(f"⚠️  Columnar store reload failed ({e}); retrying next interval")
+
+    def _follow(self):
+        """Apply changes until stopped, remembering the resume token as we go"""
+        stream = self._stream or self.plots.watch(full_document="updateLookup", resume_after=self._resume_token)
+        self._stream = None
+        with stream:
+            while not self._stop.is_set():
+                change = stream.try_next()
+                self._resume_token = stream.resume_token
+                if change is None:
+                    continue
+                if change["operationType"] == "delete":
+                    self.delete(change["documentKey"]["_id"])
+                elif change.get("fullDocument") is not None:
+                    self.upsert([change["fullDocument"]])
+
+    def _watch(self):
+        """Keep following the change stream across failovers, killed cursors and network errors"""
+        reload = False
+        while not self._stop.is_set():
+            if self.polling:
+                self._poll()
+                return
+            try:
+                if reload:
+                    self._resume_token = None
+                    self.load()
+                    reload = False
+                self._follow()
+            except OperationFailure as e:
+                if change_streams_unsupported(e):
+                    self._fall_back_to_polling(e)
+                    continue
+                reload = e.code in RESUME_LOST_CODES
+                logger.warning(f"⚠️  Plots change stream failed ({e}); {'reloading' if reload else 'resuming'}")
+                self._stop.wait(WATCH_RETRY_SECONDS)
+            except PyMongoError as e:
+                logger.warning(f"⚠️  Plots change stream interrupted ({e}); resuming")
+                self._stop.wait(WATCH_RETRY_SECONDS)
+            except Exception as e:
+                logger.error(f"❌ Plots change stream handler failed: {e}; reloading")
+                reload = True
+                self._stop.wait(WATCH_RETRY_SECONDS)
+
+    def start_watching(self):
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+    # ----------------- REDUCTIONS -----------------
+    def _group(self, codes: np.ndarray, n_groups: int, metric: Optional[str] = None):
+        """(counts, sums) per group code over valid rows with a value for metric"""
+        n = self.size
+        mask = self.valid[:n].copy()
+        if metric is not None:
+            values = self.numeric[metric][:n]
+            mask &= ~np.isnan(values)
+        codes = codes[:n][mask]
+        counts = np.bincount(codes, minlength=n_groups)
+        if metric is None:
+            return counts, None
+        sums = np.bincount(codes, weights=values[mask], minlength=n_groups)
+        return counts, sums
+
+    def _category_groups(self, column: str):
+        """(codes, group count, keys): group i is categories[column][i]"""
+        return self.codes[column], len(self.categories[column]), self.categories[column]
+
+    @staticmethod
+    def _dense_groups(values: np.ndarray, missing: np.ndarray):
+        """Codes for small-range integer keys without sorting; group 0 holds missing values"""
+        present = values[~missing]
+        low = int(present.min()) if len(present) else 0
+        high = int(present.max()) if len(present) else -1
+        codes = np.where(missing, 0, values - low + 1).astype(np.int64)
+        return codes, high - low + 2, low
+
+    def _memoized(self, name: str, build):
+        cached = self._memo.get(name)
+        if cached is None or cached[0] != self._version:
+            cached = (self._version, build())
+            self._memo[name] = cached
+        return cached[1]
+
+    def _year_groups(self):
+        return self._memoized("year", self._build_year_groups)
+
+    def _month_groups(self):
+        return self._memoized("month", self._build_month_groups)
+
+    def _build_year_groups(self):
+        years = self.year[: self.size]
+        codes, n_groups, low = self._dense_groups(years, years == -1)
+        keys = [None] + [low + i for i in range(n_groups - 1)]
+        return codes, n_groups, keys
+
+    def _build_month_groups(self):
+        ts = self.timestamp[: self.size]
+        months = ts.astype("datetime64[M]").astype(np.int64)
+        codes, n_groups, low = self._dense_groups(months, np.isnat(ts))
+        keys = [{"year": None, "month": None}] + [
+            {"year": (low + i) // 12 + 1970, "month": (low + i) % 12 + 1} for i in range(n_groups - 1)
+        ]
+        return codes, n_groups, keys
+
+    @staticmethod
+    def _avg(counts, sums, i) -> Optional[float]:
+        return float(sums[i] / counts[i]) if counts[i] else None
+
+    def _present(self, codes, n_groups) -> np.ndarray:
+        counts, _ = self._group(codes, n_groups)
+        return counts
+
+    # ----------------- ENDPOINT SHAPES -----------------
+    def plots_overview(self) -> Dict[str, Any]:
+        with self._lock:
+            codes, n_groups, keys = self._category_groups("Project_Type")
+            counts = self._present(codes, n_groups)
+            total = int(self.valid[: self.size].sum())
+        by_type = [{"_id": keys[i], "count": int(c)} for i, c in enumerate(counts) if c]
+        by_type.sort(key=lambda r: r["count"], reverse=True)
+        return {"total_plots": total, "by_type": by_type}
+
+    def ndvi_by_project(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            codes, n_groups, keys = self._category_groups("Project_Type")
+            present = self._present(codes, n_groups)
+            counts, sums = self._group(codes, n_groups, "NDVI")
+        rows = [
+            {"_id": keys[i], "avgNDVI": self._avg(counts, sums, i)}
+            for i in range(n_groups)
+            if present[i]
+        ]
+        rows.sort(key=lambda r: (r["avgNDVI"] is not None, r["avgNDVI"] or 0), reverse=True)
+        return rows
+
+    def _by_year(self, columns: Dict[str, str]) -> List[Dict[str, Any]]:
+        with self._lock:
+            codes, n_groups, keys = self._year_groups()
+            present = self._present(codes, n_groups)
+            reduced = {name: self._group(codes, n_groups, metric) for name, metric in columns.items()}
+        rows = []
+        for i in range(n_groups):
+            if not present[i]:
+                continue
+            row = {"_id": keys[i]}
+            for name, (counts, sums) in reduced.items():
+                row[name] = self._avg(counts, sums, i)
+            rows.append(row)
+        return rows
+
+    def biomass_trend(self) -> List[Dict[str, Any]]:
+        rows = self._by_year({"avgAbove": "Biomass_above_kg", "avgBelow": "Biomass_below_kg"})
+        with self._lock:
+            codes, n_groups, keys = self._year_groups()
+            n = self.size
+            total = self.numeric["Biomass_above_kg"][:n] + self.numeric["Biomass_below_kg"][:n]
+            mask = self.valid[:n] & ~np.isnan(total)
+            sums = np.bincount(codes[mask], weights=total[mask], minlength=n_groups)
+        totals = {keys[i]: float(sums[i]) for i in range(n_groups)}
+        for row in rows:
+            row["total"] = totals[row["_id"]]
+        return rows
+
+    def fluxes(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            "co2": self._by_year({"avgCO2": "CO2_Flux_mg_m2_day"}),
+            "ch4": self._by_year({"avgCH4": "CH4_Flux_mg_m2_day"}),
+        }
+
+    def ndvi_monthly(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            codes, n_groups, keys = self._month_groups()
+            present = self._present(codes, n_groups)
+            counts, sums = self._group(codes, n_groups, "NDVI")
+        return [
+            {"_id": keys[i], "avgNDVI": self._avg(counts, sums, i)}
+            for i in range(n_groups)
+            if present[i]
+        ]
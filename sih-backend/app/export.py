@@ -0,0 +1,70 @@
+"""
+Bulk export of plots and transactions
+
+Rows come straight off a Mongo cursor in ascending order of a unique, indexed
+key that is part of every row (plots: ID, transactions: _id). An interrupted
+export resumes by passing the last key received as `after`.
+"""
+
+from typing import Dict, Any, List, Iterator, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.plot_schema import NUMERIC_COLUMNS
+from app.responses import FIELD_NAME
+
+PLOT_EXPORT_FIELDS = ["ID", "Project_Type", "Data_Source", "Monitoring_Year", "Timestamp", "Notes"] + NUMERIC_COLUMNS
+TRANSACTION_EXPORT_FIELDS = [
+    "_id",
+    "tx_hash",
+    "type",
+    "project_id",
+    "status",
+    "block_number",
+    "timestamp",
+    "confirmed_at",
+]
+
+
+def select_fields(fields: Optional[str], default: List[str], key: str) -> List[str]:
+    """fields= list (always led by the resume key), or the default columns"""
+    if not fields:
+        return default
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [f for f in selected if not FIELD_NAME.match(f)]
+    if invalid:
+        raise ValueError(f"invalid field names: {', '.join(invalid)}")
+    return [key] + [f for f in selected if f != key]
+
+
+class Exporter:
+    def __init__(self, db, batch_size: int = 1000):
+        self.plots = db["plots"]
+        self.transactions = db["transactions"]
+        self.batch_size = batch_size
+
+    def _rows(self, collection, query, fields, key, batch_size) -> Iterator[Dict[str, Any]]:
+        projection = {field: 1 for field in fields}
+        if "_id" not in fields:
+            projection["_id"] = 0
+        return collection.find(query, projection).sort(key, 1).batch_size(batch_size or self.batch_size)
+
+    def plot_rows(
+        self, filters: Dict[str, Any], fields: List[str], after: Optional[str] = None, batch_size: int = None
+    ) -> Iterator[Dict[str, Any]]:
+        query = dict(filters)
+        if after:
+            query["ID"] = {"$gt": after}
+        return self._rows(self.plots, query, fields, "ID", batch_size)
+
+    def transaction_rows(
+        self, filters: Dict[str, Any], fields: List[str], after: Optional[str] = None, batch_size: int = None
+    ) -> Iterator[Dict[str, Any]]:
+        query = dict(filters)
+        if after:
+            try:
+                query["_id"] = {"$gt": ObjectId(after)}
+            except (InvalidId, TypeError):
+                raise ValueError("after must be the _id of the last exported transaction")
+        return self._rows(self.transactions, query, fields, "_id", batch_size)
@@ -0,0 +1,235 @@
+"""
+Geospatial plot search: radius, bounding box / polygon and nearest-N
+
+MongoPlotSearch answers from the 2dsphere index on plots.location.
+GridPlotSearch is the in-memory stand-in for the mock backend (ENABLE_DB=0):
+plots are bucketed into fixed-size lat/long cells so a query only visits the
+cells it overlaps. Both return iterators so results can be streamed.
+"""
+
+import logging
+import math
+from collections import defaultdict
+from typing import Dict, Any, List, Iterator, Iterable, Optional, Tuple
+
+from app.indexes import apply_indexes
+from app.plot_schema import NUMERIC_COLUMNS, DIMENSION_FIELDS
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371008.8
+
+DEFAULT_FIELDS = [
+    "ID",
+    "Project_Type",
+    "Data_Source",
+    "Monitoring_Year",
+    "GPS_Lat",
+    "GPS_Long",
+    "NDVI",
+    "Carbon_t",
+    "CO2e_t",
+]
+PLOT_FIELDS = set(NUMERIC_COLUMNS) | set(DIMENSION_FIELDS) | {"ID", "Timestamp", "Notes", "location"}
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Comma-separated field list (None → DEFAULT_FIELDS)"""
+    if not fields:
+        return DEFAULT_FIELDS
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in PLOT_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown plot fields: {', '.join(unknown)}")
+    return selected
+
+
+def bbox_polygon(min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> Dict[str, Any]:
+    if min_lon >= max_lon or min_lat >= max_lat:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    return {
+        "type": "Polygon",
+        "coordinates": [
+            [[min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat], [min_lon, max_lat], [min_lon, min_lat]]
+        ],
+    }
+
+
+def polygon(ring: List[List[float]]) -> Dict[str, Any]:
+    """GeoJSON polygon from one [lon, lat] ring, closing it if needed"""
+    if len(ring) < 3:
+        raise ValueError("polygon needs at least 3 points")
+    ring = [list(map(float, point[:2])) for point in ring]
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def haversine_m(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class MongoPlotSearch:
+    """Plot queries served by the plots.location 2dsphere index"""
+
+    def __init__(self, db, batch_size: int = 1000):
+        self.plots = db["plots"]
+        self.batch_size = batch_size
+
+    def ensure_indexes(self):
+        apply_indexes(self.plots.database, ["plots"])
+
+    @staticmethod
+    def _projection(fields: List[str], distance: bool = False) -> Dict[str, int]:
+        projection = {"_id": 0, **{field: 1 for field in fields}}
+        if distance:
+            projection["distance_m"] = 1
+        return projection
+
+    def _geo_near(self, lon, lat, limit, fields, max_distance=None) -> Iterator[Dict[str, Any]]:
+        geo_near = {
+            "near": {"type": "Point", "coordinates": [lon, lat]},
+            "distanceField": "distance_m",
+            "key": "location",
+            "spherical": True,
+        }
+        if max_distance is not None:
+            geo_near["maxDistance"] = max_distance
+        pipeline = [{"$geoNear": geo_near}]
+        if limit:
+            pipeline.append({"$limit": limit})
+        pipeline.append({"$project": self._projection(fields, distance=True)})
+        return self.plots.aggregate(pipeline, batchSize=self.batch_size)
+
+    def near(self, lon: float, lat: float, radius_m: float, limit: int, fields: List[str]):
+        """Plots within radius_m of (lon, lat), closest first"""
+        return self._geo_near(lon, lat, limit, fields, max_distance=radius_m)
+
+    def nearest(self, lon: float, lat: float, n: int, fields: List[str]):
+        return self._geo_near(lon, lat, n, fields)
+
+    def within(self, geometry: Dict[str, Any], limit: int, fields: List[str]):
+        """Plots inside a GeoJSON polygon"""
+        return self.plots.find(
+            {"location": {"$geoWithin": {"$geometry": geometry}}},
+            self._projection(fields),
+            batch_size=self.batch_size,
+            limit=limit or 0,
+        )
+
+
+class GridPlotSearch:
+    """In-memory fixed-cell grid with the same query methods as MongoPlotSearch"""
+
+    def __init__(self, cell_deg: float = 0.5):
+        self.cell_deg = cell_deg
+        self.cells: Dict[Tuple[int, int], List[Tuple[float, float, Dict[str, Any]]]] = defaultdict(list)
+        self.size = 0
+
+    def ensure_indexes(self):
+        pass
+
+    # ----------------- LOADING -----------------
+    def _cell(self, lon: float, lat: float) -> Tuple[int, int]:
+        return math.floor(lon / self.cell_deg), math.floor(lat / self.cell_deg)
+
+    def add(self, plots: Iterable[Dict[str, Any]]):
+        for plot in plots:
+            coords = (plot.get("location") or {}).get("coordinates")
+            lon, lat = coords if coords else (plot.get("GPS_Long"), plot.get("GPS_Lat"))
+            if lon is None or lat is None:
+                continue
+            self.cells[self._cell(lon, lat)].append((lon, lat, plot))
+            self.size += 1
+
+    def load_csv(self, path: str) -> int:
+        from app.ingest import read_plots, to_documents
+
+        for chunk in read_plots(path, 50000):
+            self.add(to_documents(chunk))
+        logger.info(f"🗺️  Grid search loaded {self.size} plots from {path}")
+        return self.size
+
+    # ----------------- QUERIES -----------------
+    def _in_box(self, min_lon, min_lat, max_lon, max_lat):
+        (x0, y0), (x1, y1) = self._cell(min_lon, min_lat), self._cell(max_lon, max_lat)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            # Box spans more cells than exist: walk the occupied ones instead
+            keys = [(x, y) for x, y in self.cells if x0 <= x <= x1 and y0 <= y <= y1]
+        else:
+            keys = [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+        for key in keys:
+            for lon, lat, plot in self.cells.get(key, ()):
+                if min_lon <= lon <= max_lon and min_lat <= lat <= max_lat:
+                    yield lon, lat, plot
+
+    @staticmethod
+    def _project(plot: Dict[str, Any], fields: List[str], distance: float = None) -> Dict[str, Any]:
+        row = {field: plot.get(field) for field in fields if field in plot}
+        if distance is not None:
+            row["distance_m"] = distance
+        return row
+
+    def near(self, lon: float, lat: float, radius_m: float, limit: int, fields: List[str]):
+        dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+        cos_lat = math.cos(math.radians(min(89.9, abs(lat) + dlat)))
+        dlon = min(180.0, dlat / cos_lat)
+        hits = []
+        for plon, plat, plot in self._in_box(lon - dlon, lat - dlat, lon + dlon, lat + dlat):
+            d = haversine_m(lon, lat, plon, plat)
+            if d <= radius_m:
+                hits.append((d, plot))
+        hits.sort(key=lambda hit: hit[0])
+        return iter([self._project(plot, fields, d) for d, plot in hits[: limit or None]])
+
+    def nearest(self, lon: float, lat: float, n: int, fields: List[str]):
+        """Scan rings of cells outward until nothing unscanned can beat the n-th hit"""
+        cx, cy = self._cell(lon, lat)
+        xs = [x for x, _ in self.cells] or [cx]
+        ys = [y for _, y in self.cells] or [cy]
+        max_ring = max(abs(cx - min(xs)), abs(cx - max(xs)), abs(cy - min(ys)), abs(cy - max(ys)))
+
+        hits = []
+        for ring in range(max_ring + 1):
+            for x in range(cx - ring, cx + ring + 1):
+                for y in range(cy - ring, cy + ring + 1):
+                    if max(abs(x - cx), abs(y - cy)) != ring:
+                        continue
+                    for plon, plat, plot in self.cells.get((x, y), ()):
+                        hits.append((haversine_m(lon, lat, plon, plat), plot))
+            if len(hits) >= n:
+                hits.sort(key=lambda hit: hit[0])
+                hits = hits[:n]
+                # Closest point outside the scanned square, bounded below
+                lat_gap = min(lat - (cy - ring) * self.cell_deg, (cy + ring + 1) * self.cell_deg - lat)
+                lon_gap = min(lon - (cx - ring) * self.cell_deg, (cx + ring + 1) * self.cell_deg - lon)
+                edge_lat = min(89.9, abs(lat) + (ring + 1) * self.cell_deg)
+                reach = math.radians(min(lat_gap, lon_gap * math.cos(math.radians(edge_lat)))) * EARTH_RADIUS_M
+                if hits[-1][0] <= reach:
+                    break
+        hits.sort(key=lambda hit: hit[0])
+        return iter([self._project(plot, fields, d) for d, plot in hits[:n]])
+
+    @staticmethod
+    def _inside(lon: float, lat: float, ring: List[List[float]]) -> bool:
+        inside = False
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+            if (y1 > lat) != (y2 > lat) and lon < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+    def within(self, geometry: Dict[str, Any], limit: int, fields: List[str]):
+        outer, *holes = geometry["coordinates"]
+        lons = [p[0] for p in outer]
+        lats = [p[1] for p in outer]
+        rows = []
+        for lon, lat, plot in self._in_box(min(lons), min(lats), max(lons), max(lats)):
+            if self._inside(lon, lat, outer) and not any(self._inside(lon, lat, h) for h in holes):
+                rows.append(self._project(plot, fields))
+                if limit and len(rows) >= limit:
+                    break
+        return iter(rows)
@@ -0,0 +1,130 @@
+"""
+Background dependency health checks for the readiness probe
+
+Mongo, the RPC node, the registry and chain freshness are checked every
+HEALTH_CHECK_INTERVAL seconds; /readyz and /health serve the cached results,
+so probe traffic never reaches the dependencies and probe latency does not
+depend on them.
+"""
+
+import logging
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Runs the dependency checks on an interval; snapshot() is what probes read"""
+
+    def __init__(self, client, db, indexer=None, interval: float = None):
+        self.client = client
+        self.db = db
+        self.indexer = indexer
+        self.interval = interval or float(os.getenv("HEALTH_CHECK_INTERVAL", 10))
+        self.timeout = float(os.getenv("HEALTH_CHECK_TIMEOUT", 5))
+        # Newest block older than this means the node has stalled or fallen behind
+        self.max_block_age = float(os.getenv("HEALTH_MAX_BLOCK_AGE", 60))
+        # Blocks the event indexer may trail head by beyond its confirmations
+        # (0 = report the lag only; a fresh indexer can take hours to catch up)
+        self.max_indexer_lag = int(os.getenv("HEALTH_MAX_INDEXER_LAG", 0))
+        self.checks: Dict[str, Dict[str, Any]] = {}
+        self.checked_at: Optional[float] = None
+        self._latest_block = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ----------------- CHECKS -----------------
+    def check_mongo(self) -> Dict[str, Any]:
+        self.db.command("ping")
+        return {}
+
+    def check_rpc(self) -> Dict[str, Any]:
+        self._latest_block = self.client.w3.eth.get_block("latest")
+        return {"block": self._latest_block.number}
+
+    def check_registry(self) -> Dict[str, Any]:
+        registered = self.client.registry.functions.getContract("BlueCarbon").call()
+        if registered != self.client.contract_address:
+            raise ValueError(f"registry points at {registered}, serving {self.client.contract_address}")
+        return {"contract": registered}
+
+    def check_chain(self) -> Dict[str, Any]:
+        """Head freshness, plus indexer lag when the indexer is running"""
+        if self._latest_block is None:
+            raise ValueError("no block from the RPC check")
+        head = self._latest_block.number
+        age = max(0.0, time.time() - self._latest_block.timestamp)
+        detail: Dict[str, Any] = {"block_age_s": round(age, 1)}
+        problems = []
+        if age > self.max_block_age:
+            problems.append(f"latest block is {age:.0f}s old")
+        if self.indexer is not None:
+            indexed = self.indexer.checkpoint()["block"]
+            lag = max(0, head - self.indexer.confirmations - indexed)
+            detail["indexer_lag_blocks"] = lag
+            if self.max_indexer_lag and lag > self.max_indexer_lag:
+                problems.append(f"indexer is {lag} blocks behind")
+        if problems:
+            raise ValueError("; ".join(problems))
+        return detail
+
+    async def _run_check(self, name: str, check) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(asyncio.to_thread(check), self.timeout)
+            result = {"ok": True, **detail}
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": f"timed out after {self.timeout:g}s"}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        result["checked_at"] = datetime.now(timezone.utc).isoformat()
+        self.checks[name] = result
+        return result
+
+    async def run_once(self):
+        # Chain freshness reuses the block the RPC check fetched
+        self._latest_block = None
+        await asyncio.gather(
+            self._run_check("mongo", self.check_mongo),
+            self._run_check("rpc", self.check_rpc),
+            self._run_check("registry", self.check_registry),
+        )
+        await self._run_check("chain", self.check_chain)
+        self.checked_at = time.time()
+
+    # ----------------- READS -----------------
+    def ok(self, name: str) -> bool:
+        return self.checks.get(name, {}).get("ok", False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cached results; stale when the monitor missed three intervals"""
+        age = time.time() - self.checked_at if self.checked_at else None
+        stale = age is None or age > 3 * self.interval
+        return {
+            "ready": not stale and all(check["ok"] for check in self.checks.values()),
+            "stale": stale,
+            "age_s": round(age, 1) if age is not None else None,
+            "checks": self.checks,
+        }
+
+    # ----------------- BACKGROUND -----------------
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning(f"⚠️  Health checks failed: {e}")
+
+    async def start(self):
+        await self.run_once()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,389 @@
+"""
+Incremental on-chain event indexer for the BlueCarbon contract
+
+Pages eth_getLogs over block ranges (halving the range when the node refuses a
+query, growing it again while pages stay small), stops `confirmations` blocks
+behind head, and checkpoints the last indexed block in `indexer_state`. When
+the checkpoint block was reorged away, the index is rewound to the newest
+block whose stored events still match the chain, at most
+INDEXER_MAX_REORG_DEPTH blocks back.
+Decoded events land in `chain_events`; holder balances and per-token
+issued/retired/supply totals are folded into `chain_balances` and
+`chain_tokens` so they can be served without RPC traffic.
+
+uint256 amounts and token ids beyond BSON's int64 cannot be $inc'ed exactly:
+such an event is stored with its numbers as decimal strings, flagged
+`oversized` and left out of the folded totals (an error is logged).
+"""
+
+import logging
+import asyncio
+import os
+from typing import Dict, Any, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from web3 import Web3
+
+from app.indexes import apply_indexes
+
+logger = logging.getLogger(__name__)
+
+INDEXED_EVENTS = [
+    "ProjectRegistered",
+    "CreditsIssued",
+    "CreditsRetired",
+    "TransferSingle",
+    "TransferBatch",
+]
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+CHECKPOINT_ID = "bluecarbon"
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+
+
+def fold_entry(doc: Dict[str, Any]) -> str:
+    """Marker of an event in the documents it was folded into; sorts by block"""
+    return f"{doc['block_number']:012d}:{doc['_id']}"
+
+
+def event_topic(abi: Dict[str, Any]) -> str:
+    signature = f"{abi['name']}({','.join(i['type'] for i in abi['inputs'])})"
+    return Web3.keccak(text=signature).hex()
+
+
+class ChainEventIndexer:
+    """Indexes BlueCarbon events into Mongo; run_once() is blocking, start() schedules it"""
+
+    def __init__(self, client, db, confirmations: int = None, start_block: int = None):
+        self.client = client
+        self.w3 = client.w3
+        self.events = db["chain_events"]
+        self.balances = db["chain_balances"]
+        self.tokens = db["chain_tokens"]
+        self.state = db["indexer_state"]
+
+        if confirmations is None:
+            confirmations = int(os.getenv("INDEXER_CONFIRMATIONS", 12))
+        if start_block is None:
+            start_block = int(os.getenv("INDEXER_START_BLOCK", 0))
+        self.confirmations = confirmations
+        self.start_block = start_block
+        # How far back a reorg can be undone exactly (fold markers are kept this long)
+        self.max_reorg_depth = max(int(os.getenv("INDEXER_MAX_REORG_DEPTH", 64)), confirmations)
+        self.max_range = int(os.getenv("INDEXER_MAX_BLOCK_RANGE", 5000))
+        self.target_logs = int(os.getenv("INDEXER_TARGET_LOGS", 2000))
+        self.block_range = self.max_range
+        self.poll_interval = float(os.getenv("INDEXER_POLL_INTERVAL", 15))
+        self._task: Optional[asyncio.Task] = None
+        self._decoders = None
+
+    @property
+    def decoders(self) -> Dict[str, Any]:
+        """topic0 → event decoder; built on first use since the contract resolves at startup"""
+        if self._decoders is None:
+            self._decoders = {
+                event_topic(abi): getattr(self.client.contract.events, abi["name"])()
+                for abi in self.client.contract.abi
+                if abi.get("type") == "event" and abi["name"] in INDEXED_EVENTS
+            }
+        return self._decoders
+
+    def ensure_indexes(self):
+        apply_indexes(self.events.database, ["chain_events", "chain_balances", "chain_tokens"])
+
+    # ----------------- CHECKPOINT -----------------
+    def checkpoint(self) -> Dict[str, Any]:
+        return self.state.find_one({"_id": CHECKPOINT_ID}) or {
+            "_id": CHECKPOINT_ID,
+            "block": self.start_block - 1,
+            "block_hash": None,
+        }
+
+    def _save_checkpoint(self, block: int):
+        block_hash = self.w3.eth.get_block(block).hash.hex() if block >= 0 else None
+        self.state.update_one(
+            {"_id": CHECKPOINT_ID},
+            {"$set": {"block": block, "block_hash": block_hash}},
+            upsert=True,
+        )
+
+    # ----------------- DECODING -----------------
+    def _decode(self, log) -> Optional[Dict[str, Any]]:
+        decoder = self.decoders.get(log["topics"][0].hex())
+        if decoder is None:
+            return None
+        event = decoder.process_log(log)
+        args = dict(event.args)
+
+        doc = {
+            "_id": f"{log['transactionHash'].hex()}:{log['logIndex']}",
+            "event": event.event,
+            "block_number": log["blockNumber"],
+            "block_hash": log["blockHash"].hex(),
+            "tx_hash": log["transactionHash"].hex(),
+            "log_index": log["logIndex"],
+            "deltas": [],
+        }
+
+        if event.event == "TransferSingle":
+            transfers = [(args["id"], args["value"])]
+        elif event.event == "TransferBatch":
+            transfers = list(zip(args["ids"], args["values"]))
+        else:
+            transfers = []
+            doc["token_id"] = args["tokenId"]
+            if event.event == "CreditsIssued":
+                doc.update(to=args["to"], amount=args["amount"], proof_cid=args["proofCID"])
+            elif event.event == "CreditsRetired":
+                doc.update(by=args["by"], amount=args["amount"])
+            else:
+                doc["metadata_cid"] = args["metadataCID"]
+
+        if transfers:
+            doc.update(operator=args["operator"], sender=args["from"], receiver=args["to"])
+            doc["token_ids"] = [token_id for token_id, _ in transfers]
+            doc["values"] = [value for _, value in transfers]
+            for token_id, value in transfers:
+                if args["from"] != ZERO_ADDRESS:
+                    doc["deltas"].append([args["from"], token_id, -value])
+                if args["to"] != ZERO_ADDRESS:
+                    doc["deltas"].append([args["to"], token_id, value])
+
+        numbers = [doc.get("token_id"), doc.get("amount"), *doc.get("token_ids", []), *doc.get("values", [])]
+        if any(isinstance(n, int) and not INT64_MIN <= n <= INT64_MAX for n in numbers):
+            logger.error(f"❌ {doc['event']} {doc['_id']} carries a value beyond int64; stored but not folded")
+            self._mark_oversized(doc)
+        return doc
+
+    @staticmethod
+    def _mark_oversized(doc: Dict[str, Any]):
+        """Keep the numbers exactly, as strings, and fold nothing"""
+        for field in ("token_id", "amount"):
+            if field in doc:
+                doc[field] = str(doc[field])
+        for field in ("token_ids", "values"):
+            if field in doc:
+                doc[field] = [str(n) for n in doc[field]]
+        doc["deltas"] = []
+        doc["oversized"] = True
+
+    def _folds(self, doc: Dict[str, Any], sign: int):
+        """(balance ops, token ops) an event contributes; sign=-1 undoes them on reorg
+
+        Each target document lists the events folded into it under `applied`, and
+        every op is conditioned on it, so repeating a fold or an undo is a no-op.
+        """
+        if doc.get("oversized"):
+            return [], []
+        entry = fold_entry(doc)
+        balance_incs: Dict[tuple, int] = {}
+        for holder, token_id, value in doc["deltas"]:
+            balance_incs[(holder, token_id)] = balance_incs.get((holder, token_id), 0) + value
+
+        token_incs: Dict[tuple, int] = {}
+        if doc["event"] == "CreditsIssued":
+            token_incs[(doc["token_id"], "issued")] = doc["amount"]
+        elif doc["event"] == "CreditsRetired":
+            token_incs[(doc["token_id"], "retired")] = doc["amount"]
+        elif doc["event"] in ("TransferSingle", "TransferBatch"):
+            for token_id, value in zip(doc["token_ids"], doc["values"]):
+                if doc["sender"] == ZERO_ADDRESS:
+                    token_incs[(token_id, "supply")] = token_incs.get((token_id, "supply"), 0) + value
+                if doc["receiver"] == ZERO_ADDRESS:
+                    token_incs[(token_id, "supply")] = token_incs.get((token_id, "supply"), 0) - value
+
+        # One op per target document, carrying all of this event's increments
+        balance_targets = {
+            (("holder", holder), ("token_id", token_id)): {"balance": value}
+            for (holder, token_id), value in balance_incs.items()
+        }
+        token_targets: Dict[tuple, Dict[str, int]] = {}
+        for (token_id, field), value in token_incs.items():
+            token_targets.setdefault((("_id", token_id),), {})[field] = value
+
+        def ops(targets, on_insert):
+            if sign == 1:
+                ensure = [UpdateOne(dict(key), {"$setOnInsert": on_insert}, upsert=True) for key in targets]
+                folds = [
+                    UpdateOne(
+                        {**dict(key), "applied": {"$ne": entry}},
+                        {"$inc": inc, "$addToSet": {"applied": entry}},
+                    )
+                    for key, inc in targets.items()
+                ]
+                return ensure + folds
+            return [
+                UpdateOne(
+                    {**dict(key), "applied": entry},
+                    {"$inc": {field: -value for field, value in inc.items()}, "$pull": {"applied": entry}},
+                )
+                for key, inc in targets.items()
+            ]
+
+        return ops(balance_targets, {"balance": 0, "applied": []}), ops(token_targets, {"applied": []})
+
+    def _apply(self, docs: List[Dict[str, Any]], sign: int):
+        balance_ops, token_ops = [], []
+        for doc in docs:
+            balances, tokens = self._folds(doc, sign)
+            balance_ops.extend(balances)
+            token_ops.extend(tokens)
+        # ordered: a target must exist before the conditional $inc that follows it
+        if balance_ops:
+            self.balances.bulk_write(balance_ops, ordered=True)
+        if token_ops:
+            self.tokens.bulk_write(token_ops, ordered=True)
+
+    # ----------------- INDEXING -----------------
+    def _store(self, docs: List[Dict[str, Any]]):
+        if not docs:
+            return
+        self.events.bulk_write(
+            [UpdateOne({"_id": doc["_id"]}, {"$setOnInsert": {**doc, "folded": False}}, upsert=True) for doc in docs],
+            ordered=False,
+        )
+        self._fold_pending()
+
+    def _fold_pending(self):
+        """Fold stored events not yet marked folded, including any a crash left behind"""
+        pending = list(self.events.find({"folded": False}).sort([("block_number", ASCENDING), ("log_index", ASCENDING)]))
+        if not pending:
+            return
+        self._apply(pending, 1)
+        self.events.update_many({"_id": {"$in": [doc["_id"] for doc in pending]}}, {"$set": {"folded": True}})
+
+    def _prune_applied(self, below_block: int):
+        """Drop fold markers of events too deep to be refolded or rewound"""
+        horizon = f"{max(below_block, 0):012d}:"
+        for collection in (self.balances, self.tokens):
+            collection.update_many({"applied": {"$lt": horizon}}, {"$pull": {"applied": {"$lt": horizon}}})
+
+    def _rewind(self, to_block: int):
+        """Undo everything above to_block after a reorg deeper than the confirmation depth
+
+        Undos are conditional on each target's `applied` markers, so a rewind that
+        died before the delete can simply run again.
+        """
+        stale = list(self.events.find({"block_number": {"$gt": to_block}}))
+        self._apply(stale, -1)
+        self.events.delete_many({"block_number": {"$gt": to_block}})
+        self._save_checkpoint(to_block)
+        logger.info(f"↩️  Reorg: rewound index to block {to_block} ({len(stale)} events dropped)")
+
+    def _fork_point(self, block: int) -> int:
+        """Newest block at or below `block` whose stored events are still on the chain"""
+        floor = max(block - self.max_reorg_depth, self.start_block - 1)
+        checked = None
+        events = self.events.find(
+            {"block_number": {"$gt": floor, "$lte": block}}, {"block_number": 1, "block_hash": 1}
+        ).sort("block_number", DESCENDING)
+        for event in events:
+            if event["block_number"] == checked:
+                continue
+            checked = event["block_number"]
+            if self.w3.eth.get_block(checked).hash.hex() == event["block_hash"]:
+                return checked
+        if floor > self.start_block - 1:
+            logger.warning(f"⚠️  Reorg may reach below block {floor}; events under it are not re-checked")
+        return floor
+
+    def _reorged(self, checkpoint: Dict[str, Any]) -> bool:
+        if checkpoint["block_hash"] is None or checkpoint["block"] < 0:
+            return False
+        return self.w3.eth.get_block(checkpoint["block"]).hash.hex() != checkpoint["block_hash"]
+
+    def _get_logs(self, from_block: int, to_block: int):
+        return self.w3.eth.get_logs(
+            {
+                "address": self.client.contract_address,
+                "fromBlock": from_block,
+                "toBlock": to_block,
+                "topics": [list(self.decoders)],
+            }
+        )
+
+    def run_once(self) -> int:
+        """Index from the checkpoint up to head - confirmations; returns events stored"""
+        checkpoint = self.checkpoint()
+        if self._reorged(checkpoint):
+            self._rewind(self._fork_point(checkpoint["block"]))
+            checkpoint = self.checkpoint()
+        self._fold_pending()
+
+        safe_head = self.w3.eth.block_number - self.confirmations
+        from_block = checkpoint["block"] + 1
+        stored = 0
+
+        while from_block <= safe_head:
+            to_block = min(from_block + self.block_range - 1, safe_head)
+            try:
+                logs = self._get_logs(from_block, to_block)
+            except Exception as e:
+                # Nodes cap range or result size; shrink the window and retry
+                if self.block_range == 1:
+                    raise
+                self.block_range = max(1, self.block_range // 2)
+                logger.warning(f"⚠️  getLogs {from_block}-{to_block} refused ({e}); range → {self.block_range}")
+                continue
+
+            docs = [doc for doc in (self._decode(log) for log in logs) if doc]
+            self._store(docs)
+            self._save_checkpoint(to_block)
+            stored += len(docs)
+
+            if len(logs) < self.target_logs // 2:
+                self.block_range = min(self.block_range * 2, self.max_range)
+            elif len(logs) > self.target_logs:
+                self.block_range = max(1, self.block_range // 2)
+            from_block = to_block + 1
+
+        # Only the last max_reorg_depth blocks can be rewound; older markers are dead weight
+        self._prune_applied(self.checkpoint()["block"] - self.max_reorg_depth)
+        return stored
+
+    # ----------------- READS -----------------
+    def holder_balances(self, holder: str) -> List[Dict[str, Any]]:
+        return list(
+            self.balances.find(
+                {"holder": Web3.to_checksum_address(holder), "balance": {"$ne": 0}},
+                {"_id": 0, "token_id": 1, "balance": 1},
+            ).sort("token_id", ASCENDING)
+        )
+
+    def token_totals(self, token_id: int) -> Dict[str, Any]:
+        doc = self.tokens.find_one({"_id": token_id}) or {}
+        return {
+            "token_id": token_id,
+            "issued": doc.get("issued", 0),
+            "retired": doc.get("retired", 0),
+            "supply": doc.get("supply", 0),
+        }
+
+    def status(self) -> Dict[str, Any]:
+        checkpoint = self.checkpoint()
+        return {
+            "indexed_block": checkpoint["block"],
+            "block_hash": checkpoint["block_hash"],
+            "confirmations": self.confirmations,
+            "block_range": self.block_range,
+            "oversized_events": self.events.count_documents({"oversized": True}),
+        }
+
+    # ----------------- BACKGROUND -----------------
+    async def _run(self):
+        while True:
+            try:
+                stored = await asyncio.to_thread(self.run_once)
+                if stored:
+                    logger.info(f"🗃️  Indexed {stored} chain events")
+            except Exception as e:
+                logger.warning(f"⚠️  Indexer pass failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def start(self):
+        await asyncio.to_thread(self.ensure_indexes)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,213 @@
+"""
+Declarative index spec for every BlueCarbon collection, plus a query audit
+
+INDEXES is applied idempotently at startup (create_indexes is a no-op for
+indexes that already exist). QUERIES mirrors the filters and sorts the data
+layer issues; the audit explains each one and flags collection scans and
+in-memory sorts so a missing index shows up before production load does.
+
+    python -m app.indexes apply
+    python -m app.indexes audit
+"""
+
+import logging
+import sys
+from datetime import datetime
+from typing import Dict, Any, List, Iterable, Optional
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "projects": [
+        IndexModel([("project_id", ASCENDING)], unique=True),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "transactions": [
+        IndexModel([("tx_hash", ASCENDING)]),
+        IndexModel([("status", ASCENDING)]),
+        IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("project_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("project_id", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "users": [
+        IndexModel([("wallet_address", ASCENDING)]),
+    ],
+    "plots": [
+        IndexModel([("ID", ASCENDING)], unique=True),
+        IndexModel([("location", GEOSPHERE)]),
+    ],
+    "plot_rollups": [
+        IndexModel([("dimension", ASCENDING), ("key", ASCENDING)], unique=True),
+    ],
+    "plot_tiles": [
+        IndexModel([("z", ASCENDING), ("x", ASCENDING), ("y", ASCENDING)]),
+    ],
+    "chain_events": [
+        IndexModel([("block_number", DESCENDING)]),
+        IndexModel([("token_id", ASCENDING), ("block_number", DESCENDING)]),
+        IndexModel([("event", ASCENDING), ("block_number", DESCENDING)]),
+        IndexModel([("folded", ASCENDING)]),
+    ],
+    "chain_balances": [
+        IndexModel([("holder", ASCENDING), ("token_id", ASCENDING)], unique=True),
+        IndexModel([("applied", ASCENDING)]),
+    ],
+    "chain_tokens": [
+        IndexModel([("applied", ASCENDING)]),
+    ],
+}
+
+
+def apply_indexes(db, collections: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """Create the spec'd indexes (all collections, or just the named ones)"""
+    created = {}
+    for name in collections or INDEXES:
+        try:
+            created[name] = db[name].create_indexes(INDEXES[name])
+        except OperationFailure as e:
+            # Conflicting options or duplicate keys under a unique index: report, keep serving
+            logger.error(f"❌ Index build on {name} failed: {e}")
+    return created
+
+
+# name → (collection, find or aggregate command body); values are placeholders
+SAMPLE_TIME = datetime(2024, 1, 1)
+QUERIES: Dict[str, tuple] = {
+    "get_project": ("projects", {"find": "projects", "filter": {"project_id": "KOD001"}, "limit": 1}),
+    "get_projects": (
+        "projects",
+        {"aggregate": "projects", "pipeline": [{"$sort": {"created_at": -1}}, {"$limit": 10}], "cursor": {}},
+    ),
+    "get_transaction": ("transactions", {"find": "transactions", "filter": {"tx_hash": "0x00"}, "limit": 1}),
+    "get_pending_transactions": (
+        "transactions",
+        {"find": "transactions", "filter": {"status": {"$in": ["pending", "settling"]}}},
+    ),
+    "get_transaction_history(project)": (
+        "transactions",
+        {
+            "aggregate": "transactions",
+            "pipeline": [{"$match": {"project_id": "KOD001"}}, {"$sort": {"timestamp": -1}}, {"$limit": 50}],
+            "cursor": {},
+        },
+    ),
+    "get_transaction_history(all)": (
+        "transactions",
+        {"aggregate": "transactions", "pipeline": [{"$sort": {"timestamp": -1}}, {"$limit": 50}], "cursor": {}},
+    ),
+    "get_projects_page": (
+        "projects",
+        {
+            "find": "projects",
+            "filter": {"$or": [{"created_at": {"$lt": SAMPLE_TIME}}, {"created_at": SAMPLE_TIME, "_id": {"$lt": 0}}]},
+            "sort": {"created_at": -1, "_id": -1},
+            "limit": 11,
+        },
+    ),
+    "get_transactions_page(project)": (
+        "transactions",
+        {
+            "find": "transactions",
+            "filter": {
+                "project_id": "KOD001",
+                "$or": [{"timestamp": {"$lt": SAMPLE_TIME}}, {"timestamp": SAMPLE_TIME, "_id": {"$lt": 0}}],
+            },
+            "sort": {"timestamp": -1, "_id": -1},
+            "limit": 51,
+        },
+    ),
+    "get_transactions_page(all)": (
+        "transactions",
+        {"find": "transactions", "sort": {"timestamp": -1, "_id": -1}, "limit": 51},
+    ),
+    "export_transactions(project)": (
+        "transactions",
+        {"find": "transactions", "filter": {"project_id": "KOD001", "_id": {"$gt": 0}}, "sort": {"_id": 1}},
+    ),
+    "export_plots": ("plots", {"find": "plots", "filter": {"ID": {"$gt": "PLOT_0001"}}, "sort": {"ID": 1}}),
+    "get_user_by_wallet": ("users", {"find": "users", "filter": {"wallet_address": "0x00"}, "limit": 1}),
+    "upsert_plots(old versions)": ("plots", {"find": "plots", "filter": {"ID": {"$in": ["PLOT_0001"]}}}),
+    "plots_near": (
+        "plots",
+        {
+            "find": "plots",
+            "filter": {
+                "location": {"$nearSphere": {"$geometry": {"type": "Point", "coordinates": [80, 12]}, "$maxDistance": 1000}}
+            },
+            "limit": 100,
+        },
+    ),
+    "rollup_groups": ("plot_rollups", {"find": "plot_rollups", "filter": {"dimension": "Project_Type"}}),
+    "tile_cells": (
+        "plot_tiles",
+        {"find": "plot_tiles", "filter": {"z": 3, "x": {"$gte": 0, "$lt": 8}, "y": {"$gte": 0, "$lt": 8}}},
+    ),
+    "holder_balances": (
+        "chain_balances",
+        {
+            "find": "chain_balances",
+            "filter": {"holder": "0x00", "balance": {"$ne": 0}},
+            "sort": {"token_id": 1},
+        },
+    ),
+    "indexer_rewind": ("chain_events", {"find": "chain_events", "filter": {"block_number": {"$gt": 0}}}),
+}
+
+
+def _stages(node, winning: bool = False) -> List[str]:
+    """Plan stages of the winning plan(s) in an explain document"""
+    found = []
+    if isinstance(node, dict):
+        if winning and isinstance(node.get("stage"), str):
+            found.append(node["stage"])
+        for key, value in node.items():
+            if key in ("rejectedPlans", "command"):
+                continue
+            if key == "$sort":
+                found.append("$sort")  # aggregation sort not absorbed into the query plan
+            found.extend(_stages(value, winning or key == "winningPlan"))
+    elif isinstance(node, list):
+        for value in node:
+            found.extend(_stages(value, winning))
+    return found
+
+
+def audit(db) -> List[Dict[str, Any]]:
+    """Explain every entry in QUERIES; problems lists COLLSCAN / in-memory SORT"""
+    report = []
+    for name, (collection, command) in QUERIES.items():
+        try:
+            explain = db.command("explain", command, verbosity="queryPlanner")
+        except OperationFailure as e:
+            report.append({"query": name, "collection": collection, "problems": [f"explain failed: {e}"]})
+            continue
+        stages = _stages(explain)
+        problems = sorted({s for s in stages if s in ("COLLSCAN", "SORT", "$sort")})
+        report.append({"query": name, "collection": collection, "stages": stages, "problems": problems})
+    return report
+
+
+if __name__ == "__main__":
+    from app.database import db_client
+    from app.logs import configure_logging
+
+    configure_logging()
+
+    command = sys.argv[1:]
+    if command == ["apply"]:
+        for name, indexes in apply_indexes(db_client.sync_db).items():
+            print(f"📇 {name}: {', '.join(indexes)}")
+    elif command == ["audit"]:
+        flagged = 0
+        for entry in audit(db_client.sync_db):
+            if entry["problems"]:
+                flagged += 1
+                print(f"⚠️  {entry['query']:34s} {entry['collection']:15s} {', '.join(entry['problems'])}")
+            else:
+                print(f"✅ {entry['query']:34s} {entry['collection']:15s}")
+        sys.exit(1 if flagged else 0)
+    else:
+        sys.exit("usage: python -m app.indexes apply|audit")
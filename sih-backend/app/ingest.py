@@ -0,0 +1,150 @@
+"""
+Streaming plot ingestion (replaces upsert-plots.js)
+
+Reads plots.csv-format files (plain or .gz) in fixed-size chunks, parses the
+typed columns vectorized per chunk, and upserts by ID in bounded unordered
+bulk batches with a few batches in flight. A batch sharing plot IDs with one
+still in flight waits for it, since both would fold the same old version out
+of the rollups. Memory stays bounded by chunk_rows + workers * batch_size rows
+regardless of file size.
+
+    python -m app.ingest plots.csv [more.csv.gz ...] --batch-size 1000 --workers 4
+"""
+
+import logging
+import argparse
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, List, Set
+
+import numpy as np
+import pandas as pd
+
+from app.plot_schema import NUMERIC_COLUMNS
+from app.rollups import PlotRollups
+
+logger = logging.getLogger(__name__)
+
+
+def parse_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Type one chunk of raw CSV strings into plot columns"""
+    for column in NUMERIC_COLUMNS:
+        if column in chunk:
+            chunk[column] = pd.to_numeric(chunk[column], errors="coerce")
+
+    if "Timestamp" not in chunk:
+        chunk["Timestamp"] = None
+    chunk["Timestamp"] = pd.to_datetime(chunk["Timestamp"], utc=True, errors="coerce")
+
+    # Monitoring_Year: digits of the given value, else the Timestamp year
+    year = pd.Series(np.nan, index=chunk.index)
+    if "Monitoring_Year" in chunk:
+        digits = chunk["Monitoring_Year"].astype("string").str.replace(r"[^0-9]", "", regex=True)
+        year = pd.to_numeric(digits, errors="coerce")
+    chunk["Monitoring_Year"] = year.fillna(chunk["Timestamp"].dt.year).astype("Int64")
+
+    if "Data_Source" in chunk:
+        source = chunk["Data_Source"].astype("string").str.strip()
+        chunk["Data_Source"] = source.mask(source == "")
+    else:
+        chunk["Data_Source"] = None
+    return chunk
+
+
+def to_documents(chunk: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Rows of a parsed chunk as Mongo documents (NaN/NaT → None)"""
+    now = datetime.now(timezone.utc)
+    lat = chunk["GPS_Lat"].fillna(0).to_numpy()
+    lon = chunk["GPS_Long"].fillna(0).to_numpy()
+
+    records = chunk.astype(object).where(chunk.notna(), None).to_dict("records")
+    for record, x, y in zip(records, lon, lat):
+        if record["Timestamp"] is not None:
+            record["Timestamp"] = record["Timestamp"].to_pydatetime()
+        if record["Monitoring_Year"] is not None:
+            record["Monitoring_Year"] = int(record["Monitoring_Year"])
+        record["location"] = {"type": "Point", "coordinates": [float(x), float(y)]}
+        record["updated_at"] = now
+    return records
+
+
+def read_plots(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    reader = pd.read_csv(
+        path,
+        chunksize=chunk_rows,
+        dtype=str,
+        keep_default_na=False,
+        na_values=[""],
+        compression="infer",
+    )
+    for chunk in reader:
+        yield parse_chunk(chunk)
+
+
+def ingest(
+    paths: List[str], rollups: PlotRollups, batch_size: int, workers: int, chunk_rows: int
+) -> Dict[str, Any]:
+    totals = {"rows": 0, "upserted": 0, "modified": 0}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight: Dict[Future, Set[Any]] = {}  # batch → its plot IDs
+
+        def settle(done):
+            for future in done:
+                del in_flight[future]
+                result = future.result()
+                totals["upserted"] += result["upserted"]
+                totals["modified"] += result["modified"]
+
+        for path in paths:
+            for chunk in read_plots(path, chunk_rows):
+                docs = to_documents(chunk)
+                for i in range(0, len(docs), batch_size):
+                    batch = docs[i : i + batch_size]
+                    ids = {doc["ID"] for doc in batch}
+                    # Rows for the same plot must not be in two batches at once
+                    clashing = [future for future, batch_ids in in_flight.items() if not ids.isdisjoint(batch_ids)]
+                    if clashing:
+                        settle(wait(clashing).done)
+                    # Cap in-flight batches so memory stays bounded
+                    if len(in_flight) >= workers:
+                        settle(wait(in_flight, return_when=FIRST_COMPLETED).done)
+                    in_flight[pool.submit(rollups.upsert_plots, batch)] = ids
+                totals["rows"] += len(docs)
+
+                elapsed = time.perf_counter() - start
+                logger.info(f"📥 {totals['rows']:,} rows ({totals['rows'] / elapsed:,.0f} rows/s)")
+
+        settle(wait(list(in_flight)).done)
+
+    totals["seconds"] = time.perf_counter() - start
+    totals["rows_per_sec"] = totals["rows"] / totals["seconds"] if totals["seconds"] else 0
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream plot CSVs into MongoDB")
+    parser.add_argument("paths", nargs="+", help="plots.csv-format files (.csv or .csv.gz)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="documents per bulk write")
+    parser.add_argument("--workers", type=int, default=4, help="bulk writes in flight")
+    parser.add_argument("--chunk-rows", type=int, default=50000, help="CSV rows parsed at a time")
+    args = parser.parse_args()
+
+    from app.database import db_client
+    from app.logs import configure_logging
+
+    configure_logging()
+    rollups = PlotRollups(db_client.sync_db)
+    rollups.ensure_indexes()
+    totals = ingest(args.paths, rollups, args.batch_size, args.workers, args.chunk_rows)
+    print(
+        f"✅ Ingested {totals['rows']:,} rows in {totals['seconds']:.1f}s "
+        f"({totals['rows_per_sec']:,.0f} rows/s): "
+        f"{totals['upserted']:,} upserted, {totals['modified']:,} modified"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,312 +1,889 @@
-"""
-BlueCarbon API Server - Integrated with Blockchain + MongoDB
-"""
-
-from fastapi import FastAPI, HTTPException, Depends
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, validator
-from typing import Optional, Dict, Any
-from datetime import datetime, timezone
-from web3 import Web3
-import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Import blockchain + db
-from app.blockchain import bluecarbon_client
-from app.database import db_client
-
-# Create FastAPI app
-app = FastAPI(
-    title="BlueCarbon API - South India Carbon Registry",
-    description="API for managing carbon credits from South Indian projects",
-    version="1.0.0",
-)
-
-# =======================
-#   AUTH (very simple)
-# =======================
-security = HTTPBearer()
-
-def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    if credentials.credentials != "admin-token-123":
-        raise HTTPException(status_code=401, detail="Invalid admin token")
-    return credentials.credentials
-
-def verify_minter_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    if credentials.credentials != "minter-token-456":
-        raise HTTPException(status_code=401, detail="Invalid minter token")
-    return credentials.credentials
-
-# =======================
-#   Pydantic Models
-# =======================
-class RegisterProjectRequest(BaseModel):
-    project_id: str
-    metadata_cid: str
-    name: str
-    description: str
-    project_type: str
-    location: str
-
-    @validator("project_id")
-    def project_id_must_not_be_empty(cls, v):
-        if not v.strip():
-            raise ValueError("project_id cannot be empty")
-        return v.strip()
-
-class IssueCreditsRequest(BaseModel):
-    to_address: str
-    project_id: str
-    amount: int
-    proof_cid: str
-
-    @validator("to_address")
-    def validate_address(cls, v):
-        if not Web3.is_address(v):
-            raise ValueError("Invalid Ethereum address")
-        return Web3.to_checksum_address(v)
-
-    @validator("amount")
-    def amount_must_be_positive(cls, v):
-        if v <= 0:
-            raise ValueError("amount must be greater than 0")
-        return v
-
-class RetireCreditsRequest(BaseModel):
-    project_id: str
-    amount: int
-
-    @validator("amount")
-    def amount_must_be_positive(cls, v):
-        if v <= 0:
-            raise ValueError("amount must be greater than 0")
-        return v
-
-# =======================
-#   ROUTES
-# =======================
-@app.get("/")
-async def root():
-    projects = db_client.get_projects()
-    total_projects = len(projects)
-    total_credits = sum(p.get("balances", {}).get("total_issued", 0) for p in projects)
-
-    return {
-        "message": "🌿 BlueCarbon API - South India Carbon Registry",
-        "version": "1.0.0",
-        "status": "ready",
-        "projects": total_projects,
-        "total_credits_issued": total_credits,
-        "network": "Celo Alfajores",
-        "contract_in_use": bluecarbon_client.contract_address,
-    }
-
-@app.get("/health")
-async def health_check():
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now(timezone.utc),
-        "database": db_client.db.name,
-        "blockchain": {
-            "connected": bluecarbon_client.w3.is_connected(),
-            "contract": bluecarbon_client.contract_address,
-        },
-        "projects_count": db_client.projects.count_documents({}),
-    }
-
-@app.get("/projects")
-async def list_projects(limit: int = 10, skip: int = 0):
-    """List all projects from DB"""
-    return db_client.get_projects(limit=limit, skip=skip)
-
-@app.get("/projects/{project_id}")
-async def get_project(project_id: str):
-    """Get project details"""
-    project = db_client.get_project(project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail=f"Project '{project_id}' not found")
-    return project
-
-@app.post("/projects/register")
-async def register_project(
-    request: RegisterProjectRequest, admin_token: str = Depends(verify_admin_token)
-):
-    """Register a new carbon project (Admin only)"""
-    if db_client.get_project(request.project_id):
-        raise HTTPException(status_code=400, detail=f"Project '{request.project_id}' already exists")
-
-    tx = bluecarbon_client.register_project(
-        request.project_id, request.metadata_cid, os.getenv("ADMIN_PRIVATE_KEY")
-    )
-
-    project_data = {
-        "project_id": request.project_id,
-        "name": request.name,
-        "description": request.description,
-        "project_type": request.project_type,
-        "location": request.location,
-        "status": "active",
-        "balances": {"total_issued": 0, "total_retired": 0, "circulating": 0},
-    }
-    db_client.store_project(project_data)
-    db_client.log_transaction("project_registration", tx["tx_hash"], project_data)
-
-    return {"success": True, "tx": tx, "message": f"Project '{request.name}' registered successfully!"}
-
-@app.post("/credits/issue")
-async def issue_credits(
-    request: IssueCreditsRequest, minter_token: str = Depends(verify_minter_token)
-):
-    """Issue carbon credits (Minter only)"""
-    project = db_client.get_project(request.project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail=f"Project '{request.project_id}' not found")
-
-    tx = bluecarbon_client.issue_credits(
-        request.to_address,
-        request.project_id,
-        request.amount,
-        request.proof_cid,
-        os.getenv("MINTER_PRIVATE_KEY"),
-    )
-
-    db_client.update_project_balance(request.project_id, request.amount, operation="issue")
-    db_client.log_transaction("credit_issuance", tx["tx_hash"], request.dict())
-
-    return {"success": True, "tx": tx, "message": f"{request.amount} credits issued successfully!"}
-
-@app.post("/credits/retire")
-async def retire_credits(request: RetireCreditsRequest):
-    """Retire carbon credits"""
-    project = db_client.get_project(request.project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail=f"Project '{request.project_id}' not found")
-
-    if project.get("balances", {}).get("circulating", 0) < request.amount:
-        raise HTTPException(status_code=400, detail=f"Insufficient credits. Available: {project.get('balances', {}).get('circulating', 0)}")
-
-    token_id = bluecarbon_client.get_project_token_id(request.project_id)
-    tx = bluecarbon_client.retire_credits(token_id, request.amount, os.getenv("USER_PRIVATE_KEY"))
-
-    db_client.update_project_balance(request.project_id, request.amount, operation="retire")
-    db_client.log_transaction("credit_retirement", tx["tx_hash"], request.dict())
-
-    return {"success": True, "tx": tx, "message": f"{request.amount} credits retired successfully!"}
-
-@app.get("/projects/{project_id}/history")
-async def get_project_history(project_id: str, limit: int = 50):
-    """Get project history"""
-    return db_client.get_transaction_history(project_id, limit)
-
-@app.get("/balance/{address}/{project_id}")
-async def get_balance(address: str, project_id: str):
-    """Get balance of an address for a project"""
-    if not Web3.is_address(address):
-        raise HTTPException(status_code=400, detail="Invalid address")
-
-    token_id = bluecarbon_client.get_project_token_id(project_id)
-    balance = bluecarbon_client.get_balance_of(address, token_id)
-
-    return {"address": Web3.to_checksum_address(address), "project_id": project_id, "token_id": token_id, "balance": balance}
-
-# =======================
-#   REGISTRY ROUTES
-# =======================
-@app.get("/registry/{name}")
-async def get_registry_entry(name: str):
-    """Fetch the contract address for a given name from the registry"""
-    try:
-        addr = bluecarbon_client.registry.functions.getContract(name).call()
-        if addr == "0x0000000000000000000000000000000000000000":
-            raise HTTPException(status_code=404, detail=f"No contract found for '{name}'")
-        return {"name": name, "address": addr}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/registry/update")
-async def update_registry_entry(
-    name: str, new_address: str, admin_token: str = Depends(verify_admin_token)
-):
-    """Update the registry with a new contract address (Admin only)"""
-    try:
-        acct = bluecarbon_client.w3.eth.account.from_key(os.getenv("ADMIN_PRIVATE_KEY"))
-        nonce = bluecarbon_client.w3.eth.get_transaction_count(acct.address)
-
-        txn = bluecarbon_client.registry.functions.updateContract(name, new_address).build_transaction(
-            {
-                "from": acct.address,
-                "nonce": nonce,
-                "chainId": int(os.getenv("CHAIN_ID")),
-                "gas": 300000,
-                "gasPrice": bluecarbon_client.w3.eth.gas_price,
-            }
-        )
-
-        result = bluecarbon_client._send_transaction(txn, os.getenv("ADMIN_PRIVATE_KEY"))
-        return {"success": True, "tx": result, "message": f"Registry updated: {name} → {new_address}"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-# =======================
-#   ANALYTICS ROUTES
-# =======================
-@app.get("/analytics/plots-overview")
-async def plots_overview():
-    total_plots = db_client.plots.count_documents({})
-    plots_by_type = list(db_client.plots.aggregate([
-        {"$group": {"_id": "$Project_Type", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]))
-    return {"total_plots": total_plots, "by_type": plots_by_type}
-
-@app.get("/analytics/ndvi-by-project")
-async def ndvi_by_project():
-    pipeline = [
-        {"$group": {"_id": "$Project_Type", "avgNDVI": {"$avg": "$NDVI"}}},
-        {"$sort": {"avgNDVI": -1}}
-    ]
-    return {"ndvi": list(db_client.plots.aggregate(pipeline))}
-
-@app.get("/analytics/biomass-trend")
-async def biomass_trend():
-    pipeline = [
-        {"$group": {
-            "_id": "$Monitoring_Year",
-            "avgAbove": {"$avg": "$Biomass_above_kg"},
-            "avgBelow": {"$avg": "$Biomass_below_kg"},
-            "total": {"$sum": {"$add": ["$Biomass_above_kg", "$Biomass_below_kg"]}}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
-    return {"biomass": list(db_client.plots.aggregate(pipeline))}
-
-@app.get("/analytics/fluxes")
-async def fluxes():
-    co2 = list(db_client.plots.aggregate([
-        {"$group": {"_id": "$Monitoring_Year", "avgCO2": {"$avg": "$CO2_Flux_mg_m2_day"}}},
-        {"$sort": {"_id": 1}}
-    ]))
-    ch4 = list(db_client.plots.aggregate([
-        {"$group": {"_id": "$Monitoring_Year", "avgCH4": {"$avg": "$CH4_Flux_mg_m2_day"}}},
-        {"$sort": {"_id": 1}}
-    ]))
-    return {"co2": co2, "ch4": ch4}
-
-@app.get("/analytics/ndvi-monthly")
-async def ndvi_monthly():
-    pipeline = [
-        {"$addFields": {"month": {"$month": "$Timestamp"}, "year": {"$year": "$Timestamp"}}},
-        {"$group": {"_id": {"year": "$year", "month": "$month"}, "avgNDVI": {"$avg": "$NDVI"}}},
-        {"$sort": {"_id.year": 1, "_id.month": 1}}
-    ]
-    return {"trend": list(db_client.plots.aggregate(pipeline))}
-
-# Startup
-if __name__ == "__main__":
-    import uvicorn
-    print("🚀 Starting BlueCarbon API...")
-    print(f"🔗 Contract in use from registry: {bluecarbon_client.contract_address}")
-    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8000)), reload=True)
+"""
+BlueCarbon API Server - Integrated with Blockchain + MongoDB
+"""
+
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pydantic import BaseModel, validator
+from typing import Optional, Dict, Any, List
+from datetime import datetime, timezone
+from web3 import Web3
+import logging
+import asyncio
+import os
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Import blockchain + db
+from app.blockchain import bluecarbon_client
+from app.database import db_client
+from app.tx_tracker import ReceiptTracker
+from app.token_cache import TokenIdCache
+from app.indexer import ChainEventIndexer
+from app.health import HealthMonitor
+from app.rollups import PlotRollups
+from app.registry_stats import RegistryStats
+from app.reconcile import BalanceReconciler
+from app.aggregation import AggregationEngine, AggregateRequest, compile_pipeline, dashboard_filters
+from app.geo import MongoPlotSearch, GridPlotSearch, parse_fields, bbox_polygon, polygon
+from app.streaming import iter_ndjson, iter_csv, gzip_stream
+from app.export import Exporter, select_fields, PLOT_EXPORT_FIELDS, TRANSACTION_EXPORT_FIELDS
+from app.indexes import apply_indexes
+from app.pagination import decode_cursor, split_page
+from app.responses import BSONResponse, projection
+from app.logs import configure_logging
+from app.metrics import render as render_metrics, HTTP_REQUEST_SECONDS, HTTP_IN_FLIGHT, TX_IN_FLIGHT, watch_caches
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# "sync" waits for each receipt inside the request, "async" returns the hash
+# right away and lets the receipt tracker settle balances once it is mined
+TX_SUBMISSION_MODE = os.getenv("TX_SUBMISSION_MODE", "sync").lower()
+WAIT_FOR_RECEIPT = TX_SUBMISSION_MODE != "async"
+
+# Share nonce counters with every worker process signing with the same keys
+bluecarbon_client.nonces.store = db_client.sync_db["nonces"]
+
+token_ids = TokenIdCache(bluecarbon_client, db_client)
+tx_tracker = ReceiptTracker(bluecarbon_client, db_client, token_ids=token_ids)
+indexer = ChainEventIndexer(bluecarbon_client, db_client.sync_db)
+INDEXER_ENABLED = os.getenv("INDEXER_ENABLED", "0") == "1"
+# Checks project balances against totalSupply every RECONCILE_INTERVAL seconds (0 = off)
+reconciler = BalanceReconciler(bluecarbon_client, db_client.sync_db)
+
+# Dependency checks run in the background; /readyz and /health read the cache
+health = HealthMonitor(bluecarbon_client, db_client.sync_db, indexer=indexer if INDEXER_ENABLED else None)
+
+# "rollups" serves /analytics/* from plot_rollups, "columnar" from in-memory
+# NumPy columns, "mongo" scans plots per request
+ANALYTICS_SOURCE = os.getenv("ANALYTICS_SOURCE", "rollups").lower()
+rollups = PlotRollups(db_client.sync_db)
+registry_stats = RegistryStats(db_client.sync_db)
+analytics_backend = None
+if ANALYTICS_SOURCE == "rollups":
+    analytics_backend = rollups
+elif ANALYTICS_SOURCE == "columnar":
+    from app.columnar import PlotColumnStore
+
+    analytics_backend = PlotColumnStore(db_client.sync_db)
+
+# Ad-hoc group-bys over plots, and the fallback for the fixed charts
+aggregations = AggregationEngine(db_client, generation=rollups.generation)
+
+# Scrape-time gauges over state the workers already keep
+TX_IN_FLIGHT.set_function(
+    lambda: {(tx_type,): count for tx_type, count in Counter(tx["type"] for tx in tx_tracker.in_flight.values()).items()}
+)
+watch_caches(
+    {
+        "token_id": lambda: (token_ids.hits, token_ids.misses),
+        "aggregation_results": lambda: (aggregations.hits, aggregations.misses),
+        "aggregation_pipelines": lambda: compile_pipeline.cache_info()[:2],
+    }
+)
+
+# Geospatial plot search: the 2dsphere index, or an in-memory grid over the
+# plots CSV when running against mock data (ENABLE_DB=0)
+ENABLE_DB = os.getenv("ENABLE_DB", "1") != "0"
+MOCK_PLOTS_CSV = os.getenv(
+    "MOCK_PLOTS_CSV", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plots.csv")
+)
+plot_search = MongoPlotSearch(db_client.sync_db) if ENABLE_DB else GridPlotSearch()
+PLOT_QUERY_MAX_LIMIT = int(os.getenv("PLOT_QUERY_MAX_LIMIT", 10000))
+
+# Bulk exports stream straight off a Mongo cursor, EXPORT_BATCH_SIZE rows at a time
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+EXPORT_MAX_BATCH_SIZE = int(os.getenv("EXPORT_MAX_BATCH_SIZE", 10000))
+exporter = Exporter(db_client.sync_db, batch_size=EXPORT_BATCH_SIZE)
+
+# =======================
+#   STARTUP / READINESS
+# =======================
+startup_state: Dict[str, Any] = {"ready": False, "error": None, "started_at": None, "ready_at": None}
+
+# Served while dependencies are still connecting
+PROBE_PATHS = {"/livez", "/readyz", "/metrics", "/docs", "/openapi.json"}
+
+
+async def initialize():
+    """Open RPC and Mongo connections concurrently, then start background workers"""
+    startup_state["started_at"] = time.perf_counter()
+    try:
+        await asyncio.gather(asyncio.to_thread(bluecarbon_client.connect), db_client.connect())
+        await asyncio.to_thread(apply_indexes, db_client.sync_db)
+        await token_ids.warmup()
+        await asyncio.to_thread(registry_stats.ensure_built)
+        # Map tiles live alongside the rollups, so build them whatever the source
+        await asyncio.to_thread(rollups.ensure_built)
+        if ANALYTICS_SOURCE == "columnar":
+            await asyncio.to_thread(analytics_backend.load)
+            analytics_backend.start_watching()
+        if ENABLE_DB:
+            await asyncio.to_thread(plot_search.ensure_indexes)
+        else:
+            await asyncio.to_thread(plot_search.load_csv, MOCK_PLOTS_CSV)
+        await tx_tracker.start()
+        if INDEXER_ENABLED:
+            await indexer.start()
+        await reconciler.start()
+        await health.start()
+    except Exception as e:
+        startup_state["error"] = str(e)
+        logger.error(f"❌ Startup failed: {e}")
+        return
+
+    startup_state["ready_at"] = time.perf_counter()
+    startup_state["ready"] = True
+    logger.info(f"🚀 Ready in {startup_state['ready_at'] - startup_state['started_at']:.2f}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Don't hold the server back: probes are answered while initialize() runs
+    init_task = asyncio.create_task(initialize())
+    yield
+    init_task.cancel()
+    await health.stop()
+    await tx_tracker.stop()
+    await indexer.stop()
+    await reconciler.stop()
+    if ANALYTICS_SOURCE == "columnar":
+        analytics_backend.stop_watching()
+
+
+# Create FastAPI app
+app = FastAPI(
+    title="BlueCarbon API - South India Carbon Registry",
+    description="API for managing carbon credits from South Indian projects",
+    version="1.0.0",
+    lifespan=lifespan,
+)
+
+
+@app.middleware("http")
+async def readiness_gate(request: Request, call_next):
+    if not startup_state["ready"] and request.url.path not in PROBE_PATHS:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service starting", "error": startup_state["error"]},
+        )
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Latency per route template (not raw path, so ids don't explode the label set)"""
+    start = time.perf_counter()
+    status = 500
+    HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status,
+        )
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition"""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/livez")
+async def livez():
+    """Liveness: the worker is up and serving"""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: started, and the last background dependency checks passed"""
+    if not startup_state["ready"]:
+        raise HTTPException(status_code=503, detail=startup_state["error"] or "starting")
+    snapshot = health.snapshot()
+    return JSONResponse(
+        status_code=200 if snapshot["ready"] else 503,
+        content={"status": "ready" if snapshot["ready"] else "degraded", **snapshot},
+    )
+
+# =======================
+#   AUTH (very simple)
+# =======================
+security = HTTPBearer()
+
+def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    if credentials.credentials != "admin-token-123":
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    return credentials.credentials
+
+def verify_minter_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    if credentials.credentials != "minter-token-456":
+        raise HTTPException(status_code=401, detail="Invalid minter token")
+    return credentials.credentials
+
+# =======================
+#   Pydantic Models
+# =======================
+class RegisterProjectRequest(BaseModel):
+    project_id: str
+    metadata_cid: str
+    name: str
+    description: str
+    project_type: str
+    location: str
+
+    @validator("project_id")
+    def project_id_must_not_be_empty(cls, v):
+        if not v.strip():
+            raise ValueError("project_id cannot be empty")
+        return v.strip()
+
+class IssueCreditsRequest(BaseModel):
+    to_address: str
+    project_id: str
+    amount: int
+    proof_cid: str
+
+    @validator("to_address")
+    def validate_address(cls, v):
+        if not Web3.is_address(v):
+            raise ValueError("Invalid Ethereum address")
+        return Web3.to_checksum_address(v)
+
+    @validator("amount")
+    def amount_must_be_positive(cls, v):
+        if v <= 0:
+            raise ValueError("amount must be greater than 0")
+        return v
+
+class RetireCreditsRequest(BaseModel):
+    project_id: str
+    amount: int
+
+    @validator("amount")
+    def amount_must_be_positive(cls, v):
+        if v <= 0:
+            raise ValueError("amount must be greater than 0")
+        return v
+
+class WithinRequest(BaseModel):
+    bbox: Optional[List[float]] = None  # [min_lon, min_lat, max_lon, max_lat]
+    polygon: Optional[List[List[float]]] = None  # [[lon, lat], ...]
+    fields: Optional[List[str]] = None
+    limit: int = 100
+    stream: bool = False
+
+class PortfolioRequest(BaseModel):
+    addresses: List[str]
+
+    @validator("addresses", each_item=True)
+    def validate_address(cls, v):
+        if not Web3.is_address(v):
+            raise ValueError(f"Invalid Ethereum address: {v}")
+        return Web3.to_checksum_address(v)
+
+# =======================
+#   ROUTES
+# =======================
+@app.get("/")
+async def root():
+    stats = await db_client.get_registry_stats()
+
+    return {
+        "message": "🌿 BlueCarbon API - South India Carbon Registry",
+        "version": "1.0.0",
+        "status": "ready",
+        "projects": stats.get("projects", 0),
+        "total_credits_issued": stats.get("total_issued", 0),
+        "network": "Celo Alfajores",
+        "contract_in_use": bluecarbon_client.contract_address,
+    }
+
+@app.get("/health")
+async def health_check():
+    snapshot = health.snapshot()
+    return {
+        "status": "healthy" if snapshot["ready"] else "degraded",
+        "timestamp": datetime.now(timezone.utc),
+        "database": db_client.db.name,
+        "blockchain": {
+            "connected": health.ok("rpc"),
+            "contract": bluecarbon_client.contract_address,
+            "endpoints": bluecarbon_client.provider.stats(),
+        },
+        "checks": snapshot["checks"],
+        "projects_count": (await db_client.get_registry_stats()).get("projects", 0),
+    }
+
+def parse_page(limit: int, cursor: Optional[str]):
+    if not 0 < limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def parse_projection(fields: Optional[str], exclude=(), required=()):
+    """fields= query parameter → Mongo projection (400 on bad names)"""
+    try:
+        return projection(fields, exclude, required)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def page_response(page: List[Dict[str, Any]], next_cursor: Optional[str]) -> BSONResponse:
+    return BSONResponse(page, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+@app.get("/projects")
+async def list_projects(limit: int = 10, skip: int = 0, cursor: Optional[str] = None, fields: Optional[str] = None):
+    """List projects newest first; pass the X-Next-Cursor header back as cursor for the next page
+
+    Leaves out description unless fields= asks for it.
+    """
+    if skip and not cursor:
+        # Offset paging kept for old clients; costs O(skip)
+        selected = parse_projection(fields, exclude=["description"])
+        return BSONResponse(await db_client.get_projects(limit=limit, skip=skip, projection=selected))
+    after = parse_page(limit, cursor)
+    selected = parse_projection(fields, exclude=["description"], required=["created_at"])
+    docs = await db_client.get_projects_page(limit + 1, after, selected)
+    return page_response(*split_page(docs, limit, "created_at"))
+
+@app.get("/projects/{project_id}")
+async def get_project(project_id: str, fields: Optional[str] = None):
+    """Get project details"""
+    project = await db_client.get_project(project_id, parse_projection(fields))
+    if not project:
+        raise HTTPException(status_code=404, detail=f"Project '{project_id}' not found")
+    return BSONResponse(project)
+
+@app.post("/projects/register")
+async def register_project(
+    request: RegisterProjectRequest, admin_token: str = Depends(verify_admin_token)
+):
+    """Register a new carbon project (Admin only)"""
+    if await db_client.get_project(request.project_id):
+        raise HTTPException(status_code=400, detail=f"Project '{request.project_id}' already exists")
+
+    tx = await asyncio.to_thread(
+        bluecarbon_client.register_project,
+        request.project_id,
+        request.metadata_cid,
+        os.getenv("ADMIN_PRIVATE_KEY"),
+        wait=WAIT_FOR_RECEIPT,
+    )
+
+    project_data = {
+        "project_id": request.project_id,
+        "name": request.name,
+        "description": request.description,
+        "project_type": request.project_type,
+        "location": request.location,
+        "status": "active" if WAIT_FOR_RECEIPT else "pending",
+        "balances": {"total_issued": 0, "total_retired": 0, "circulating": 0},
+    }
+    if "token_id" in tx:
+        project_data["token_id"] = tx["token_id"]
+        token_ids.put(request.project_id, tx["token_id"])
+    await db_client.store_project(project_data)
+
+    if not WAIT_FOR_RECEIPT:
+        await tx_tracker.track("project_registration", tx["tx_hash"], project_data)
+        return {"success": True, "tx": tx, "message": f"Project '{request.name}' registration submitted"}
+
+    await db_client.log_transaction("project_registration", tx["tx_hash"], project_data)
+
+    return {"success": True, "tx": tx, "message": f"Project '{request.name}' registered successfully!"}
+
+@app.post("/credits/issue")
+async def issue_credits(
+    request: IssueCreditsRequest, minter_token: str = Depends(verify_minter_token)
+):
+    """Issue carbon credits (Minter only)"""
+    project = await db_client.get_project(request.project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail=f"Project '{request.project_id}' not found")
+
+    tx = await asyncio.to_thread(
+        bluecarbon_client.issue_credits,
+        request.to_address,
+        request.project_id,
+        request.amount,
+        request.proof_cid,
+        os.getenv("MINTER_PRIVATE_KEY"),
+        wait=WAIT_FOR_RECEIPT,
+    )
+
+    if not WAIT_FOR_RECEIPT:
+        await tx_tracker.track("credit_issuance", tx["tx_hash"], request.dict())
+        return {"success": True, "tx": tx, "message": f"Issuance of {request.amount} credits submitted"}
+
+    await db_client.update_project_balance(request.project_id, request.amount, operation="issue")
+    await db_client.log_transaction("credit_issuance", tx["tx_hash"], request.dict())
+
+    return {"success": True, "tx": tx, "message": f"{request.amount} credits issued successfully!"}
+
+@app.post("/credits/retire")
+async def retire_credits(request: RetireCreditsRequest):
+    """Retire carbon credits"""
+    project = await db_client.get_project(request.project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail=f"Project '{request.project_id}' not found")
+
+    if project.get("balances", {}).get("circulating", 0) < request.amount:
+        raise HTTPException(status_code=400, detail=f"Insufficient credits. Available: {project.get('balances', {}).get('circulating', 0)}")
+
+    token_id = await token_ids.resolve(request.project_id, project)
+    tx = await asyncio.to_thread(
+        bluecarbon_client.retire_credits,
+        token_id,
+        request.amount,
+        os.getenv("USER_PRIVATE_KEY"),
+        wait=WAIT_FOR_RECEIPT,
+    )
+
+    if not WAIT_FOR_RECEIPT:
+        await tx_tracker.track("credit_retirement", tx["tx_hash"], request.dict())
+        return {"success": True, "tx": tx, "message": f"Retirement of {request.amount} credits submitted"}
+
+    await db_client.update_project_balance(request.project_id, request.amount, operation="retire")
+    await db_client.log_transaction("credit_retirement", tx["tx_hash"], request.dict())
+
+    return {"success": True, "tx": tx, "message": f"{request.amount} credits retired successfully!"}
+
+@app.get("/projects/{project_id}/history")
+async def get_project_history(
+    project_id: str, limit: int = 50, cursor: Optional[str] = None, fields: Optional[str] = None
+):
+    """Project transactions newest first; older pages via the X-Next-Cursor header
+
+    Leaves out the nested details unless fields= asks for them.
+    """
+    after = parse_page(limit, cursor)
+    selected = parse_projection(fields, exclude=["details"], required=["timestamp"])
+    docs = await db_client.get_transactions_page(project_id, limit + 1, after, selected)
+    return page_response(*split_page(docs, limit, "timestamp"))
+
+@app.get("/transactions")
+async def list_transactions(limit: int = 50, cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Global transaction feed, newest first"""
+    after = parse_page(limit, cursor)
+    selected = parse_projection(fields, exclude=["details"], required=["timestamp"])
+    docs = await db_client.get_transactions_page(None, limit + 1, after, selected)
+    page, next_cursor = split_page(docs, limit, "timestamp")
+    return BSONResponse({"transactions": page, "next_cursor": next_cursor})
+
+@app.get("/tx/{tx_hash}")
+async def get_tx_status(tx_hash: str):
+    """Get the status of a submitted transaction (pending/confirmed/failed)"""
+    tracked = tx_tracker.status(tx_hash)
+    if tracked:
+        return {"tx_hash": tx_hash, "type": tracked["type"], "status": tracked["status"]}
+
+    tx = await db_client.get_transaction(tx_hash)
+    if not tx:
+        raise HTTPException(status_code=404, detail=f"Transaction '{tx_hash}' not found")
+    return {
+        "tx_hash": tx_hash,
+        "type": tx["type"],
+        "status": tx["status"],
+        "block_number": tx.get("block_number"),
+    }
+
+@app.get("/balance/{address}/{project_id}")
+async def get_balance(address: str, project_id: str):
+    """Get balance of an address for a project"""
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="Invalid address")
+
+    token_id = await token_ids.resolve(project_id)
+    balance = await asyncio.to_thread(bluecarbon_client.get_balance_of, address, token_id)
+
+    return {"address": Web3.to_checksum_address(address), "project_id": project_id, "token_id": token_id, "balance": balance}
+
+async def build_portfolios(addresses: List[str], include_zero: bool) -> Dict[str, Any]:
+    """Every (address, project token) balance in one balanceOfBatch, plus totalSupply per token"""
+    mapping = await token_ids.resolve_all()
+    projects = list(mapping.items())
+
+    accounts = [address for address in addresses for _ in projects]
+    ids = [token_id for _ in addresses for _, token_id in projects]
+    # Concurrent, so the RPC batcher can send both in one round trip
+    balances, supplies = await asyncio.gather(
+        asyncio.to_thread(bluecarbon_client.get_balances_batch, accounts, ids),
+        asyncio.to_thread(bluecarbon_client.get_total_supplies, list(mapping.values())),
+    )
+
+    portfolios = []
+    for i, address in enumerate(addresses):
+        row = balances[i * len(projects) : (i + 1) * len(projects)]
+        holdings = [
+            {
+                "project_id": project_id,
+                "token_id": token_id,
+                "balance": balance,
+                "total_supply": supplies[token_id],
+            }
+            for (project_id, token_id), balance in zip(projects, row)
+            if balance or include_zero
+        ]
+        portfolios.append({"address": address, "total_credits": sum(row), "holdings": holdings})
+
+    return {"projects": len(projects), "portfolios": portfolios}
+
+@app.get("/portfolio/{address}")
+async def get_portfolio(address: str, include_zero: bool = False):
+    """All project balances of one address"""
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="Invalid address")
+
+    result = await build_portfolios([Web3.to_checksum_address(address)], include_zero)
+    return result["portfolios"][0]
+
+@app.post("/portfolio")
+async def get_portfolios(request: PortfolioRequest, include_zero: bool = False):
+    """All project balances of several addresses"""
+    return await build_portfolios(request.addresses, include_zero)
+
+# =======================
+#   CHAIN INDEX ROUTES
+# =======================
+@app.get("/index/status")
+async def index_status():
+    """Last block covered by the event indexer"""
+    return await asyncio.to_thread(indexer.status)
+
+@app.get("/index/balances/{address}")
+async def indexed_balances(address: str):
+    """Holder balances folded from indexed transfer events (no RPC)"""
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="Invalid address")
+
+    balances = await asyncio.to_thread(indexer.holder_balances, address)
+    projects = {token_id: pid for pid, token_id in (await db_client.get_project_token_ids()).items()}
+    for row in balances:
+        row["project_id"] = projects.get(row["token_id"])
+    return {"address": Web3.to_checksum_address(address), "balances": balances}
+
+@app.get("/index/projects/{project_id}")
+async def indexed_project_totals(project_id: str):
+    """Issued/retired/supply totals of a project from indexed events (no RPC)"""
+    project = await db_client.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail=f"Project '{project_id}' not found")
+
+    token_id = await token_ids.resolve(project_id, project)
+    totals = await asyncio.to_thread(indexer.token_totals, token_id)
+    return {"project_id": project_id, **totals}
+
+# =======================
+#   RECONCILIATION ROUTES
+# =======================
+@app.get("/reconcile/status")
+async def reconcile_status():
+    """Last reconciliation pass (block verified, drift counts) and any pass in progress"""
+    return await asyncio.to_thread(reconciler.status)
+
+@app.get("/reconcile/drift")
+async def reconcile_drift(limit: int = 100):
+    """Projects whose balances disagreed with totalSupply, open and repaired"""
+    if not 0 < limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    return {"drift": await asyncio.to_thread(reconciler.drifted, limit)}
+
+# =======================
+#   REGISTRY ROUTES
+# =======================
+@app.get("/registry/{name}")
+async def get_registry_entry(name: str):
+    """Fetch the contract address for a given name from the registry"""
+    try:
+        addr = bluecarbon_client.registry.functions.getContract(name).call()
+        if addr == "0x0000000000000000000000000000000000000000":
+            raise HTTPException(status_code=404, detail=f"No contract found for '{name}'")
+        return {"name": name, "address": addr}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/registry/update")
+async def update_registry_entry(
+    name: str, new_address: str, admin_token: str = Depends(verify_admin_token)
+):
+    """Update the registry with a new contract address (Admin only)"""
+    try:
+        result = await asyncio.to_thread(
+            bluecarbon_client.update_registry, name, new_address, os.getenv("ADMIN_PRIVATE_KEY")
+        )
+        return {"success": True, "tx": result, "message": f"Registry updated: {name} → {new_address}"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# =======================
+#   ANALYTICS ROUTES
+# =======================
+@app.post("/analytics/aggregate")
+async def aggregate_plots(request: AggregateRequest):
+    try:
+        return {"rows": await aggregations.run(request)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/analytics/dashboard")
+async def analytics_dashboard(
+    request: Request,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    project_type: Optional[str] = None,
+    bbox: Optional[str] = None,
+):
+    """Every chart series from one pass over plots; bbox is min_lon,min_lat,max_lon,max_lat"""
+    box = None
+    if bbox:
+        try:
+            box = tuple(float(v) for v in bbox.split(","))
+        except ValueError:
+            box = ()
+        if len(box) != 4:
+            raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    filters = dashboard_filters(year_from, year_to, project_type, box)
+
+    generation = await aggregations.current_generation()
+    etag = aggregations.dashboard_etag(filters, generation)
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        payload = await aggregations.dashboard(filters, generation)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return JSONResponse(content=payload, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+@app.get("/analytics/plots-overview")
+async def plots_overview():
+    if analytics_backend is not None:
+        return await asyncio.to_thread(analytics_backend.plots_overview)
+    return await aggregations.plots_overview()
+
+@app.get("/analytics/ndvi-by-project")
+async def ndvi_by_project():
+    if analytics_backend is not None:
+        return {"ndvi": await asyncio.to_thread(analytics_backend.ndvi_by_project)}
+    return {"ndvi": await aggregations.ndvi_by_project()}
+
+@app.get("/analytics/ndvi-by-project-source")
+async def ndvi_by_project_source():
+    return {"ndvi": await aggregations.ndvi_by_project_source()}
+
+@app.get("/analytics/biomass-trend")
+async def biomass_trend():
+    if analytics_backend is not None:
+        return {"biomass": await asyncio.to_thread(analytics_backend.biomass_trend)}
+    return {"biomass": await aggregations.biomass_trend()}
+
+@app.get("/analytics/fluxes")
+async def fluxes():
+    if analytics_backend is not None:
+        return await asyncio.to_thread(analytics_backend.fluxes)
+    return await aggregations.fluxes()
+
+@app.get("/analytics/ndvi-monthly")
+async def ndvi_monthly():
+    if analytics_backend is not None:
+        return {"trend": await asyncio.to_thread(analytics_backend.ndvi_monthly)}
+    return {"trend": await aggregations.ndvi_monthly()}
+
+# =======================
+#   MAP TILES
+# =======================
+MAX_TILE_DETAIL = 4
+
+@app.get("/tiles/{z}/{x}/{y}")
+async def get_tile(z: int, x: int, y: int, detail: int = 3):
+    """Plot totals for a z/x/y map tile plus up to 4**detail sub-cells"""
+    if not 0 <= z <= rollups.tiles.max_zoom:
+        raise HTTPException(
+            status_code=400,
+            detail=f"tiles are aggregated up to zoom {rollups.tiles.max_zoom}; use /plots/within beyond that",
+        )
+    if not (0 <= x < 1 << z and 0 <= y < 1 << z):
+        raise HTTPException(status_code=400, detail="tile x/y out of range for this zoom")
+    if not 0 <= detail <= MAX_TILE_DETAIL:
+        raise HTTPException(status_code=400, detail=f"detail must be between 0 and {MAX_TILE_DETAIL}")
+    return await asyncio.to_thread(rollups.tiles.tile, z, x, y, detail)
+
+# =======================
+#   PLOT SEARCH
+# =======================
+async def plot_results(query, fields: Optional[str], limit: int, stream: bool):
+    """Run a plot_search query as JSON, or as NDJSON when stream is set (limit 0 = all)"""
+    try:
+        selected = parse_fields(fields)
+        if limit < 0 or (not stream and not 0 < limit <= PLOT_QUERY_MAX_LIMIT):
+            raise ValueError(f"limit must be between 1 and {PLOT_QUERY_MAX_LIMIT}")
+        rows = query(selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if stream:
+        return StreamingResponse(iter_ndjson(rows), media_type="application/x-ndjson")
+    plots = await asyncio.to_thread(list, rows)
+    return {"count": len(plots), "plots": plots}
+
+@app.get("/plots/near")
+async def plots_near(
+    lon: float, lat: float, radius_m: float = 1000, limit: int = 100, fields: Optional[str] = None, stream: bool = False
+):
+    """Plots within radius_m metres of (lon, lat), closest first"""
+    if radius_m <= 0:
+        raise HTTPException(status_code=400, detail="radius_m must be greater than 0")
+    return await plot_results(
+        lambda selected: plot_search.near(lon, lat, radius_m, limit, selected), fields, limit, stream
+    )
+
+@app.get("/plots/nearest")
+async def plots_nearest(lon: float, lat: float, n: int = 10, fields: Optional[str] = None, stream: bool = False):
+    """The n plots closest to (lon, lat)"""
+    if n <= 0:
+        raise HTTPException(status_code=400, detail="n must be greater than 0")
+    return await plot_results(lambda selected: plot_search.nearest(lon, lat, n, selected), fields, n, stream)
+
+@app.get("/plots/within")
+async def plots_within_bbox(
+    bbox: str, limit: int = 100, fields: Optional[str] = None, stream: bool = False
+):
+    """Plots inside bbox=min_lon,min_lat,max_lon,max_lat"""
+    try:
+        geometry = bbox_polygon(*(float(v) for v in bbox.split(",")))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    return await plot_results(lambda selected: plot_search.within(geometry, limit, selected), fields, limit, stream)
+
+@app.post("/plots/within")
+async def plots_within(request: WithinRequest):
+    """Plots inside a bbox or a polygon ring"""
+    try:
+        if request.polygon is not None:
+            geometry = polygon(request.polygon)
+        elif request.bbox is not None and len(request.bbox) == 4:
+            geometry = bbox_polygon(*request.bbox)
+        else:
+            raise ValueError("give either bbox [min_lon, min_lat, max_lon, max_lat] or polygon")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    fields = ",".join(request.fields) if request.fields else None
+    return await plot_results(
+        lambda selected: plot_search.within(geometry, request.limit, selected), fields, request.limit, request.stream
+    )
+
+# =======================
+#   EXPORT
+# =======================
+def export_response(request: Request, rows_fn, fields: List[str], format: str, batch_size: int, name: str):
+    """NDJSON or CSV download, gzipped on the fly when the client accepts it"""
+    try:
+        if format not in ("ndjson", "csv"):
+            raise ValueError("format must be ndjson or csv")
+        if not 0 < batch_size <= EXPORT_MAX_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {EXPORT_MAX_BATCH_SIZE}")
+        rows = rows_fn()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "csv":
+        body, media_type = iter_csv(rows, fields, batch_size), "text/csv"
+    else:
+        body, media_type = iter_ndjson(rows, batch_size), "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{format}"', "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+@app.get("/export/plots")
+async def export_plots(
+    request: Request,
+    format: str = "ndjson",
+    fields: Optional[str] = None,
+    project_type: Optional[str] = None,
+    data_source: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    after: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+):
+    """Every matching plot in ID order; resume with after=<last ID received>"""
+    filters: Dict[str, Any] = {}
+    if project_type:
+        filters["Project_Type"] = project_type
+    if data_source:
+        filters["Data_Source"] = data_source
+    years = {op: year for op, year in (("$gte", year_from), ("$lte", year_to)) if year is not None}
+    if years:
+        filters["Monitoring_Year"] = years
+
+    try:
+        selected = select_fields(fields, PLOT_EXPORT_FIELDS, "ID")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return export_response(
+        request, lambda: exporter.plot_rows(filters, selected, after, batch_size), selected, format, batch_size, "plots"
+    )
+
+@app.get("/export/transactions")
+async def export_transactions(
+    request: Request,
+    format: str = "ndjson",
+    fields: Optional[str] = None,
+    project_id: Optional[str] = None,
+    type: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+):
+    """Every matching transaction in _id (insertion) order; resume with after=<last _id received>"""
+    filters: Dict[str, Any] = {}
+    if project_id:
+        filters["project_id"] = project_id
+    if type:
+        filters["type"] = type
+    if status:
+        filters["status"] = status
+    window = {op: when for op, when in (("$gte", since), ("$lt", until)) if when is not None}
+    if window:
+        filters["timestamp"] = window
+
+    try:
+        selected = select_fields(fields, TRANSACTION_EXPORT_FIELDS, "_id")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return export_response(
+        request,
+        lambda: exporter.transaction_rows(filters, selected, after, batch_size),
+        selected,
+        format,
+        batch_size,
+        "transactions",
+    )
+
+# Startup
+if __name__ == "__main__":
+    import uvicorn
+    logger.info("🚀 Starting BlueCarbon API...")
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8000)), reload=True)
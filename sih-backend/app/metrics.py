@@ -0,0 +1,271 @@
+"""
+In-process metrics in the Prometheus text exposition format
+
+Counters, gauges and histograms with labels, safe to update from worker
+threads, plus the hooks that feed them: a web3 middleware (per RPC method),
+a pymongo CommandListener (per collection and command) and helpers for
+contract calls and receipt waits. GET /metrics renders REGISTRY.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from pymongo import monitoring
+
+# Seconds; RPC and receipt waits reach well past the usual web-request range
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REGISTRY: List["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        return []
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_number(value)}" for suffix, labels, value in self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [("", _labels(self.label_names, key), value) for key, value in values]
+
+
+class Gauge(Counter):
+    """Set directly, or computed at scrape time by set_function()"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], Dict[Tuple, float]]):
+        """fn returns {label values tuple: value}; () for an unlabelled gauge"""
+        self._function = fn
+
+    def samples(self):
+        if self._function is None:
+            return super().samples()
+        try:
+            values = self._function()
+        except Exception:
+            return []
+        return [("", _labels(self.label_names, key), value) for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts (+Inf last), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            series = [(key, list(counts), total, n) for key, (counts, total, n) in self._series.items()]
+        out = []
+        for key, counts, total, n in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                out.append(("_bucket", _labels(self.label_names, key, f'le="{_number(bound)}"'), cumulative))
+            out.append(("_sum", _labels(self.label_names, key), total))
+            out.append(("_count", _labels(self.label_names, key), n))
+        return out
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ----------------- HTTP -----------------
+HTTP_REQUEST_SECONDS = Histogram(
+    "bluecarbon_http_request_duration_seconds", "Request latency by route template", ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = Gauge("bluecarbon_http_requests_in_flight", "Requests being handled")
+
+# ----------------- BLOCKCHAIN -----------------
+RPC_SECONDS = Histogram("bluecarbon_rpc_duration_seconds", "JSON-RPC round trips by method", ("method",))
+RPC_ERRORS = Counter("bluecarbon_rpc_errors_total", "JSON-RPC requests that raised or returned an error", ("method",))
+RPC_BATCH_SIZE = Histogram(
+    "bluecarbon_rpc_batch_size", "eth_calls per JSON-RPC batch", buckets=(1, 2, 5, 10, 20, 50, 100, 200)
+)
+CONTRACT_SECONDS = Histogram(
+    "bluecarbon_contract_call_duration_seconds",
+    "Contract function time: call = eth_call, transact = build, sign, send (and wait when synchronous)",
+    ("function", "kind"),
+)
+RECEIPT_WAIT_SECONDS = Histogram(
+    "bluecarbon_receipt_wait_seconds",
+    "Submission to mined receipt; sync = request blocked on it, async = receipt tracker",
+    ("function", "mode"),
+)
+RPC_ENDPOINT_REQUESTS = Gauge("bluecarbon_rpc_endpoint_requests", "Requests sent per RPC endpoint", ("endpoint",))
+RPC_ENDPOINT_FAILURES = Gauge("bluecarbon_rpc_endpoint_failures", "Failed requests per RPC endpoint", ("endpoint",))
+RPC_ENDPOINT_LATENCY = Gauge("bluecarbon_rpc_endpoint_latency_seconds", "Latency EWMA per RPC endpoint", ("endpoint",))
+RPC_ENDPOINT_OPEN = Gauge("bluecarbon_rpc_endpoint_circuit_open", "1 while an endpoint is out of rotation", ("endpoint",))
+TX_IN_FLIGHT = Gauge("bluecarbon_tx_in_flight", "Submitted transactions awaiting a receipt", ("type",))
+
+# ----------------- RECONCILIATION -----------------
+RECONCILE_VERIFIED_BLOCK = Gauge("bluecarbon_reconcile_verified_block", "Block of the last completed reconciliation pass")
+RECONCILE_DRIFTED = Gauge("bluecarbon_reconcile_drifted_projects", "Projects whose balances disagree with the chain")
+RECONCILE_REPAIRS = Counter("bluecarbon_reconcile_repairs_total", "Project balances corrected from the chain")
+
+# ----------------- MONGO -----------------
+MONGO_SECONDS = Histogram(
+    "bluecarbon_mongo_command_duration_seconds", "Mongo command latency by collection", ("collection", "command")
+)
+MONGO_FAILURES = Counter("bluecarbon_mongo_command_failures_total", "Failed Mongo commands", ("collection", "command"))
+
+# ----------------- CACHES -----------------
+CACHE_REQUESTS = Gauge("bluecarbon_cache_requests", "Cache lookups since start by outcome", ("cache", "result"))
+CACHE_HIT_RATIO = Gauge("bluecarbon_cache_hit_ratio", "hits / (hits + misses) since start", ("cache",))
+
+
+def watch_caches(sources: Dict[str, Callable[[], Tuple[int, int]]]):
+    """Report cache name → () -> (hits, misses) on every scrape"""
+
+    def requests():
+        values = {}
+        for cache, fn in sources.items():
+            hits, misses = fn()
+            values[(cache, "hit")] = hits
+            values[(cache, "miss")] = misses
+        return values
+
+    def ratios():
+        values = {}
+        for cache, fn in sources.items():
+            hits, misses = fn()
+            values[(cache,)] = hits / (hits + misses) if hits + misses else 0.0
+        return values
+
+    CACHE_REQUESTS.set_function(requests)
+    CACHE_HIT_RATIO.set_function(ratios)
+
+
+# ----------------- HOOKS -----------------
+def rpc_metrics_middleware(make_request, w3):
+    """web3 middleware timing every JSON-RPC request by method"""
+
+    def middleware(method, params):
+        start = time.perf_counter()
+        try:
+            response = make_request(method, params)
+        except Exception:
+            RPC_ERRORS.inc(method=method)
+            raise
+        finally:
+            RPC_SECONDS.observe(time.perf_counter() - start, method=method)
+        if isinstance(response, dict) and "error" in response:
+            RPC_ERRORS.inc(method=method)
+        return response
+
+    return middleware
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Per collection/command timings from pymongo's command monitoring events"""
+
+    def __init__(self):
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self._collections[event.request_id] = target if isinstance(target, str) else ""
+
+    def _finish(self, event) -> Tuple[str, float]:
+        return self._collections.pop(event.request_id, ""), event.duration_micros / 1e6
+
+    def succeeded(self, event):
+        collection, seconds = self._finish(event)
+        MONGO_SECONDS.observe(seconds, collection=collection, command=event.command_name)
+
+    def failed(self, event):
+        collection, seconds = self._finish(event)
+        MONGO_SECONDS.observe(seconds, collection=collection, command=event.command_name)
+        MONGO_FAILURES.inc(collection=collection, command=event.command_name)
+
+
+mongo_command_metrics = MongoCommandMetrics()
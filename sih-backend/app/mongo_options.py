@@ -0,0 +1,29 @@
+"""
+MongoDB client settings shared by the pymongo and Motor data layers
+
+Kept free of app imports other than metrics so either driver module (and the
+benchmarks) can import it without pulling in the other.
+"""
+
+import os
+from typing import Dict, Any
+
+from dotenv import load_dotenv
+
+from app.metrics import mongo_command_metrics
+
+load_dotenv()
+
+
+def mongo_client_options() -> Dict[str, Any]:
+    """Connection pool and timeout settings shared by the sync and async drivers"""
+    return {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", 100)),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+        "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000)),
+        "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000)),
+        # Per-collection command timings for /metrics
+        "event_listeners": [mongo_command_metrics] if os.getenv("MONGO_COMMAND_METRICS", "1") == "1" else [],
+    }
@@ -0,0 +1,55 @@
+"""
+Keyset (cursor) pagination helpers
+
+A cursor is the (sort key, _id) of the last row on a page, BSON-JSON encoded
+and base64url'd so it stays opaque to clients. The next page is then a range
+match on an index over (sort key, _id), so page N costs the same as page 1.
+"""
+
+import base64
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+
+# What a cursor of ours can hold; anything else (a {"$ne": ...} document, a
+# regex, ...) would turn the range match into an operator of the client's choosing
+CURSOR_TYPES = (datetime, ObjectId, str, int, float, type(None))
+
+
+def encode_cursor(doc: Dict[str, Any], key: str) -> str:
+    raw = json_util.dumps([doc.get(key), doc["_id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[Any, Any]]:
+    """(sort value, _id) from a cursor; ValueError if it was not one of ours"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, _id = json_util.loads(raw)
+    except Exception:
+        # Crafted extended JSON raises anything from InvalidId to IndexError
+        raise ValueError("invalid cursor")
+    if not all(isinstance(part, CURSOR_TYPES) and not isinstance(part, bool) for part in (value, _id)):
+        raise ValueError("invalid cursor")
+    return value, _id
+
+
+def keyset_after(key: str, after: Optional[Tuple[Any, Any]]) -> Dict[str, Any]:
+    """Match rows strictly after `after` in (key desc, _id desc) order"""
+    if after is None:
+        return {}
+    value, _id = after
+    return {"$or": [{key: {"$lt": value}}, {key: value, "_id": {"$lt": _id}}]}
+
+
+def keyset_sort(key: str) -> List[Tuple[str, int]]:
+    return [(key, -1), ("_id", -1)]
+
+
+def split_page(docs: List[Dict[str, Any]], limit: int, key: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim a limit+1 fetch to one page and the cursor of the next (None on the last page)"""
+    page = docs[:limit]
+    return page, encode_cursor(page[-1], key) if len(docs) > limit else None
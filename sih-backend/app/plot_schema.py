@@ -0,0 +1,31 @@
+"""
+Field layout of plot documents (see plots.csv)
+"""
+
+# Columns parsed as floats on ingest
+NUMERIC_COLUMNS = [
+    "GPS_Lat",
+    "GPS_Long",
+    "NDVI",
+    "Canopy_Cover_percent",
+    "Soil_Organic_Carbon_g_per_kg",
+    "Soil_Salinity_psu",
+    "Soil_Moisture_percent",
+    "Soil_pH",
+    "Water_Salinity_psu",
+    "Water_Temperature_C",
+    "CO2_Flux_mg_m2_day",
+    "CH4_Flux_mg_m2_day",
+    "Tree_Height_m",
+    "DBH_cm",
+    "Biomass_above_kg",
+    "Biomass_below_kg",
+    "Carbon_t",
+    "CO2e_t",
+    "Plot_Area_ha",
+    "Soil_Bulk_Density_g_cm3",
+    "Soil_Depth_cm",
+]
+
+# Grouping dimensions → the value they group on
+DIMENSION_FIELDS = ["Project_Type", "Data_Source", "Monitoring_Year"]
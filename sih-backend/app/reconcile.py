@@ -0,0 +1,325 @@
+"""
+Chain ↔ database balance reconciliation
+
+Project balances in Mongo only move after a successful API call, so a crash
+between sending a transaction and the balance update, or credits minted or
+burned outside this API, leave them wrong. The reconciler reads totalSupply
+for every project token (retired credits are burned, so it equals
+`balances.circulating`) in JSON-RPC batches, all pinned to one block, and
+compares. Projects with a mined transaction the receipt tracker has not
+settled yet are skipped until it has, so a repair never races the tracker.
+
+The head, the pinned header and each batch may be answered by different
+pooled endpoints. A read an endpoint rejects as an unknown block (it is
+behind the one that served the head) is retried with backoff, up to
+RECONCILE_BLOCK_RETRIES times, until it has caught up, instead of failing
+the pass.
+
+Projects are walked in project_id order, RECONCILE_BATCH_SIZE at a time, and
+the cursor is checkpointed in `reconcile_state` after every chunk, so an
+interrupted pass resumes where it stopped. Drifted projects are recorded in
+`balance_drift`; repair() moves the difference into total_issued (chain
+higher) or total_retired (chain lower). A finished pass records the block
+every project was verified at.
+
+    python -m app.reconcile check    # report drift (exit 1 if any)
+    python -m app.reconcile repair   # report and correct it
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+from web3.exceptions import BlockNotFound
+
+from app.metrics import RECONCILE_DRIFTED, RECONCILE_REPAIRS, RECONCILE_VERIFIED_BLOCK
+from app.registry_stats import STATS_ID, balance_delta, stats_update
+from app.tx_tracker import BALANCE_OPERATIONS
+
+logger = logging.getLogger(__name__)
+
+STATE_ID = "balances"
+PASS_COUNTERS = ["checked", "matched", "drifted", "repaired", "in_flight", "unregistered"]
+# How nodes (geth, erigon, nethermind, besu) reject a call at a block they do not have yet
+UNKNOWN_BLOCK_ERRORS = ("header not found", "unknown block", "block not found", "block does not exist")
+
+
+def is_unknown_block_error(error: Exception) -> bool:
+    """True if the node rejected a read because it has not seen the requested block"""
+    if isinstance(error, BlockNotFound):
+        return True
+    message = str(error).lower()
+    return any(fragment in message for fragment in UNKNOWN_BLOCK_ERRORS)
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Mongo hands back naive UTC datetimes unless the client is tz_aware
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def repair_increments(balances: Dict[str, Any], supply: int) -> Dict[str, int]:
+    """balances.* $inc that brings circulating to the on-chain supply"""
+    difference = supply - (balances.get("circulating") or 0)
+    if difference > 0:
+        # Minted on chain but never recorded: a lost issuance
+        return {"balances.total_issued": difference, "balances.circulating": difference}
+    # Burned on chain but never recorded: a lost retirement
+    return {"balances.total_retired": -difference, "balances.circulating": difference}
+
+
+class BalanceReconciler:
+    """Compares project balances with totalSupply; run_pass() is blocking, start() schedules it"""
+
+    def __init__(self, client, db, batch_size: int = None, confirmations: int = None):
+        self.client = client
+        self.projects = db["projects"]
+        self.drift = db["balance_drift"]
+        self.state = db["reconcile_state"]
+        self.stats = db["registry_stats"]
+        self.transactions = db["transactions"]
+
+        self.batch_size = batch_size or int(os.getenv("RECONCILE_BATCH_SIZE", 500))
+        # Stay a few blocks behind head so API writes for those blocks have landed
+        if confirmations is None:
+            confirmations = int(os.getenv("RECONCILE_CONFIRMATIONS", 5))
+        self.confirmations = confirmations
+        # A settling claim older than this was left by a crashed worker and is checked
+        self.settling_timeout = float(os.getenv("RECONCILE_SETTLING_TIMEOUT", 300))
+        self.interval = float(os.getenv("RECONCILE_INTERVAL", 0))
+        self.auto_repair = os.getenv("RECONCILE_REPAIR", "0") == "1"
+        # A lagging endpoint usually catches up within a block or two
+        self.block_retries = int(os.getenv("RECONCILE_BLOCK_RETRIES", 4))
+        self.block_backoff = float(os.getenv("RECONCILE_BLOCK_BACKOFF", 1))
+        self._task: Optional[asyncio.Task] = None
+
+    # ----------------- STATE -----------------
+    def status(self) -> Dict[str, Any]:
+        state = self.state.find_one({"_id": STATE_ID}, {"_id": 0}) or {}
+        state["open_drift"] = self.drift.count_documents({"status": "open"})
+        return state
+
+    def drifted(self, limit: int = 100) -> List[Dict[str, Any]]:
+        return list(self.drift.find({}, {"_id": 0}).sort("_id", ASCENDING).limit(limit))
+
+    def _at_block(self, block: int, read, *args):
+        """read(*args), waiting out endpoints that have not reached the pinned block yet"""
+        for attempt in range(self.block_retries + 1):
+            try:
+                return read(*args)
+            except Exception as e:
+                if not is_unknown_block_error(e) or attempt == self.block_retries:
+                    raise
+                delay = self.block_backoff * 2**attempt
+                logger.info(f"⏳ RPC endpoint has not reached block {block} yet, retrying in {delay:g}s")
+                time.sleep(delay)
+
+    def _target_block(self) -> Tuple[int, datetime]:
+        w3 = self.client.w3
+        number = max(w3.eth.block_number - self.confirmations, 0)
+        # The head and the header can come from different endpoints too
+        block = self._at_block(number, w3.eth.get_block, number)
+        return block.number, datetime.fromtimestamp(block.timestamp, timezone.utc)
+
+    # ----------------- CHUNKS -----------------
+    def _next_chunk(self, cursor: Optional[str]) -> List[Dict[str, Any]]:
+        query = {"project_id": {"$gt": cursor}} if cursor is not None else {}
+        projection = {"_id": 0, "project_id": 1, "token_id": 1, "balances": 1}
+        return list(self.projects.find(query, projection).sort("project_id", ASCENDING).limit(self.batch_size))
+
+    def _resolve_token_ids(self, projects: List[Dict[str, Any]]):
+        """Look up token ids missing from Mongo in one batch and persist them"""
+        missing = [p["project_id"] for p in projects if p.get("token_id") is None]
+        if not missing:
+            return
+        resolved = self.client.get_project_token_ids(missing)
+        ops = [
+            UpdateOne({"project_id": project_id}, {"$set": {"token_id": token_id}})
+            for project_id, token_id in resolved.items()
+            if token_id
+        ]
+        if ops:
+            self.projects.bulk_write(ops, ordered=False)
+        for project in projects:
+            if project.get("token_id") is None:
+                project["token_id"] = resolved.get(project["project_id"]) or None
+
+    def _unsettled(self, project_ids: List[str]) -> set:
+        """Projects with a balance-moving tx the receipt tracker has not settled yet"""
+        stale = datetime.now(timezone.utc) - timedelta(seconds=self.settling_timeout)
+        query = {
+            "project_id": {"$in": project_ids},
+            "type": {"$in": list(BALANCE_OPERATIONS)},
+            "$or": [{"status": "pending"}, {"status": "settling", "settling_at": {"$gt": stale}}],
+        }
+        return set(self.transactions.distinct("project_id", query))
+
+    def _repair(self, project: Dict[str, Any], supply: int, block: int) -> bool:
+        """Apply the correction unless the balances moved since they were read"""
+        balances = project.get("balances") or {}
+        inc = repair_increments(balances, supply)
+        now = datetime.now(timezone.utc)
+        result = self.projects.update_one(
+            {
+                "project_id": project["project_id"],
+                **{f"balances.{field}": balances.get(field) for field in ["total_issued", "total_retired", "circulating"]},
+            },
+            {"$inc": inc, "$set": {"updated_at": now, "balances.last_updated": now}},
+        )
+        if not result.modified_count:
+            return False
+        self.stats.update_one({"_id": STATS_ID}, stats_update(balance_delta(inc)), upsert=True)
+        RECONCILE_REPAIRS.inc()
+        logger.info(f"🔧 Repaired balances of {project['project_id']} to supply {supply} at block {block}: {inc}")
+        return True
+
+    def _check_chunk(self, projects: List[Dict[str, Any]], block: int, block_time: datetime, repair: bool) -> Dict[str, int]:
+        counts = dict.fromkeys(PASS_COUNTERS, 0)
+        self._resolve_token_ids(projects)
+        registered = [p for p in projects if p.get("token_id")]
+        counts["unregistered"] = len(projects) - len(registered)
+        supplies = {}
+        if registered:
+            token_ids = [p["token_id"] for p in registered]
+            supplies = self._at_block(block, self.client.get_total_supplies, token_ids, block)
+        # Mined txs still waiting on the tracker: a repair now would be applied twice
+        unsettled = self._unsettled([p["project_id"] for p in registered]) if registered else set()
+
+        now = datetime.now(timezone.utc)
+        clean, drift_ops = [], []
+        for project in registered:
+            balances = project.get("balances") or {}
+            last_updated = _utc(balances.get("last_updated"))
+            if project["project_id"] in unsettled or (last_updated is not None and last_updated > block_time):
+                # Settlement pending, or written after the pinned block: check next pass
+                counts["in_flight"] += 1
+                continue
+
+            counts["checked"] += 1
+            supply = supplies[project["token_id"]]
+            circulating = balances.get("circulating") or 0
+            if supply == circulating:
+                counts["matched"] += 1
+                clean.append(project["project_id"])
+                continue
+
+            counts["drifted"] += 1
+            repaired = repair and self._repair(project, supply, block)
+            counts["repaired"] += int(repaired)
+            record = {
+                "project_id": project["project_id"],
+                "token_id": project["token_id"],
+                "block": block,
+                "chain_supply": supply,
+                "circulating": circulating,
+                "total_issued": balances.get("total_issued") or 0,
+                "total_retired": balances.get("total_retired") or 0,
+                "difference": supply - circulating,
+                "status": "repaired" if repaired else "open",
+                "checked_at": now,
+            }
+            if repaired:
+                record["repaired_at"] = now
+            else:
+                logger.warning(
+                    f"⚠️  Balance drift on {project['project_id']}: chain {supply}, "
+                    f"database {circulating} (block {block})"
+                )
+            drift_ops.append(
+                UpdateOne(
+                    {"_id": project["project_id"]}, {"$set": record, "$setOnInsert": {"detected_at": now}}, upsert=True
+                )
+            )
+
+        if drift_ops:
+            self.drift.bulk_write(drift_ops, ordered=False)
+        if clean:
+            # Drift that resolved itself (late write, later activity) is no longer open
+            self.drift.delete_many({"_id": {"$in": clean}, "status": "open"})
+        return counts
+
+    # ----------------- PASSES -----------------
+    def run_pass(self, repair: bool = False) -> Dict[str, Any]:
+        """Check every project, resuming an interrupted pass; returns the pass summary"""
+        state = self.state.find_one({"_id": STATE_ID}) or {}
+        current = state.get("pass")
+        # Each run pins a fresh block (nodes prune old state), resumed chunks included
+        block, block_time = self._target_block()
+        if current is None:
+            current = {"started_at": datetime.now(timezone.utc), "since_block": block, "cursor": None}
+            current.update(dict.fromkeys(PASS_COUNTERS, 0))
+        else:
+            logger.info(f"⏯️  Resuming reconciliation after {current['cursor']}")
+
+        while True:
+            projects = self._next_chunk(current["cursor"])
+            if not projects:
+                break
+            counts = self._check_chunk(projects, block, block_time, repair)
+            for key, value in counts.items():
+                current[key] += value
+            current["cursor"] = projects[-1]["project_id"]
+            self.state.update_one({"_id": STATE_ID}, {"$set": {"pass": current}}, upsert=True)
+
+        summary = {key: value for key, value in current.items() if key != "cursor"}
+        summary.update(finished_at=datetime.now(timezone.utc), verified_block=current["since_block"], to_block=block)
+        self.state.update_one({"_id": STATE_ID}, {"$set": {"last_pass": summary}, "$unset": {"pass": ""}}, upsert=True)
+
+        RECONCILE_VERIFIED_BLOCK.set(summary["verified_block"])
+        RECONCILE_DRIFTED.set(self.drift.count_documents({"status": "open"}))
+        logger.info(
+            f"⚖️  Reconciled {summary['checked']} projects at block {block}: "
+            f"{summary['drifted']} drifted, {summary['repaired']} repaired, {summary['in_flight']} in flight"
+        )
+        return summary
+
+    # ----------------- BACKGROUND -----------------
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_pass, self.auto_repair)
+            except Exception as e:
+                logger.warning(f"⚠️  Reconciliation pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        """Run a pass every RECONCILE_INTERVAL seconds (0 = only on demand)"""
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+if __name__ == "__main__":
+    from app.blockchain import bluecarbon_client
+    from app.database import db_client
+    from app.logs import configure_logging
+
+    configure_logging()
+
+    command = sys.argv[1:]
+    if command not in (["check"], ["repair"]):
+        sys.exit("usage: python -m app.reconcile check|repair")
+    bluecarbon_client.connect()
+    reconciler = BalanceReconciler(bluecarbon_client, db_client.sync_db)
+    summary = reconciler.run_pass(repair=command == ["repair"])
+    for record in reconciler.drifted(limit=1000):
+        print(
+            f"{'🔧' if record['status'] == 'repaired' else '⚠️ '} {record['project_id']:16s} "
+            f"chain {record['chain_supply']:>12}  database {record['circulating']:>12}  ({record['status']})"
+        )
+    print(
+        f"✅ {summary['checked']} projects checked at block {summary['to_block']}: "
+        f"{summary['matched']} match, {summary['drifted']} drifted, {summary['repaired']} repaired, "
+        f"{summary['in_flight']} in flight, {summary['unregistered']} unregistered"
+    )
+    sys.exit(1 if summary["drifted"] > summary["repaired"] else 0)
@@ -0,0 +1,129 @@
+"""
+Registry-wide counters in `registry_stats`
+
+A single document with the project count, issued/retired/circulating totals
+and transaction counts by type. The data layer $incs it alongside every write
+that moves those numbers, so / and /health read one document instead of
+scanning projects.
+
+    python -m app.registry_stats rebuild   # recompute from projects + transactions
+    python -m app.registry_stats verify    # compare the stored counters with a recount
+"""
+
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATS_ID = "registry"
+BALANCE_FIELDS = ["total_issued", "total_retired", "circulating"]
+
+
+def _type_key(tx_type) -> str:
+    # Transaction types become field names under transactions.by_type
+    return str(tx_type).replace(".", "_").replace("$", "_")
+
+
+def project_delta(project: Dict[str, Any]) -> Dict[str, int]:
+    """Counter increments for a newly stored project"""
+    balances = project.get("balances") or {}
+    inc = {"projects": 1}
+    inc.update({field: balances.get(field) or 0 for field in BALANCE_FIELDS})
+    return inc
+
+
+def balance_delta(balance_inc: Dict[str, int]) -> Dict[str, int]:
+    """Counter increments mirroring a project's balances.* $inc"""
+    return {key.split(".", 1)[1]: amount for key, amount in balance_inc.items()}
+
+
+def transaction_delta(tx_type: str) -> Dict[str, int]:
+    return {"transactions.total": 1, f"transactions.by_type.{_type_key(tx_type)}": 1}
+
+
+def stats_update(inc: Dict[str, int]) -> Dict[str, Any]:
+    return {"$inc": inc, "$set": {"updated_at": datetime.now(timezone.utc)}}
+
+
+def empty_stats() -> Dict[str, Any]:
+    stats = {"projects": 0, **{field: 0 for field in BALANCE_FIELDS}}
+    stats["transactions"] = {"total": 0, "by_type": {}}
+    return stats
+
+
+def _flatten(doc: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    flat = {}
+    for key, value in doc.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+class RegistryStats:
+    def __init__(self, db):
+        self.stats = db["registry_stats"]
+        self.projects = db["projects"]
+        self.transactions = db["transactions"]
+
+    def recount(self) -> Dict[str, Any]:
+        """The counters as computed from scratch (two aggregations)"""
+        stats = empty_stats()
+        group = {"_id": None, "projects": {"$sum": 1}}
+        group.update({field: {"$sum": f"$balances.{field}"} for field in BALANCE_FIELDS})
+        for doc in self.projects.aggregate([{"$group": group}]):
+            stats.update({key: doc[key] for key in ["projects", *BALANCE_FIELDS]})
+        for doc in self.transactions.aggregate([{"$group": {"_id": "$type", "count": {"$sum": 1}}}]):
+            stats["transactions"]["by_type"][_type_key(doc["_id"])] = doc["count"]
+            stats["transactions"]["total"] += doc["count"]
+        return stats
+
+    def rebuild(self) -> Dict[str, Any]:
+        stats = self.recount()
+        now = datetime.now(timezone.utc)
+        self.stats.replace_one({"_id": STATS_ID}, {**stats, "updated_at": now, "rebuilt_at": now}, upsert=True)
+        logger.info(f"📦 Rebuilt registry stats: {stats['projects']} projects, {stats['transactions']['total']} transactions")
+        return stats
+
+    def verify(self) -> Dict[str, Tuple[Any, Any]]:
+        """counter → (stored, recounted) for every counter that drifted"""
+        stored = _flatten(self.get())
+        actual = _flatten(self.recount())
+        return {
+            key: (stored.get(key, 0), actual.get(key, 0))
+            for key in sorted(set(stored) | set(actual))
+            if stored.get(key, 0) != actual.get(key, 0)
+        }
+
+    def ensure_built(self):
+        """Seed the counters from existing data the first time they are needed"""
+        if self.stats.find_one({"_id": STATS_ID}, {"_id": 1}) is None:
+            self.rebuild()
+
+    def get(self) -> Dict[str, Any]:
+        doc = self.stats.find_one({"_id": STATS_ID}, {"_id": 0, "updated_at": 0, "rebuilt_at": 0})
+        return doc or empty_stats()
+
+
+if __name__ == "__main__":
+    from app.database import db_client
+    from app.logs import configure_logging
+
+    configure_logging()
+
+    command = sys.argv[1:]
+    registry_stats = RegistryStats(db_client.sync_db)
+    if command == ["rebuild"]:
+        registry_stats.rebuild()
+    elif command == ["verify"]:
+        drift = registry_stats.verify()
+        for key, (stored, actual) in drift.items():
+            print(f"⚠️  {key:32s} stored {stored}  actual {actual}")
+        if not drift:
+            print("✅ Registry stats match projects and transactions")
+        sys.exit(1 if drift else 0)
+    else:
+        sys.exit("usage: python -m app.registry_stats rebuild|verify")
@@ -0,0 +1,67 @@
+"""
+BSON-aware JSON responses
+
+Mongo documents go straight to orjson (ObjectId/Decimal128 via a default hook,
+datetime natively) instead of through jsonable_encoder's per-field reflection.
+Routes must return BSONResponse(...) themselves: FastAPI only skips
+jsonable_encoder for Response instances.
+"""
+
+import json
+import re
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Any, Iterable, Optional
+
+from bson import ObjectId, Decimal128
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output
+    orjson = None
+
+FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$")
+
+
+def bson_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=bson_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=bson_default, separators=(",", ":")).encode()
+
+
+class BSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def projection(
+    fields: Optional[str], exclude: Iterable[str] = (), required: Iterable[str] = ()
+) -> Optional[Dict[str, int]]:
+    """Mongo projection for a fields= query parameter
+
+    No fields → the default view (everything but `exclude`); otherwise only the
+    named fields plus `required` (e.g. the keys a pagination cursor is built from).
+    """
+    if not fields:
+        excluded = {field: 0 for field in exclude}
+        return excluded or None
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [f for f in selected if not FIELD_NAME.match(f)]
+    if invalid:
+        raise ValueError(f"invalid field names: {', '.join(invalid)}")
+    return {field: 1 for field in [*selected, *required]}
@@ -0,0 +1,299 @@
+"""
+Materialized plot rollups for the /analytics endpoints
+
+Keeps count plus per-metric sum/n for every value of each rollup dimension in
+`plot_rollups`, updated by delta whenever plots go through upsert_plots().
+The analytics endpoints then read O(groups) documents instead of scanning
+`plots`. The same deltas keep the map tiles in `plot_tiles` current.
+
+    python -m app.rollups rebuild   # recompute everything from plots
+"""
+
+import logging
+import math
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.indexes import INDEXES, apply_indexes
+from app.tiles import PlotTiles
+
+logger = logging.getLogger(__name__)
+
+# Numeric plot fields summed per group ("Biomass_total_kg" is derived per plot)
+METRICS = [
+    "NDVI",
+    "Biomass_above_kg",
+    "Biomass_below_kg",
+    "Biomass_total_kg",
+    "CO2_Flux_mg_m2_day",
+    "CH4_Flux_mg_m2_day",
+    "Carbon_t",
+    "CO2e_t",
+]
+
+# Dimension name → function of a plot returning its group key
+DIMENSIONS = {
+    "all": lambda plot: None,
+    "Project_Type": lambda plot: plot.get("Project_Type"),
+    "Data_Source": lambda plot: plot.get("Data_Source"),
+    "Monitoring_Year": lambda plot: plot.get("Monitoring_Year"),
+    "year_month": lambda plot: (
+        {"year": plot["Timestamp"].year, "month": plot["Timestamp"].month}
+        if plot.get("Timestamp") is not None
+        else {"year": None, "month": None}
+    ),
+}
+
+# Only these plot fields matter to the rollups
+PROJECTION = {
+    field: 1
+    for field in ["ID", "Project_Type", "Data_Source", "Monitoring_Year", "Timestamp", "GPS_Lat", "GPS_Long", "location"]
+    + METRICS
+}
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return None if math.isnan(value) else value
+
+
+def plot_metrics(plot: Dict[str, Any]) -> Dict[str, float]:
+    """Numeric metric values of one plot (missing/NaN fields left out)"""
+    values = {}
+    for metric in METRICS:
+        value = _number(plot.get(metric))
+        if value is not None:
+            values[metric] = value
+    above = _number(plot.get("Biomass_above_kg"))
+    below = _number(plot.get("Biomass_below_kg"))
+    if above is not None and below is not None:
+        values["Biomass_total_kg"] = above + below
+    return values
+
+
+def _accumulator() -> Dict:
+    return defaultdict(
+        lambda: {"key": None, "count": 0, "sum": defaultdict(float), "n": defaultdict(int)}
+    )
+
+
+def bulk_upsert(collection, ops: List[UpdateOne]):
+    """Unordered bulk of $inc upserts, replaying the ones that lost an insert race"""
+    if not ops:
+        return
+    try:
+        collection.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        # Two writers upserting a brand-new group race on the unique index;
+        # the loser's $inc just needs to be replayed against the winner's doc
+        errors = e.details["writeErrors"]
+        if any(err["code"] != 11000 for err in errors):
+            raise
+        collection.bulk_write([ops[err["index"]] for err in errors], ordered=False)
+
+
+def _key_id(key) -> Tuple:
+    return tuple(sorted(key.items())) if isinstance(key, dict) else (key,)
+
+
+class PlotRollups:
+    def __init__(self, db):
+        self.plots = db["plots"]
+        self.rollups = db["plot_rollups"]
+        # Bumped on every plot write so result caches know to drop stale answers
+        self.versions = db["data_versions"]
+        self.tiles = PlotTiles(db)
+
+    def ensure_indexes(self):
+        apply_indexes(self.rollups.database, ["plot_rollups", "plots"])
+        self.tiles.ensure_indexes()
+
+    # ----------------- WRITES -----------------
+    def _deltas(self, plots: Iterable[Dict[str, Any]], sign: int, acc: Dict):
+        for plot in plots:
+            metrics = plot_metrics(plot)
+            for dimension, key_of in DIMENSIONS.items():
+                key = key_of(plot)
+                entry = acc[(dimension, _key_id(key))]
+                entry["key"] = key
+                entry["count"] += sign
+                for metric, value in metrics.items():
+                    entry["sum"][metric] += sign * value
+                    entry["n"][metric] += sign
+
+    def apply(self, new_plots: List[Dict[str, Any]], old_plots: List[Dict[str, Any]] = ()):
+        """Fold new plot versions in and the versions they replace out"""
+        acc = _accumulator()
+        self._deltas(old_plots, -1, acc)
+        self._deltas(new_plots, 1, acc)
+        tiles = self.tiles.accumulator()
+        self.tiles.deltas(old_plots, -1, plot_metrics, tiles)
+        self.tiles.deltas(new_plots, 1, plot_metrics, tiles)
+
+        ops = []
+        for (dimension, _), entry in acc.items():
+            inc = {"count": entry["count"]}
+            inc.update({f"sum.{m}": v for m, v in entry["sum"].items() if v})
+            inc.update({f"n.{m}": v for m, v in entry["n"].items() if v})
+            if any(inc.values()):
+                ops.append(
+                    UpdateOne(
+                        {"dimension": dimension, "key": entry["key"]}, {"$inc": inc}, upsert=True
+                    )
+                )
+        bulk_upsert(self.rollups, ops)
+        bulk_upsert(self.tiles.tiles, self.tiles.update_ops(tiles))
+
+    def upsert_plots(self, plots: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Upsert plots by ID and keep the rollups in step"""
+        if not plots:
+            return {"upserted": 0, "modified": 0}
+        # Repeated IDs collapse into one row, merged in order like successive $sets;
+        # otherwise the old version would be folded out once but the new one in twice
+        rows: Dict[Any, Dict[str, Any]] = {}
+        for p in plots:
+            rows[p["ID"]] = {**rows.get(p["ID"], {}), **p}
+        plots = list(rows.values())
+        old = list(self.plots.find({"ID": {"$in": [p["ID"] for p in plots]}}, PROJECTION))
+        result = self.plots.bulk_write(
+            [
+                UpdateOne(
+                    {"ID": p["ID"]},
+                    {"$set": p, "$setOnInsert": {"created_at": datetime.now(timezone.utc)}},
+                    upsert=True,
+                )
+                for p in plots
+            ],
+            ordered=False,
+        )
+        # $set merges, so fold in the merged version of replaced plots
+        previous = {p["ID"]: p for p in old}
+        merged = [{**previous.get(p["ID"], {}), **p} for p in plots]
+        self.apply(merged, old)
+        self.versions.update_one({"_id": "plots"}, {"$inc": {"generation": 1}}, upsert=True)
+        return {"upserted": result.upserted_count, "modified": result.modified_count}
+
+    def rebuild(self) -> int:
+        """Recompute every rollup from the plots collection"""
+        acc = _accumulator()
+        tiles = self.tiles.accumulator()
+        total = 0
+        for plot in self.plots.find({}, PROJECTION, batch_size=5000):
+            self._deltas([plot], 1, acc)
+            self.tiles.deltas([plot], 1, plot_metrics, tiles)
+            total += 1
+
+        self.rollups.delete_many({})
+        docs = [
+            {
+                "dimension": dimension,
+                "key": entry["key"],
+                "count": entry["count"],
+                "sum": dict(entry["sum"]),
+                "n": dict(entry["n"]),
+            }
+            for (dimension, _), entry in acc.items()
+        ]
+        if docs:
+            self.rollups.insert_many(docs)
+        cells = self.tiles.replace_all(tiles)
+        self.versions.update_one({"_id": "plots"}, {"$inc": {"generation": 1}}, upsert=True)
+        logger.info(f"📦 Rebuilt {len(docs)} rollups and {cells} tiles from {total} plots")
+        return total
+
+    def _has_unique_groups(self) -> bool:
+        return any(
+            info.get("unique") and [field for field, _ in info["key"]] == ["dimension", "key"]
+            for info in self.rollups.index_information().values()
+        )
+
+    def ensure_built(self):
+        """Build the rollups on first start if plots exist but were never rolled up"""
+        self.ensure_indexes()
+        # bulk_upsert's race replay relies on the unique (dimension, key) index
+        if not self._has_unique_groups():
+            # The build fails on duplicate groups, left by racing writers without it
+            logger.warning("⚠️  plot_rollups has no unique (dimension, key) index; rebuilding before creating it")
+            self.rebuild()
+            self.rollups.create_indexes(INDEXES["plot_rollups"])
+        built = self.rollups.find_one({"dimension": "all"}) and self.tiles.tiles.find_one()
+        if not built and self.plots.find_one() is not None:
+            self.rebuild()
+
+    # ----------------- READS -----------------
+    def generation(self) -> int:
+        doc = self.versions.find_one({"_id": "plots"})
+        return doc["generation"] if doc else 0
+
+    def groups(self, dimension: str) -> List[Dict[str, Any]]:
+        return [
+            doc
+            for doc in self.rollups.find({"dimension": dimension}, {"_id": 0})
+            if doc["count"] > 0
+        ]
+
+    @staticmethod
+    def avg(doc: Dict[str, Any], metric: str) -> Optional[float]:
+        n = doc.get("n", {}).get(metric, 0)
+        return doc["sum"][metric] / n if n else None
+
+    def total_plots(self) -> int:
+        doc = self.rollups.find_one({"dimension": "all"})
+        return doc["count"] if doc else 0
+
+    def plots_overview(self) -> Dict[str, Any]:
+        by_type = [{"_id": g["key"], "count": g["count"]} for g in self.groups("Project_Type")]
+        by_type.sort(key=lambda r: r["count"], reverse=True)
+        return {"total_plots": self.total_plots(), "by_type": by_type}
+
+    def ndvi_by_project(self) -> List[Dict[str, Any]]:
+        rows = [{"_id": g["key"], "avgNDVI": self.avg(g, "NDVI")} for g in self.groups("Project_Type")]
+        rows.sort(key=lambda r: (r["avgNDVI"] is not None, r["avgNDVI"] or 0), reverse=True)
+        return rows
+
+    def _by_year(self, columns: Dict[str, str]) -> List[Dict[str, Any]]:
+        rows = []
+        for g in self.groups("Monitoring_Year"):
+            row = {"_id": g["key"]}
+            for name, metric in columns.items():
+                row[name] = self.avg(g, metric)
+            rows.append(row)
+        rows.sort(key=lambda r: (r["_id"] is not None, r["_id"] or 0))
+        return rows
+
+    def biomass_trend(self) -> List[Dict[str, Any]]:
+        rows = self._by_year({"avgAbove": "Biomass_above_kg", "avgBelow": "Biomass_below_kg"})
+        totals = {g["key"]: g["sum"].get("Biomass_total_kg", 0) for g in self.groups("Monitoring_Year")}
+        for row in rows:
+            row["total"] = totals[row["_id"]]
+        return rows
+
+    def fluxes(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            "co2": self._by_year({"avgCO2": "CO2_Flux_mg_m2_day"}),
+            "ch4": self._by_year({"avgCH4": "CH4_Flux_mg_m2_day"}),
+        }
+
+    def ndvi_monthly(self) -> List[Dict[str, Any]]:
+        rows = [{"_id": g["key"], "avgNDVI": self.avg(g, "NDVI")} for g in self.groups("year_month")]
+        rows.sort(key=lambda r: (r["_id"]["year"] or 0, r["_id"]["month"] or 0))
+        return rows
+
+
+if __name__ == "__main__":
+    from app.database import db_client
+    from app.logs import configure_logging
+
+    configure_logging()
+
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m app.rollups rebuild")
+    rollups = PlotRollups(db_client.sync_db)
+    rollups.ensure_indexes()
+    rollups.rebuild()
@@ -0,0 +1,180 @@
+"""
+JSON-RPC batching for contract reads
+
+Concurrent eth_calls from worker threads are coalesced into one JSON-RPC batch
+POST: the first caller becomes the sender; callers arriving while a batch is
+in flight queue up and go out together in the next one, so an idle node sees
+no added latency and a busy one sees far fewer round trips. web3 v6 has no
+batch API, so requests are encoded/decoded with the contract ABI and posted
+directly to the provider's endpoint.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, List, Optional
+
+import requests
+from hexbytes import HexBytes
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from web3.exceptions import BadFunctionCallOutput, ContractLogicError
+
+from app.metrics import RPC_BATCH_SIZE, RPC_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("fn", "block", "value", "error", "done", "promoted", "wake")
+
+    def __init__(self, fn, block):
+        self.fn = fn
+        self.block = block
+        self.value = None
+        self.error: Optional[Exception] = None
+        self.done = False
+        self.promoted = False
+        self.wake = threading.Event()
+
+    def finish(self, value=None, error: Exception = None):
+        self.value, self.error, self.done = value, error, True
+        self.wake.set()
+
+
+class RpcBatcher:
+    """Coalesces ContractFunction.call()s into JSON-RPC batches"""
+
+    def __init__(self, w3, max_batch: int = None, window: float = None):
+        self.w3 = w3
+        # Pooled providers route and fail over batches themselves
+        self.post_batch = getattr(w3.provider, "post_batch", None) or self._post
+        self.max_batch = max_batch or int(os.getenv("RPC_BATCH_MAX", 100))
+        # Extra time the sender waits for company before posting (0 = only natural batching)
+        self.window = window if window is not None else float(os.getenv("RPC_BATCH_WINDOW_MS", 2)) / 1000
+        self.supported = True
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._pending: List[_Call] = []
+        self._sending = False
+        self._ids = 0
+
+    # ----------------- CALLERS -----------------
+    def call(self, contract_fn, block_identifier="latest") -> Any:
+        return self.call_many([contract_fn], block_identifier)[0]
+
+    def call_many(self, contract_fns: List, block_identifier="latest") -> List[Any]:
+        """Results in order; raises the first failed call's error"""
+        block = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+        items = [_Call(fn, block) for fn in contract_fns]
+        if not items:
+            return []
+        with self._lock:
+            self._pending.extend(items)
+            lead = not self._sending
+            self._sending = True
+        if lead:
+            self._flush()
+
+        for item in items:
+            while not item.done:
+                item.wake.wait()
+                item.wake.clear()
+                if item.promoted and not item.done:
+                    item.promoted = False
+                    self._flush()
+        for item in items:
+            if item.error is not None:
+                raise item.error
+        return [item.value for item in items]
+
+    # ----------------- SENDER -----------------
+    def _flush(self):
+        """Send one batch, then hand the sender role to the oldest queued call"""
+        if self.window:
+            time.sleep(self.window)
+        with self._lock:
+            batch = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+        try:
+            self._send(batch)
+        except Exception as e:
+            for item in batch:
+                if not item.done:
+                    item.finish(error=e)
+        finally:
+            with self._lock:
+                if self._pending:
+                    self._pending[0].promoted = True
+                    self._pending[0].wake.set()
+                else:
+                    self._sending = False
+
+    def _send(self, batch: List[_Call]):
+        if not self.supported or len(batch) == 1:
+            return self._send_each(batch)
+
+        payload = []
+        for item in batch:
+            self._ids += 1
+            payload.append(
+                {
+                    "jsonrpc": "2.0",
+                    "id": self._ids,
+                    "method": "eth_call",
+                    "params": [{"to": item.fn.address, "data": item.fn._encode_transaction_data()}, item.block],
+                }
+            )
+
+        start = time.perf_counter()
+        try:
+            replies = json.loads(self.post_batch(json.dumps(payload).encode()))
+        except Exception as e:
+            logger.warning(f"⚠️  RPC batch of {len(batch)} failed ({e}), sending calls one by one")
+            return self._send_each(batch)
+        finally:
+            RPC_SECONDS.observe(time.perf_counter() - start, method="batch")
+        RPC_BATCH_SIZE.observe(len(batch))
+
+        if not isinstance(replies, list):
+            # Node answered the array with a single error object: no batch support
+            self.supported = False
+            logger.warning("⚠️  RPC node rejected a JSON-RPC batch; falling back to single calls")
+            return self._send_each(batch)
+
+        by_id = {reply.get("id"): reply for reply in replies}
+        for request, item in zip(payload, batch):
+            reply = by_id.get(request["id"])
+            if reply is None:
+                item.finish(error=BadFunctionCallOutput("no reply for call in RPC batch"))
+            elif "error" in reply:
+                error = reply["error"]
+                item.finish(error=ContractLogicError(error.get("message", str(error)), data=error.get("data")))
+            else:
+                try:
+                    item.finish(self._decode(item.fn, reply["result"]))
+                except Exception as e:
+                    item.finish(error=e)
+
+    def _post(self, data: bytes) -> bytes:
+        provider = self.w3.provider
+        response = self._session.post(provider.endpoint_uri, data=data, **provider.get_request_kwargs())
+        response.raise_for_status()
+        return response.content
+
+    def _send_each(self, batch: List[_Call]):
+        for item in batch:
+            try:
+                item.finish(item.fn.call(block_identifier=item.block))
+            except Exception as e:
+                item.finish(error=e)
+
+    def _decode(self, contract_fn, result: str):
+        types = get_abi_output_types(contract_fn.abi)
+        data = HexBytes(result)
+        if not data and types:
+            raise BadFunctionCallOutput(f"{contract_fn.fn_name} returned no data")
+        values = map_abi_data(BASE_RETURN_NORMALIZERS, types, self.w3.codec.decode(types, data))
+        return values[0] if len(values) == 1 else values
@@ -0,0 +1,210 @@
+"""
+Pooled multi-endpoint JSON-RPC provider
+
+RPC_URLS lists several nodes (comma-separated; RPC_URL alone still works).
+Each endpoint keeps its own keep-alive session pool and a latency EWMA.
+Reads go to the fastest healthy endpoint, writes and nonce lookups to the
+primary (the first URL). Failed requests move on to the next endpoint with
+exponential backoff (writes only when they provably never left). An endpoint
+that keeps failing is taken out of rotation (circuit breaker) and retried
+after a cooldown.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3.providers import JSONBaseProvider
+
+from app.metrics import RPC_ENDPOINT_FAILURES, RPC_ENDPOINT_LATENCY, RPC_ENDPOINT_OPEN, RPC_ENDPOINT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+WRITE_METHODS = {"eth_sendRawTransaction", "eth_sendTransaction"}
+# Sent to the primary so the node that took a tx also answers its nonce
+PRIMARY_METHODS = WRITE_METHODS | {"eth_getTransactionCount"}
+# Retryable HTTP statuses: rate limited or the node/gateway is struggling
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def endpoint_label(url: str) -> str:
+    """scheme://host[:port] only; provider URLs often carry an API key in the path"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc.rsplit('@', 1)[-1]}"
+
+
+class RpcError(ConnectionError):
+    def __init__(self, message: str, unsent: bool = False):
+        super().__init__(message)
+        self.unsent = unsent
+
+
+def unsent(error: Exception) -> bool:
+    """True only when the request provably never reached the node
+
+    A write that may have landed must not be resent elsewhere: the second node
+    answers "already known", which the nonce manager treats as a spent nonce.
+    """
+    if isinstance(error, RpcError):
+        return error.unsent
+    return isinstance(error, requests.ConnectTimeout) or (
+        isinstance(error, requests.ConnectionError) and "NewConnectionError" in repr(error)
+    )
+
+
+class Endpoint:
+    def __init__(self, url: str, pool_size: int, timeout: float):
+        self.url = url
+        self.label = endpoint_label(url)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.latency: Optional[float] = None
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def available(self, now: float) -> bool:
+        """Closed, or open with the cooldown over (half-open: one trial request)"""
+        return self.open_until <= now
+
+    def post(self, data: bytes) -> bytes:
+        start = time.perf_counter()
+        response = self.session.post(
+            self.url, data=data, headers={"Content-Type": "application/json"}, timeout=self.timeout
+        )
+        if response.status_code in RETRY_STATUSES:
+            raise RpcError(f"{self.label} answered HTTP {response.status_code}", unsent=response.status_code == 429)
+        response.raise_for_status()
+        self.succeeded(time.perf_counter() - start)
+        return response.content
+
+    def succeeded(self, seconds: float):
+        with self._lock:
+            self.requests += 1
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+            self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+
+    def failed(self, threshold: int, cooldown: float) -> bool:
+        """Record a failure; True when this one tripped the breaker"""
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= threshold:
+                self.open_until = time.time() + cooldown
+                return True
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.label,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+            "circuit_open": not self.available(time.time()),
+        }
+
+
+class PooledHTTPProvider(JSONBaseProvider):
+    """web3 provider over several HTTP endpoints; the first URL is the primary"""
+
+    def __init__(
+        self,
+        urls: List[str],
+        retries: int = None,
+        backoff: float = None,
+        breaker_threshold: int = None,
+        breaker_cooldown: float = None,
+        pool_size: int = None,
+        timeout: float = None,
+    ):
+        super().__init__()
+        if not urls:
+            raise ValueError("at least one RPC URL is required")
+        pool_size = pool_size or int(os.getenv("RPC_POOL_SIZE", 32))
+        timeout = timeout or float(os.getenv("RPC_TIMEOUT", 10))
+        self.endpoints = [Endpoint(url, pool_size, timeout) for url in urls]
+        self.primary = self.endpoints[0]
+        self.retries = retries if retries is not None else int(os.getenv("RPC_RETRIES", 2))
+        self.backoff = backoff if backoff is not None else float(os.getenv("RPC_BACKOFF_MS", 100)) / 1000
+        self.breaker_threshold = breaker_threshold or int(os.getenv("RPC_BREAKER_THRESHOLD", 3))
+        self.breaker_cooldown = breaker_cooldown or float(os.getenv("RPC_BREAKER_COOLDOWN", 30))
+
+    # Same surface as HTTPProvider for code that posts raw payloads (RpcBatcher)
+    @property
+    def endpoint_uri(self) -> str:
+        return self.primary.url
+
+    def route(self, primary: bool = False) -> List[Endpoint]:
+        """Endpoints to try in order: healthy ones first, fastest (or primary) first"""
+        now = time.time()
+        healthy = [e for e in self.endpoints if e.available(now)]
+        # Unmeasured endpoints sort first so each gets probed once
+        healthy.sort(key=lambda e: e.latency or 0.0)
+        if primary and self.primary in healthy:
+            healthy.remove(self.primary)
+            healthy.insert(0, self.primary)
+        # Everything open: try them anyway, soonest to recover first
+        tripped = sorted((e for e in self.endpoints if e not in healthy), key=lambda e: e.open_until)
+        return healthy + tripped
+
+    def post(self, data: bytes, primary: bool = False, write: bool = False) -> bytes:
+        """POST a JSON-RPC payload, failing over across endpoints with backoff"""
+        order = self.route(primary)
+        attempts = self.retries + 1
+        for attempt in range(attempts):
+            endpoint = order[attempt % len(order)]
+            try:
+                return endpoint.post(data)
+            except (requests.RequestException, RpcError) as e:
+                if endpoint.failed(self.breaker_threshold, self.breaker_cooldown):
+                    logger.warning(f"⚠️  RPC endpoint {endpoint.label} out of rotation for {self.breaker_cooldown:g}s: {e}")
+                if attempt == attempts - 1 or (write and not unsent(e)):
+                    raise RpcError(f"RPC request failed on {endpoint.label}: {e}") from e
+                time.sleep(self.backoff * 2**attempt * random.uniform(0.5, 1.5))
+
+    def post_batch(self, data: bytes) -> bytes:
+        return self.post(data)
+
+    def make_request(self, method, params):
+        raw = self.post(
+            self.encode_rpc_request(method, params), primary=method in PRIMARY_METHODS, write=method in WRITE_METHODS
+        )
+        return self.decode_rpc_response(raw)
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        try:
+            response = self.make_request("web3_clientVersion", [])
+        except Exception:
+            if show_traceback:
+                raise
+            return False
+        return "error" not in response
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+    def watch(self):
+        """Publish per-endpoint stats on /metrics"""
+        RPC_ENDPOINT_REQUESTS.set_function(lambda: {(e.label,): e.requests for e in self.endpoints})
+        RPC_ENDPOINT_FAILURES.set_function(lambda: {(e.label,): e.failures for e in self.endpoints})
+        RPC_ENDPOINT_LATENCY.set_function(lambda: {(e.label,): e.latency or 0.0 for e in self.endpoints})
+        RPC_ENDPOINT_OPEN.set_function(lambda: {(e.label,): int(not e.available(time.time())) for e in self.endpoints})
+
+
+def rpc_urls() -> List[str]:
+    # Same default as Web3.HTTPProvider() when nothing is configured
+    urls = os.getenv("RPC_URLS") or os.getenv("RPC_URL") or "http://localhost:8545"
+    return [url.strip() for url in urls.split(",") if url.strip()]
@@ -0,0 +1,72 @@
+"""
+Streaming helpers for large result sets
+
+Blocking cursors are drained a batch at a time in a worker thread, encoded
+(NDJSON or CSV) and optionally gzipped per batch, so memory stays bounded by
+one batch whatever the result size.
+"""
+
+import asyncio
+import csv
+import io
+import itertools
+import zlib
+from datetime import datetime
+from typing import Dict, Any, AsyncIterator, Iterator, List
+
+from app.responses import dumps, bson_default
+
+
+async def iter_batches(rows: Iterator[Dict[str, Any]], batch_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Lists of up to batch_size rows, pulled off the event loop"""
+    while True:
+        batch = await asyncio.to_thread(lambda: list(itertools.islice(rows, batch_size)))
+        if not batch:
+            break
+        yield batch
+
+
+def encode_ndjson(batch: List[Dict[str, Any]]) -> bytes:
+    return b"".join(dumps(row) + b"\n" for row in batch)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return dumps(value).decode()
+    if isinstance(value, (str, int, float)):
+        return value
+    return bson_default(value)
+
+
+def encode_csv(batch: List[Dict[str, Any]], fields: List[str], header: bool = False) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if header:
+        writer.writerow(fields)
+    for row in batch:
+        writer.writerow([_csv_value(row.get(field)) for field in fields])
+    return out.getvalue().encode()
+
+
+async def iter_ndjson(rows: Iterator[Dict[str, Any]], batch_size: int = 500) -> AsyncIterator[bytes]:
+    """One JSON document per line"""
+    async for batch in iter_batches(rows, batch_size):
+        yield encode_ndjson(batch)
+
+
+async def iter_csv(rows: Iterator[Dict[str, Any]], fields: List[str], batch_size: int = 500) -> AsyncIterator[bytes]:
+    yield encode_csv([], fields, header=True)
+    async for batch in iter_batches(rows, batch_size):
+        yield encode_csv(batch, fields)
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """gzip on the fly, sync-flushed per chunk so clients see data as it is produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
@@ -0,0 +1,147 @@
+"""
+Quadtree (slippy map z/x/y) pre-aggregation of plots for map rendering
+
+Every plot falls in one Web Mercator tile per zoom level 0..TILE_MAX_ZOOM.
+`plot_tiles` keeps count plus per-metric sum/n per tile, folded in by delta
+from PlotRollups on every plot write, so /tiles/{z}/{x}/{y} returns at most
+4**detail cells regardless of how many plots exist.
+"""
+
+import math
+import os
+from collections import defaultdict
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.indexes import apply_indexes
+
+# Summed per tile; the GPS sums give each cell a plot-weighted centre
+TILE_METRICS = ["NDVI", "Carbon_t", "CO2e_t", "Biomass_total_kg", "GPS_Long", "GPS_Lat"]
+MAX_LAT = 85.05112878
+
+
+def tile_of(lon: float, lat: float, zoom: int) -> Tuple[int, int]:
+    n = 1 << zoom
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    phi = math.radians(lat)
+    y = int((1.0 - math.log(math.tan(phi) + 1 / math.cos(phi)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def plot_position(plot: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    lon, lat = plot.get("GPS_Long"), plot.get("GPS_Lat")
+    if isinstance(lon, (int, float)) and isinstance(lat, (int, float)) and not (math.isnan(lon) or math.isnan(lat)):
+        return lon, lat
+    coords = (plot.get("location") or {}).get("coordinates")
+    return tuple(coords) if coords else None
+
+
+class PlotTiles:
+    def __init__(self, db, max_zoom: int = None):
+        self.tiles = db["plot_tiles"]
+        if max_zoom is None:
+            max_zoom = int(os.getenv("TILE_MAX_ZOOM", 12))
+        self.max_zoom = max_zoom
+
+    def ensure_indexes(self):
+        apply_indexes(self.tiles.database, ["plot_tiles"])
+
+    # ----------------- WRITES -----------------
+    def deltas(self, plots: Iterable[Dict[str, Any]], sign: int, metrics_of, acc: Dict):
+        """Fold plots into acc[(z, x, y)]; metrics_of(plot) gives its metric values"""
+        for plot in plots:
+            position = plot_position(plot)
+            if position is None:
+                continue
+            values = {m: v for m, v in metrics_of(plot).items() if m in TILE_METRICS}
+            values["GPS_Long"], values["GPS_Lat"] = position
+            x, y = tile_of(*position, self.max_zoom)
+            for z in range(self.max_zoom, -1, -1):
+                shift = self.max_zoom - z
+                entry = acc[(z, x >> shift, y >> shift)]
+                entry["count"] += sign
+                for metric, value in values.items():
+                    entry["sum"][metric] += sign * value
+                    entry["n"][metric] += sign
+
+    @staticmethod
+    def accumulator() -> Dict:
+        return defaultdict(lambda: {"count": 0, "sum": defaultdict(float), "n": defaultdict(int)})
+
+    def update_ops(self, acc: Dict) -> List[UpdateOne]:
+        ops = []
+        for (z, x, y), entry in acc.items():
+            inc = {"count": entry["count"]}
+            inc.update({f"sum.{m}": v for m, v in entry["sum"].items() if v})
+            inc.update({f"n.{m}": v for m, v in entry["n"].items() if v})
+            if any(inc.values()):
+                ops.append(
+                    UpdateOne(
+                        {"_id": f"{z}/{x}/{y}"},
+                        {"$inc": inc, "$setOnInsert": {"z": z, "x": x, "y": y}},
+                        upsert=True,
+                    )
+                )
+        return ops
+
+    def replace_all(self, acc: Dict):
+        self.tiles.delete_many({})
+        docs = [
+            {
+                "_id": f"{z}/{x}/{y}",
+                "z": z,
+                "x": x,
+                "y": y,
+                "count": entry["count"],
+                "sum": dict(entry["sum"]),
+                "n": dict(entry["n"]),
+            }
+            for (z, x, y), entry in acc.items()
+        ]
+        if docs:
+            self.tiles.insert_many(docs)
+        return len(docs)
+
+    # ----------------- READS -----------------
+    @staticmethod
+    def _cell(doc: Dict[str, Any]) -> Dict[str, Any]:
+        def mean(metric):
+            n = doc.get("n", {}).get(metric, 0)
+            return doc["sum"][metric] / n if n else None
+
+        return {
+            "z": doc["z"],
+            "x": doc["x"],
+            "y": doc["y"],
+            "count": doc["count"],
+            "lon": mean("GPS_Long"),
+            "lat": mean("GPS_Lat"),
+            "ndvi_mean": mean("NDVI"),
+            "carbon_t": doc["sum"].get("Carbon_t", 0),
+            "co2e_t": doc["sum"].get("CO2e_t", 0),
+            "biomass_kg": doc["sum"].get("Biomass_total_kg", 0),
+        }
+
+    def tile(self, z: int, x: int, y: int, detail: int = 3) -> Dict[str, Any]:
+        """A tile's totals plus its non-empty sub-cells `detail` zoom levels down"""
+        doc = self.tiles.find_one({"_id": f"{z}/{x}/{y}"})
+        depth = min(detail, self.max_zoom - z)
+        span = 1 << depth
+        cells = self.tiles.find(
+            {
+                "z": z + depth,
+                "x": {"$gte": x * span, "$lt": (x + 1) * span},
+                "y": {"$gte": y * span, "$lt": (y + 1) * span},
+                "count": {"$gt": 0},
+            }
+        )
+        return {
+            "z": z,
+            "x": x,
+            "y": y,
+            "summary": self._cell(doc) if doc and doc["count"] > 0 else None,
+            "cell_zoom": z + depth,
+            "cells": [self._cell(cell) for cell in cells],
+        }
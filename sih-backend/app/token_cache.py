@@ -0,0 +1,96 @@
+"""
+projectId → tokenId cache: resolved once, stored on the project document, held in an LRU
+"""
+
+import logging
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenIdCache:
+    """The mapping never changes after registerProject, so nothing here ever expires"""
+
+    def __init__(self, client, db, maxsize: int = None):
+        self.client = client
+        self.db = db
+        self.maxsize = maxsize or int(os.getenv("TOKEN_ID_CACHE_SIZE", 10000))
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, project_id: str) -> Optional[int]:
+        token_id = self._lru.get(project_id)
+        if token_id is not None:
+            self.hits += 1
+            self._lru.move_to_end(project_id)
+        else:
+            self.misses += 1
+        return token_id
+
+    def put(self, project_id: str, token_id: int):
+        self._lru[project_id] = token_id
+        self._lru.move_to_end(project_id)
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    async def remember(self, project_id: str, token_id: int):
+        """Record a freshly registered project's token id (from its receipt)"""
+        self.put(project_id, token_id)
+        await self.db.set_project_token_id(project_id, token_id)
+
+    async def resolve(self, project_id: str, project: Optional[Dict[str, Any]] = None) -> int:
+        """LRU, then the project document, then (once) the chain"""
+        token_id = self.get(project_id)
+        if token_id is not None:
+            return token_id
+
+        if project is None:
+            project = await self.db.get_project(project_id)
+        if project and project.get("token_id") is not None:
+            self.put(project_id, project["token_id"])
+            return project["token_id"]
+
+        token_id = await asyncio.to_thread(self.client.get_project_token_id, project_id)
+        # 0 means the contract has no such project; only persist real mappings
+        if token_id and project:
+            await self.remember(project_id, token_id)
+        return token_id
+
+    async def resolve_all(self) -> Dict[str, int]:
+        """project_id → token_id for every registered project"""
+        mappings, unresolved = {}, []
+        for project_id, token_id in (await self.db.get_project_token_ids()).items():
+            if token_id is None:
+                token_id = self.get(project_id)
+            if token_id is None:
+                unresolved.append(project_id)
+            elif token_id:
+                self.put(project_id, token_id)
+                mappings[project_id] = token_id
+
+        # Whatever is left goes to the chain in one batch
+        if unresolved:
+            for project_id, token_id in (await asyncio.to_thread(self.client.get_project_token_ids, unresolved)).items():
+                if token_id:
+                    await self.remember(project_id, token_id)
+                    mappings[project_id] = token_id
+        return mappings
+
+    async def warmup(self):
+        """Preload every registered project, backfilling documents that lack a token id"""
+        mappings = await self.db.get_project_token_ids()
+        missing = [pid for pid, token_id in mappings.items() if token_id is None]
+        for project_id, token_id in mappings.items():
+            if token_id is not None:
+                self.put(project_id, token_id)
+
+        resolved = await asyncio.to_thread(self.client.get_project_token_ids, missing) if missing else {}
+        for project_id, token_id in resolved.items():
+            if token_id:
+                await self.remember(project_id, token_id)
+
+        logger.info(f"🗂️  Token id cache warmed: {len(self._lru)} projects ({len(missing)} backfilled)")
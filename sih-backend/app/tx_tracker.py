@@ -0,0 +1,163 @@
+"""
+Background receipt tracker for transactions submitted without waiting for confirmation
+"""
+
+import logging
+import asyncio
+import os
+import time
+from typing import Dict, Any, Optional
+
+from app.metrics import RECEIPT_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Which project balance operation a confirmed tx applies
+BALANCE_OPERATIONS = {
+    "credit_issuance": "issue",
+    "credit_retirement": "retire",
+}
+
+# Contract function behind each tx type, for feeding gas usage back to the oracle
+TX_FUNCTIONS = {
+    "project_registration": "registerProject",
+    "credit_issuance": "issueCredits",
+    "credit_retirement": "retireCredits",
+}
+
+
+class ReceiptTracker:
+    """Polls receipts for in-flight tx hashes and settles the database once they are mined"""
+
+    def __init__(
+        self, client, db, token_ids=None, poll_interval: float = None, batch_size: int = None
+    ):
+        self.client = client
+        self.db = db
+        self.token_ids = token_ids
+        self.poll_interval = poll_interval or float(os.getenv("TX_POLL_INTERVAL", 2.0))
+        self.batch_size = batch_size or int(os.getenv("TX_POLL_BATCH_SIZE", 50))
+        self.in_flight: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def track(self, tx_type: str, tx_hash: str, details: Dict[str, Any]) -> Dict[str, Any]:
+        """Log a submitted tx as pending and start watching for its receipt"""
+        await self.db.log_transaction(tx_type, tx_hash, details, status="pending")
+        self.in_flight[tx_hash] = {
+            "tx_hash": tx_hash,
+            "type": tx_type,
+            "details": details,
+            "status": "pending",
+            "submitted_at": time.time(),
+        }
+        return self.in_flight[tx_hash]
+
+    def status(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """In-memory state of a tx still being watched"""
+        return self.in_flight.get(tx_hash)
+
+    async def resume(self):
+        """Pick up txs left pending by a previous run"""
+        for tx in await self.db.get_pending_transactions():
+            self.in_flight.setdefault(
+                tx["tx_hash"],
+                {
+                    "tx_hash": tx["tx_hash"],
+                    "type": tx["type"],
+                    "details": tx.get("details", {}),
+                    "status": tx["status"],
+                    "balance_applied": tx.get("balance_applied", False),
+                    "submitted_at": tx["created_at"].timestamp(),
+                },
+            )
+        if self.in_flight:
+            logger.info(f"🔁 Resumed tracking {len(self.in_flight)} pending transactions")
+
+    async def poll_once(self):
+        """Fetch receipts for every in-flight hash, batch by batch"""
+        hashes = list(self.in_flight)
+        for i in range(0, len(hashes), self.batch_size):
+            batch = hashes[i : i + self.batch_size]
+            receipts = await asyncio.to_thread(self.client.get_receipts, batch)
+            for tx_hash, receipt in receipts.items():
+                try:
+                    await self._settle(tx_hash, receipt)
+                except Exception as e:
+                    # Still in flight: the next poll picks up where this one stopped
+                    logger.warning(f"⚠️  Settling {tx_hash[:16]}... failed: {e}")
+
+    async def _release(self, tx_hash: str, tx: Dict[str, Any]):
+        try:
+            await self.db.release_claim(tx_hash)
+        except Exception as e:
+            # Still ours: our own next poll retries the settlement
+            logger.warning(f"⚠️  Could not release the claim on {tx_hash[:16]}...: {e}")
+            return
+        tx.update(status="pending", claimed=False)
+
+    async def _settle(self, tx_hash: str, receipt):
+        tx = self.in_flight[tx_hash]
+        # Every worker polls every pending tx: only the one that claims it moves balances
+        if await self.db.claim_transaction(tx_hash):
+            tx.update(status="settling", claimed=True)
+        elif not tx.get("claimed") and tx["status"] != "settling":
+            del self.in_flight[tx_hash]
+            return
+        status = "confirmed" if receipt.status == 1 else "failed"
+        details = tx["details"]
+        RECEIPT_WAIT_SECONDS.observe(
+            time.time() - tx["submitted_at"], function=TX_FUNCTIONS.get(tx["type"], tx["type"]), mode="async"
+        )
+
+        operation = BALANCE_OPERATIONS.get(tx["type"])
+        if status == "confirmed" and operation and not tx.get("balance_applied"):
+            if tx.get("claimed"):
+                try:
+                    await self.db.update_project_balance(
+                        details["project_id"], details["amount"], operation=operation
+                    )
+                except Exception:
+                    # Nothing moved: hand the claim back so the next poll (any worker) retries
+                    await self._release(tx_hash, tx)
+                    raise
+                tx["balance_applied"] = True
+                await self.db.mark_balance_applied(tx_hash)
+            else:
+                # Claimed by a run that died mid-settlement: the balance may or may
+                # not have moved, so leave it to the reconciler rather than guess
+                logger.warning(
+                    f"⚠️  {tx_hash[:16]}... was left settling; not reapplying its balance change "
+                    f"(run python -m app.reconcile check)"
+                )
+        if tx["type"] == "project_registration":
+            await self.db.set_project_status(
+                details["project_id"], "active" if status == "confirmed" else "failed"
+            )
+            token_id = self.client.registered_token_id(receipt)
+            if token_id is not None and self.token_ids is not None:
+                await self.token_ids.remember(details["project_id"], token_id)
+
+        if tx["type"] in TX_FUNCTIONS:
+            self.client.gas.observe(TX_FUNCTIONS[tx["type"]], receipt.gasUsed)
+
+        await self.db.update_transaction_status(tx_hash, status, receipt.blockNumber)
+        del self.in_flight[tx_hash]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self.in_flight:
+                continue
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.warning(f"⚠️  Receipt polling failed: {e}")
+
+    async def start(self):
+        await self.resume()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
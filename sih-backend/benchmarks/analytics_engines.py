@@ -0,0 +1,165 @@
+"""
+Mongo aggregation vs in-process columnar analytics
+
+Generates synthetic plots at each size, loads them into a scratch database
+and into a PlotColumnStore, then times the /analytics/* queries on both.
+
+    python benchmarks/analytics_engines.py --sizes 100000 1000000 10000000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.columnar import PlotColumnStore  # noqa: E402
+from app.mongo_options import mongo_client_options  # noqa: E402
+
+PROJECT_TYPES = ["Mangrove", "Wetland", "Peatland", "Blue Carbon"]
+SOURCES = ["Sensor", "Drone", "Manual"]
+METRICS = [
+    "NDVI",
+    "Biomass_above_kg",
+    "Biomass_below_kg",
+    "CO2_Flux_mg_m2_day",
+    "CH4_Flux_mg_m2_day",
+]
+
+# Same pipelines the "mongo" analytics source runs per request
+PIPELINES = {
+    "plots_overview": [
+        {"$group": {"_id": "$Project_Type", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+    ],
+    "ndvi_by_project": [
+        {"$group": {"_id": "$Project_Type", "avgNDVI": {"$avg": "$NDVI"}}},
+        {"$sort": {"avgNDVI": -1}},
+    ],
+    "biomass_trend": [
+        {
+            "$group": {
+                "_id": "$Monitoring_Year",
+                "avgAbove": {"$avg": "$Biomass_above_kg"},
+                "avgBelow": {"$avg": "$Biomass_below_kg"},
+                "total": {"$sum": {"$add": ["$Biomass_above_kg", "$Biomass_below_kg"]}},
+            }
+        },
+        {"$sort": {"_id": 1}},
+    ],
+    # Two scans: the mongo path groups CO2 and CH4 separately
+    "fluxes": [
+        [
+            {"$group": {"_id": "$Monitoring_Year", "avgCO2": {"$avg": "$CO2_Flux_mg_m2_day"}}},
+            {"$sort": {"_id": 1}},
+        ],
+        [
+            {"$group": {"_id": "$Monitoring_Year", "avgCH4": {"$avg": "$CH4_Flux_mg_m2_day"}}},
+            {"$sort": {"_id": 1}},
+        ],
+    ],
+    "ndvi_monthly": [
+        {"$addFields": {"month": {"$month": "$Timestamp"}, "year": {"$year": "$Timestamp"}}},
+        {"$group": {"_id": {"year": "$year", "month": "$month"}, "avgNDVI": {"$avg": "$NDVI"}}},
+        {"$sort": {"_id.year": 1, "_id.month": 1}},
+    ],
+}
+
+
+def synthesize(n: int, rng: np.random.Generator):
+    numeric = {
+        "NDVI": rng.uniform(0.1, 0.9, n).round(2),
+        "Biomass_above_kg": rng.uniform(500, 12000, n).round(1),
+        "Biomass_below_kg": rng.uniform(200, 5000, n).round(1),
+        "CO2_Flux_mg_m2_day": rng.uniform(50, 500, n).round(2),
+        "CH4_Flux_mg_m2_day": rng.uniform(10, 200, n).round(2),
+    }
+    seconds = rng.integers(0, 3 * 365 * 86400, n)
+    timestamp = np.datetime64("2022-01-01T00:00:00") + seconds.astype("timedelta64[s]")
+    year = timestamp.astype("datetime64[Y]").astype(np.int32) + 1970
+    project_type = rng.choice(PROJECT_TYPES, n)
+    source = rng.choice(SOURCES, n)
+    return numeric, year, timestamp, project_type, source, seconds
+
+
+def load_mongo(collection, n, numeric, year, project_type, source, seconds, batch=20000):
+    collection.drop()
+    base = datetime(2022, 1, 1)
+    for start in range(0, n, batch):
+        end = min(start + batch, n)
+        collection.insert_many(
+            [
+                {
+                    "ID": f"PLOT_{i}",
+                    "Project_Type": str(project_type[i]),
+                    "Data_Source": str(source[i]),
+                    "Monitoring_Year": int(year[i]),
+                    "Timestamp": base + timedelta(seconds=int(seconds[i])),
+                    **{m: float(numeric[m][i]) for m in METRICS},
+                }
+                for i in range(start, end)
+            ],
+            ordered=False,
+        )
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database", default="bluecarbon_bench")
+    parser.add_argument("--skip-mongo", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    collection = None
+    if not args.skip_mongo:
+        collection = MongoClient(os.getenv("MONGO_URI"), **mongo_client_options())[args.database]["plots"]
+
+    for n in args.sizes:
+        numeric, year, timestamp, project_type, source, seconds = synthesize(n, rng)
+
+        start = time.perf_counter()
+        store = PlotColumnStore()
+        store.append_columns(
+            list(range(n)), numeric, year, timestamp,
+            {"Project_Type": project_type, "Data_Source": source},
+        )
+        build_ms = (time.perf_counter() - start) * 1000
+        print(f"\n{n:,} plots (columnar build {build_ms:,.0f}ms)")
+
+        if collection is not None:
+            start = time.perf_counter()
+            load_mongo(collection, n, numeric, year, project_type, source, seconds)
+            print(f"  mongo load {time.perf_counter() - start:,.1f}s")
+
+        print(f"  {'query':16s} {'mongo ms':>10s} {'columnar ms':>12s} {'speedup':>8s}")
+        for name, pipeline in PIPELINES.items():
+            columnar_ms = timed(getattr(store, name), args.repeat)
+            if collection is None:
+                print(f"  {name:16s} {'-':>10s} {columnar_ms:12.2f}")
+                continue
+            pipelines = pipeline if isinstance(pipeline[0], list) else [pipeline]
+            mongo_ms = timed(
+                lambda: [list(collection.aggregate(p, allowDiskUse=True)) for p in pipelines],
+                args.repeat,
+            )
+            print(f"  {name:16s} {mongo_ms:10.1f} {columnar_ms:12.2f} {mongo_ms / columnar_ms:7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
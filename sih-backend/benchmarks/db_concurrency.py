@@ -0,0 +1,103 @@
+"""
+Concurrency benchmark for the BlueCarbon data layer
+
+Fires N concurrent project lookups and plot aggregations through each driver
+and reports throughput plus event-loop stall (how late a 10ms heartbeat fires
+while the load is running). "blocking" calls the sync pymongo methods straight
+from the coroutines, which is what the routes did before the async layer.
+
+    python benchmarks/db_concurrency.py --concurrency 200 --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.database import BlueCarbonDatabase, ThreadedDatabase  # noqa: E402
+from app.async_database import AsyncBlueCarbonDatabase  # noqa: E402
+
+PIPELINE = [
+    {"$group": {"_id": "$Project_Type", "avgNDVI": {"$avg": "$NDVI"}}},
+    {"$sort": {"avgNDVI": -1}},
+]
+
+
+class BlockingDatabase:
+    """Calls the sync driver directly on the event loop"""
+
+    def __init__(self, database):
+        self._database = database
+
+    def __getattr__(self, name):
+        method = getattr(self._database, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+async def heartbeat(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+async def run(db, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            if i % 4 == 0:
+                await db.aggregate_plots(PIPELINE)
+            else:
+                await db.get_project("KOD001")
+
+    stop = asyncio.Event()
+    lags = []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+
+    return {
+        "elapsed_s": elapsed,
+        "req_per_s": total / elapsed,
+        "max_loop_stall_ms": max(lags, default=elapsed) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    sync_db = BlueCarbonDatabase()
+    async_db = AsyncBlueCarbonDatabase()
+    await async_db.connect()
+
+    drivers = {
+        "blocking": BlockingDatabase(sync_db),
+        "pymongo+threads": ThreadedDatabase(sync_db),
+        "motor": async_db,
+    }
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent")
+    for name, db in drivers.items():
+        result = await run(db, args.requests, args.concurrency)
+        print(
+            f"  {name:16s} {result['req_per_s']:9.1f} req/s  "
+            f"{result['elapsed_s']:7.2f}s  loop stall {result['max_loop_stall_ms']:8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+Geospatial plot search benchmark: 2dsphere-indexed Mongo vs the in-memory grid
+
+Scatters synthetic plots over the Indian coastline bounding box, loads them
+into a scratch database (with the 2dsphere index) and into a GridPlotSearch,
+then times radius, bounding-box and nearest-N queries at random points.
+
+    python benchmarks/geo_search.py --sizes 1000000 5000000 --queries 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.geo import MongoPlotSearch, GridPlotSearch, bbox_polygon  # noqa: E402
+from app.mongo_options import mongo_client_options  # noqa: E402
+
+LON_RANGE = (68.0, 98.0)
+LAT_RANGE = (6.0, 36.0)
+FIELDS = ["ID", "NDVI"]
+
+
+def synthesize(n: int, rng: np.random.Generator):
+    lon = rng.uniform(*LON_RANGE, n)
+    lat = rng.uniform(*LAT_RANGE, n)
+    ndvi = rng.uniform(0.1, 0.9, n).round(2)
+    return [
+        {
+            "ID": f"PLOT_{i}",
+            "GPS_Long": float(lon[i]),
+            "GPS_Lat": float(lat[i]),
+            "NDVI": float(ndvi[i]),
+            "location": {"type": "Point", "coordinates": [float(lon[i]), float(lat[i])]},
+        }
+        for i in range(n)
+    ]
+
+
+def load_mongo(collection, plots, batch=20000):
+    collection.drop()
+    for start in range(0, len(plots), batch):
+        collection.insert_many([dict(p) for p in plots[start : start + batch]], ordered=False)
+
+
+def timed(queries, run) -> float:
+    """Median milliseconds per query"""
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        run(*query)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius-m", type=float, default=10000)
+    parser.add_argument("--bbox-deg", type=float, default=0.5)
+    parser.add_argument("--nearest", type=int, default=10)
+    parser.add_argument("--database", default="bluecarbon_bench")
+    parser.add_argument("--skip-mongo", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    db = None
+    if not args.skip_mongo:
+        db = MongoClient(os.getenv("MONGO_URI"), **mongo_client_options())[args.database]
+
+    points = list(zip(rng.uniform(*LON_RANGE, args.queries), rng.uniform(*LAT_RANGE, args.queries)))
+    queries = {
+        "near": lambda s: timed(points, lambda x, y: list(s.near(x, y, args.radius_m, 0, FIELDS))),
+        "within": lambda s: timed(
+            points,
+            lambda x, y: list(s.within(bbox_polygon(x, y, x + args.bbox_deg, y + args.bbox_deg), 0, FIELDS)),
+        ),
+        "nearest": lambda s: timed(points, lambda x, y: list(s.nearest(x, y, args.nearest, FIELDS))),
+    }
+
+    for n in args.sizes:
+        plots = synthesize(n, rng)
+
+        start = time.perf_counter()
+        grid = GridPlotSearch()
+        grid.add(plots)
+        print(f"\n{n:,} plots (grid build {time.perf_counter() - start:,.1f}s)")
+
+        mongo = None
+        if db is not None:
+            start = time.perf_counter()
+            load_mongo(db["plots"], plots)
+            mongo = MongoPlotSearch(db)
+            mongo.ensure_indexes()
+            print(f"  mongo load + 2dsphere index {time.perf_counter() - start:,.1f}s")
+
+        print(f"  {'query':10s} {'mongo ms':>10s} {'grid ms':>10s}")
+        for name, run in queries.items():
+            grid_ms = run(grid)
+            mongo_ms = f"{run(mongo):10.2f}" if mongo is not None else f"{'-':>10s}"
+            print(f"  {name:10s} {mongo_ms} {grid_ms:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Balance reconciliation benchmark
+
+Seeds N projects into a scratch database (a few percent of them drifted from
+the stand-in node's totalSupply), then checks every project:
+  per-project  - one totalSupply eth_call per project, one after another
+  reconciler   - BalanceReconciler.run_pass() (batched, block-pinned reads)
+
+    python benchmarks/reconcile.py --projects 5000 --latency-ms 40
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.standin_node import StandInNode  # noqa: E402
+
+node = StandInNode()
+os.environ["RPC_URL"] = node.url
+os.environ.setdefault("REGISTRY_ADDRESS", "0x" + "00" * 19 + "01")
+
+from app.blockchain import BlueCarbonClient, load_abi  # noqa: E402
+from app.mongo_options import mongo_client_options  # noqa: E402
+from app.reconcile import BalanceReconciler  # noqa: E402
+
+
+def seed(db, projects: int, drift_rate: float):
+    db["projects"].drop()
+    db["balance_drift"].drop()
+    db["reconcile_state"].drop()
+    db["projects"].create_index("project_id", unique=True)
+    docs, drifted = [], 0
+    for token_id in range(1, projects + 1):
+        circulating = token_id * 10  # what the stand-in node reports
+        if random.random() < drift_rate:
+            circulating += random.choice([-1, 1]) * random.randint(1, 5)
+            drifted += 1
+        docs.append(
+            {
+                "project_id": f"P{token_id:06d}",
+                "token_id": token_id,
+                "balances": {"total_issued": circulating, "total_retired": 0, "circulating": circulating},
+            }
+        )
+    db["projects"].insert_many(docs)
+    return drifted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--projects", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--drift-rate", type=float, default=0.02)
+    parser.add_argument("--database", default="bluecarbon_bench_reconcile")
+    args = parser.parse_args()
+
+    node.latency = args.latency_ms / 1000
+    db = MongoClient(os.getenv("MONGO_URI"), **mongo_client_options())[args.database]
+    client = BlueCarbonClient()
+    client.contract = client.w3.eth.contract(address="0x" + "00" * 19 + "02", abi=load_abi("BlueCarbon"))
+    client.contract_address = client.contract.address
+    client.w3.eth.chain_id  # warm web3's caches before timing
+    drifted = seed(db, args.projects, args.drift_rate)
+    total_supply = client.contract.get_function_by_signature("totalSupply(uint256)")
+
+    print(f"{args.projects} projects ({drifted} drifted), {args.latency_ms:g} ms per RPC request")
+    print(f"  {'path':12s} {'seconds':>8s} {'requests':>9s} {'drifted':>8s}")
+
+    # Cap the per-project path: at tens of ms per call it takes minutes
+    sample = list(db["projects"].find({}, {"token_id": 1, "balances": 1}).limit(500))
+    node.reset()
+    start = time.perf_counter()
+    found = sum(1 for p in sample if total_supply(p["token_id"]).call() != p["balances"]["circulating"])
+    elapsed = time.perf_counter() - start
+    scale = args.projects / len(sample)
+    print(f"  {'per-project':12s} {elapsed * scale:8.2f} {int(node.posts * scale):9d} {int(found * scale):8d}  (extrapolated from {len(sample)})")
+
+    node.reset()
+    reconciler = BalanceReconciler(client, db, confirmations=0)
+    start = time.perf_counter()
+    summary = reconciler.run_pass()
+    elapsed = time.perf_counter() - start
+    assert summary["drifted"] == drifted, summary
+    print(f"  {'reconciler':12s} {elapsed:8.2f} {node.posts:9d} {summary['drifted']:8d}")
+
+    start = time.perf_counter()
+    summary = reconciler.run_pass(repair=True)
+    elapsed = time.perf_counter() - start
+    print(f"  {'repair':12s} {elapsed:8.2f} {'':9s} {summary['repaired']:8d} repaired")
+    summary = reconciler.run_pass()
+    print(f"  {'re-check':12s} {'':8s} {'':9s} {summary['drifted']:8d} drifted after repair")
+
+
+if __name__ == "__main__":
+    main()
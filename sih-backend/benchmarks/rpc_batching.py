@@ -0,0 +1,67 @@
+"""
+JSON-RPC batching benchmark
+
+Runs N totalSupply(uint256) reads against a local stand-in node that adds a
+fixed per-request latency (like a remote RPC provider):
+  sequential  - one eth_call per read, one after another
+  concurrent  - 32 threads, one eth_call each (RPC_BATCHING=0 behaviour)
+  batched     - 32 threads through RpcBatcher (coalesced batches)
+  call_many   - one call_many() over all reads
+
+    python benchmarks/rpc_batching.py --reads 500 --latency-ms 40
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from web3 import Web3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.blockchain import load_abi  # noqa: E402
+from app.rpc_batch import RpcBatcher  # noqa: E402
+from benchmarks.standin_node import StandInNode  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+
+    node = StandInNode(latency_ms=args.latency_ms)
+    w3 = Web3(Web3.HTTPProvider(node.url))
+    contract = w3.eth.contract(address="0x" + "00" * 19 + "02", abi=load_abi("BlueCarbon"))
+    total_supply = contract.get_function_by_signature("totalSupply(uint256)")
+    w3.eth.chain_id  # warm web3's caches before timing
+    batcher = RpcBatcher(w3)
+    token_ids = list(range(1, args.reads + 1))
+
+    def concurrent(read):
+        with ThreadPoolExecutor(args.threads) as pool:
+            return list(pool.map(read, token_ids))
+
+    paths = {
+        "sequential": lambda: [total_supply(t).call() for t in token_ids],
+        "concurrent": lambda: concurrent(lambda t: total_supply(t).call()),
+        "batched": lambda: concurrent(lambda t: batcher.call(total_supply(t))),
+        "call_many": lambda: batcher.call_many([total_supply(t) for t in token_ids]),
+    }
+
+    print(f"{args.reads} reads, {args.latency_ms:g} ms per RPC request")
+    print(f"  {'path':12s} {'seconds':>8s} {'requests':>9s}")
+    for name, run in paths.items():
+        node.reset()
+        start = time.perf_counter()
+        results = run()
+        elapsed = time.perf_counter() - start
+        assert results == [t * 10 for t in token_ids], name
+        print(f"  {name:12s} {elapsed:8.2f} {node.posts:9d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Pooled RPC provider benchmark against local stand-in nodes
+
+Three nodes: the primary (40 ms), a fast one (5 ms) and a flaky one (5 ms,
+half its answers HTTP 503). Runs concurrent reads in phases:
+  baseline   - a single HTTPProvider on the primary
+  pooled     - PooledHTTPProvider over all three (reads chase the fast node)
+  fast down  - the fast node drops every connection mid-run (breaker + failover)
+then sends a write to show it stays on the primary.
+
+    python benchmarks/rpc_pool.py --reads 400
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from web3 import Web3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.rpc_pool import PooledHTTPProvider  # noqa: E402
+from benchmarks.standin_node import start_nodes  # noqa: E402
+
+
+def run_reads(w3: Web3, reads: int, threads: int):
+    def read(_):
+        start = time.perf_counter()
+        try:
+            w3.eth.block_number
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(read, range(reads)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(seconds for seconds, _ in results)
+    errors = sum(1 for _, error in results if error is not None)
+    return elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1], errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reads", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    primary, fast, flaky = nodes = start_nodes(
+        [{"latency_ms": 40}, {"latency_ms": 5}, {"latency_ms": 5, "fail_rate": 0.5}]
+    )
+    names = {primary.url: "primary", fast.url: "fast", flaky.url: "flaky"}
+    provider = PooledHTTPProvider([n.url for n in nodes], breaker_cooldown=5, backoff=0.01)
+    pooled = Web3(provider)
+
+    def phase(name, w3):
+        for node in nodes:
+            node.reset()
+        elapsed, p50, p99, errors = run_reads(w3, args.reads, args.threads)
+        spread = "  ".join(f"{names[n.url]}={n.posts}" for n in nodes)
+        print(f"  {name:10s} {elapsed:7.2f}s  p50 {p50 * 1000:6.1f}ms  p99 {p99 * 1000:6.1f}ms  errors {errors:3d}  {spread}")
+
+    print(f"{args.reads} eth_blockNumber reads, {args.threads} threads")
+    phase("baseline", Web3(Web3.HTTPProvider(primary.url)))
+    phase("pooled", pooled)
+    fast.down = True
+    phase("fast down", pooled)
+
+    print("\nendpoint stats")
+    for stats in provider.stats():
+        print(f"  {names[stats['endpoint']]:8s} {stats}")
+
+    for node in nodes:
+        node.reset()
+    fast.down = False
+    pooled.eth.send_raw_transaction("0x00")
+    print(f"\nwrite went to: {[names[n.url] for n in nodes if n.calls.get('eth_sendRawTransaction')]}")
+
+
+if __name__ == "__main__":
+    main()
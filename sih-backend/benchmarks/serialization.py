@@ -0,0 +1,96 @@
+"""
+Response serialization microbenchmark
+
+Renders synthetic project documents (ObjectId, datetimes, nested balances and
+location) the way the list endpoints return them:
+  jsonable_encoder - FastAPI's default path (ObjectId needs a custom encoder)
+  bson_response    - BSONResponse (orjson + BSON default hook)
+  bson_projected   - BSONResponse on the default list projection (no description)
+
+    python benchmarks/serialization.py --sizes 1000 10000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.responses import BSONResponse, orjson  # noqa: E402
+
+
+def project(i: int, now: datetime) -> dict:
+    created = now - timedelta(minutes=i)
+    return {
+        "_id": ObjectId(),
+        "project_id": f"PRJ{i:05d}",
+        "token_id": i + 1,
+        "name": f"Mangrove Restoration {i}",
+        "description": "Community-led restoration of degraded mangrove belts along the estuary. " * 6,
+        "project_type": random.choice(["mangrove", "seagrass", "saltmarsh"]),
+        "location": {
+            "country": "IN",
+            "region": "Kerala",
+            "coordinates": [random.uniform(8, 13), random.uniform(74, 78)],
+            "address": "Kochi, Ernakulam District, Kerala, India",
+        },
+        "status": "active",
+        "balances": {
+            "total_issued": random.randint(0, 10000),
+            "total_retired": random.randint(0, 1000),
+            "circulating": random.randint(0, 9000),
+            "last_updated": created,
+        },
+        "created_at": created,
+        "updated_at": created,
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(42)
+    now = datetime.now(timezone.utc)
+    print(f"encoder: {'orjson' if orjson else 'stdlib json (orjson not installed)'}")
+
+    for n in args.sizes:
+        docs = [project(i, now) for i in range(n)]
+        projected = [{k: v for k, v in doc.items() if k != "description"} for doc in docs]
+
+        paths = {
+            "jsonable_encoder": lambda: JSONResponse(jsonable_encoder(docs, custom_encoder={ObjectId: str})).body,
+            "bson_response": lambda: BSONResponse(docs).body,
+            "bson_projected": lambda: BSONResponse(projected).body,
+        }
+
+        print(f"\n{n:,} documents")
+        print(f"  {'path':18s} {'ms':>9s} {'KiB':>9s}")
+        baseline = None
+        for name, render in paths.items():
+            ms = timed(render, args.repeat)
+            size = len(render()) / 1024
+            baseline = baseline or ms
+            print(f"  {name:18s} {ms:9.2f} {size:9.0f}   {baseline / ms:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
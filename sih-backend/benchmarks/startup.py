@@ -0,0 +1,65 @@
+"""
+Cold start benchmark for the BlueCarbon API
+
+Measures, in a fresh interpreter each run:
+  import   - `import app.main` (must do no network I/O)
+  live     - lifespan entered, i.e. when the worker starts answering /livez
+  ready    - RPC + Mongo connected and background workers started
+
+    python benchmarks/startup.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PROBE = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import app.main as main
+t_import = time.perf_counter() - t0
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        t_live = time.perf_counter() - t0
+        while not main.startup_state["ready"] and not main.startup_state["error"]:
+            await asyncio.sleep(0.005)
+        t_ready = time.perf_counter() - t0
+    return t_live, t_ready, main.startup_state["error"]
+
+t_live, t_ready, error = asyncio.run(run())
+print(json.dumps({"import": t_import, "live": t_live, "ready": t_ready, "error": error}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = {"import": [], "live": [], "ready": []}
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        if result["error"]:
+            print(f"⚠️  startup error: {result['error']}")
+        for key in samples:
+            samples[key].append(result[key] * 1000)
+
+    print(f"Cold start over {args.runs} runs (ms)")
+    for key, values in samples.items():
+        print(
+            f"  {key:7s} median {statistics.median(values):8.1f}  "
+            f"min {min(values):8.1f}  max {max(values):8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+
+# app/ and benchmarks/ are imported as top-level packages from sih-backend
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# app.blockchain builds its client at import; point it somewhere harmless
+os.environ.setdefault("REGISTRY_ADDRESS", "0x" + "00" * 19 + "01")
+os.environ.setdefault("RPC_URL", "http://127.0.0.1:1")
+
+
+import threading  # noqa: E402
+
+import mongomock  # noqa: E402
+import pytest  # noqa: E402
+
+
+class AtomicCollection:
+    """mongomock collection whose single operations are atomic, as on a real server"""
+
+    def __init__(self, collection, lock: threading.Lock):
+        self._collection = collection
+        self._lock = lock
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return method(*args, **kwargs)
+
+        return call
+
+
+class AtomicDatabase:
+    """mongomock database handing out AtomicCollections, for tests that write from threads"""
+
+    def __init__(self, db):
+        self._db = db
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        return AtomicCollection(self._db[name], self._lock)
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+@pytest.fixture
+def atomic_db():
+    return AtomicDatabase(mongomock.MongoClient().db)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """The pymongo data layer (behind its awaitable facade) on an empty mongomock database"""
+    from app.database import BlueCarbonDatabase, ThreadedDatabase
+
+    monkeypatch.setattr("app.database.MongoClient", mongomock.MongoClient)
+    sync = BlueCarbonDatabase()
+    sync.client.drop_database(sync.db.name)
+    return ThreadedDatabase(sync)
@@ -0,0 +1,158 @@
+"""AggregateRequest validation, compiled-pipeline binding and server-version errors"""
+
+import asyncio
+import copy
+
+import pytest
+from pydantic import ValidationError
+from pymongo.errors import OperationFailure
+
+from app.aggregation import (
+    AggregateRequest,
+    AggregationEngine,
+    Filter,
+    Metric,
+    _Param,
+    bind,
+    compile_pipeline,
+)
+
+
+# ----------------- VALIDATION -----------------
+def test_duplicate_field_op_filters_are_rejected():
+    with pytest.raises(ValidationError, match="duplicate filters: NDVI gt"):
+        AggregateRequest(
+            filters=[{"field": "NDVI", "op": "gt", "value": 0.2}, {"field": "NDVI", "op": "gt", "value": 0.5}]
+        )
+
+
+def test_one_field_with_different_ops_is_a_range():
+    request = AggregateRequest(
+        filters=[{"field": "NDVI", "op": "gt", "value": 0.2}, {"field": "NDVI", "op": "lte", "value": 0.5}]
+    )
+    assert request.shape()[3] == (("NDVI", "gt"), ("NDVI", "lte"))
+
+
+@pytest.mark.parametrize(
+    "filter_, message",
+    [
+        ({"field": "Secret", "value": 1}, "cannot filter on Secret"),
+        ({"field": "NDVI", "op": "regex", "value": "x"}, "op must be one of"),
+        ({"field": "Project_Type", "op": "in", "value": "Mangrove"}, "in/nin filters take a list"),
+    ],
+)
+def test_bad_filters_are_rejected(filter_, message):
+    with pytest.raises(ValidationError, match=message):
+        Filter(**filter_)
+
+
+@pytest.mark.parametrize(
+    "metric, message",
+    [
+        ({"op": "median", "field": "NDVI"}, "op must be one of"),
+        ({"op": "avg", "field": "Project_Type"}, "unknown numeric field"),
+        ({"op": "percentile", "field": "NDVI"}, "percentile needs p"),
+        ({"op": "percentile", "field": "NDVI", "p": 1.5}, "percentile needs p"),
+    ],
+)
+def test_bad_metrics_are_rejected(metric, message):
+    with pytest.raises(ValidationError, match=message):
+        Metric(**metric)
+
+
+@pytest.mark.parametrize(
+    "request_, message",
+    [
+        ({"group_by": ["Owner"]}, "group_by must be among"),
+        ({"metrics": [{"field": "NDVI"}, {"field": "NDVI"}]}, "metrics need distinct names"),
+        ({"metrics": [{"field": "NDVI", "name": "_id"}]}, "metrics need distinct names"),
+        ({"metrics": []}, "metrics need distinct names"),
+        ({"limit": 0}, "limit must be greater than 0"),
+    ],
+)
+def test_bad_requests_are_rejected(request_, message):
+    with pytest.raises(ValidationError, match=message):
+        AggregateRequest(**request_)
+
+
+def test_timestamp_filters_parse_iso_strings():
+    value = Filter(field="Timestamp", op="gte", value="2024-01-01T00:00:00Z").value
+    assert value.year == 2024 and value.utcoffset().total_seconds() == 0
+
+
+def test_unknown_sort_key_is_rejected_at_compile():
+    request = AggregateRequest(group_by=["Project_Type"], sort=["-NDVI"])
+    with pytest.raises(ValueError, match="cannot sort on NDVI"):
+        compile_pipeline(request.shape())
+
+
+# ----------------- BINDING -----------------
+def ranged(low, high):
+    return AggregateRequest(
+        group_by=["Project_Type"],
+        metrics=[{"field": "NDVI", "name": "avgNDVI"}],
+        filters=[{"field": "NDVI", "op": "gte", "value": low}, {"field": "NDVI", "op": "lt", "value": high}],
+    )
+
+
+def test_bound_pipelines_never_leak_into_the_cached_template():
+    first, second = ranged(0.1, 0.4), ranged(0.5, 0.9)
+    assert first.shape() == second.shape()
+
+    template = compile_pipeline(first.shape())
+    pristine = copy.deepcopy(template)
+    bound_first = bind(template, first.values())
+    bound_second = bind(compile_pipeline(second.shape()), second.values())
+
+    assert compile_pipeline(second.shape()) is template  # a cache hit
+    assert bound_first[0] == {"$match": {"NDVI": {"$gte": 0.1, "$lt": 0.4}}}
+    assert bound_second[0] == {"$match": {"NDVI": {"$gte": 0.5, "$lt": 0.9}}}
+    assert isinstance(template[0]["$match"]["NDVI"]["$gte"], _Param)
+    assert bound_first[1:] == bound_second[1:] == pristine[1:]
+
+    bound_first[0]["$match"]["NDVI"]["$gte"] = 99
+    assert bind(template, second.values()) == bound_second
+
+
+class RecordingDatabase:
+    def __init__(self, error: Exception = None):
+        self.pipelines = []
+        self.error = error
+
+    async def aggregate_plots(self, pipeline):
+        self.pipelines.append(pipeline)
+        if self.error:
+            raise self.error
+        return [{"_id": "Mangrove", "avgNDVI": 0.5}]
+
+
+def test_engine_runs_each_value_set_against_its_own_pipeline():
+    db = RecordingDatabase()
+    engine = AggregationEngine(db, generation=lambda: 1)
+
+    async def scenario():
+        await engine.run(ranged(0.1, 0.4))
+        await engine.run(ranged(0.5, 0.9))
+        await engine.run(ranged(0.1, 0.4))  # result cache hit: no query
+
+    asyncio.run(scenario())
+    assert [p[0]["$match"]["NDVI"] for p in db.pipelines] == [{"$gte": 0.1, "$lt": 0.4}, {"$gte": 0.5, "$lt": 0.9}]
+    assert (engine.hits, engine.misses) == (1, 2)
+
+
+# ----------------- SERVER VERSION -----------------
+def percentile_request():
+    return AggregateRequest(group_by=["Project_Type"], metrics=[{"op": "percentile", "field": "NDVI", "p": 0.9}])
+
+
+def test_percentile_on_an_old_server_is_a_client_error():
+    old_server = OperationFailure("Unrecognized accumulator '$percentile'", code=15952)
+    engine = AggregationEngine(RecordingDatabase(old_server), generation=lambda: 1)
+    with pytest.raises(ValueError, match="MongoDB 7.0 or newer"):
+        asyncio.run(engine.run(percentile_request()))
+
+
+def test_other_server_errors_are_not_rewritten():
+    engine = AggregationEngine(RecordingDatabase(OperationFailure("interrupted", code=11601)), generation=lambda: 1)
+    with pytest.raises(OperationFailure):
+        asyncio.run(engine.run(percentile_request()))
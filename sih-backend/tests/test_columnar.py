@@ -0,0 +1,125 @@
+"""PlotColumnStore: same answers as the rollups and Mongo, and no change streams on a standalone mongod"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import mongomock
+import pytest
+from pymongo.errors import OperationFailure
+
+from app.aggregation import AggregationEngine
+from app.columnar import PlotColumnStore
+from app.rollups import PlotRollups
+
+PRESETS = ["plots_overview", "ndvi_by_project", "biomass_trend", "fluxes", "ndvi_monthly"]
+
+
+def make_plots():
+    plots = []
+    # Distinct group sizes so count-ordered presets have no ties
+    for i, (kind, n) in enumerate([("Mangrove", 6), ("Seagrass", 4), ("Saltmarsh", 2)]):
+        for j in range(n):
+            plots.append(
+                {
+                    "ID": f"{kind[:3].upper()}-{j}",
+                    "Project_Type": kind,
+                    "Data_Source": "drone" if j % 2 else "field",
+                    "Monitoring_Year": 2021 + j % 3,
+                    "Timestamp": datetime(2021 + j % 3, 1 + (i + j) % 12, 5),
+                    "NDVI": None if kind == "Saltmarsh" else 0.3 + 0.05 * j + 0.1 * i,
+                    "Biomass_above_kg": 100.0 + 10 * j,
+                    "Biomass_below_kg": 40.0 + 5 * i if j != 1 else None,
+                    "CO2_Flux_mg_m2_day": 12.5 * (j + 1),
+                    "CH4_Flux_mg_m2_day": 0.4 * i + 0.1 * j,
+                }
+            )
+    return plots
+
+
+def rounded(value):
+    if isinstance(value, float):
+        return round(value, 9)
+    if isinstance(value, dict):
+        return {k: rounded(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [rounded(v) for v in value]
+    return value
+
+
+class MongoPlots:
+    """What AggregationEngine needs from the data layer"""
+
+    def __init__(self, db):
+        self.plots = db["plots"]
+
+    async def aggregate_plots(self, pipeline):
+        return list(self.plots.aggregate(pipeline))
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    db["plots"].insert_many(make_plots())
+    return db
+
+
+def test_presets_match_rollups_and_mongo(db):
+    columnar = PlotColumnStore(db)
+    columnar.load(watch=False)
+    rollups = PlotRollups(db)
+    rollups.rebuild()
+    engine = AggregationEngine(MongoPlots(db), generation=lambda: 0)
+
+    for preset in PRESETS:
+        expected = rounded(getattr(rollups, preset)())
+        assert rounded(getattr(columnar, preset)()) == expected, preset
+        assert rounded(asyncio.run(getattr(engine, preset)())) == expected, preset
+
+
+class StandalonePlots:
+    """A plots collection on a mongod without a replica set"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+
+def test_standalone_mongod_falls_back_to_periodic_reloads(db):
+    plots = StandalonePlots(db["plots"])
+    store = PlotColumnStore({"plots": plots})
+    store.reload_seconds = 0.01
+    assert store.load() == 12
+    assert store.polling
+
+    store.start_watching()
+    try:
+        plots.insert_one({"ID": "NEW", "Project_Type": "Mangrove", "Monitoring_Year": 2024})
+        plots.delete_one({"ID": "SAL-0"})
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            overview = store.plots_overview()
+            if overview["total_plots"] == 12 and overview["by_type"][0]["count"] == 7:
+                break
+            time.sleep(0.01)
+        assert store.plots_overview()["by_type"] == [
+            {"_id": "Mangrove", "count": 7},
+            {"_id": "Seagrass", "count": 4},
+            {"_id": "Saltmarsh", "count": 1},
+        ]
+    finally:
+        store.stop_watching()
+
+
+def test_other_watch_failures_still_raise(db):
+    class Unauthorized(StandalonePlots):
+        def watch(self, *args, **kwargs):
+            raise OperationFailure("not authorized on bluecarbon to execute command", code=13)
+
+    with pytest.raises(OperationFailure):
+        PlotColumnStore({"plots": Unauthorized(db["plots"])}).load()
@@ -0,0 +1,31 @@
+"""Data layer module wiring"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def run(code: str, driver: str) -> str:
+    env = dict(os.environ, MONGO_DRIVER=driver, MONGO_URI="mongodb://127.0.0.1:1")
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+@pytest.mark.parametrize("first", ["app.async_database", "app.database"])
+def test_either_driver_module_imports_first(first):
+    run(f"import {first}, app.async_database, app.database", "motor")
+
+
+def test_importing_builds_no_client():
+    assert run("import app.database as d; print(d._db_client)", "motor") == "None"
+
+
+@pytest.mark.parametrize("driver,kind", [("motor", "AsyncBlueCarbonDatabase"), ("pymongo", "ThreadedDatabase")])
+def test_db_client_is_built_once_on_first_use(driver, kind):
+    code = "import app.database as d\nfrom app.database import db_client\nprint(type(db_client).__name__, db_client is d.db_client)"
+    assert run(code, driver) == f"{kind} True"
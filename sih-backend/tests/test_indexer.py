@@ -0,0 +1,162 @@
+"""ChainEventIndexer: replays and reorg rewinds move balances exactly once"""
+
+from types import SimpleNamespace
+
+import mongomock
+import pytest
+from hexbytes import HexBytes
+from web3 import Web3
+
+from app.indexer import ZERO_ADDRESS, ChainEventIndexer
+
+TOPIC = HexBytes("0x" + "aa" * 32)
+# Decoded event args carry checksummed addresses
+ALICE = Web3.to_checksum_address("0x" + "a1" * 20)
+BOB = Web3.to_checksum_address("0x" + "b0" * 20)
+
+
+class FakeEth:
+    """Blocks 0..head with a hash each, and logs keyed by block"""
+
+    def __init__(self, head: int):
+        self.block_number = head
+        self.hashes = {n: HexBytes(n.to_bytes(32, "big")) for n in range(head + 1)}
+        self.logs = {}
+
+    def get_block(self, number):
+        return SimpleNamespace(number=number, hash=self.hashes[number])
+
+    def get_logs(self, params):
+        return [
+            log
+            for block in range(params["fromBlock"], params["toBlock"] + 1)
+            for log in self.logs.get(block, [])
+        ]
+
+    def reorg(self, from_block: int):
+        """Replace every block from from_block up, dropping their logs"""
+        for n in range(from_block, self.block_number + 1):
+            self.hashes[n] = HexBytes(b"\xff" + n.to_bytes(31, "big"))
+            self.logs.pop(n, None)
+
+
+class Decoder:
+    @staticmethod
+    def process_log(log):
+        return log["decoded"]
+
+
+def transfer(eth, block, sender, receiver, token_id, value, index=0):
+    args = {"operator": sender, "from": sender, "to": receiver, "id": token_id, "value": value}
+    eth.logs.setdefault(block, []).append(
+        {
+            "topics": [TOPIC],
+            "blockNumber": block,
+            "blockHash": eth.hashes[block],
+            "transactionHash": HexBytes(bytes([block, index]) + b"\x00" * 30),
+            "logIndex": index,
+            "decoded": SimpleNamespace(event="TransferSingle", args=args),
+        }
+    )
+
+
+@pytest.fixture
+def chain():
+    eth = FakeEth(head=20)
+    db = mongomock.MongoClient().db
+    client = SimpleNamespace(w3=SimpleNamespace(eth=eth), contract_address="0x" + "00" * 19 + "02")
+    indexer = ChainEventIndexer(client, db, confirmations=2, start_block=0)
+    indexer._decoders = {TOPIC.hex(): Decoder()}
+    return eth, indexer
+
+
+def balances(indexer):
+    return {holder: {b["token_id"]: b["balance"] for b in indexer.holder_balances(holder)} for holder in (ALICE, BOB)}
+
+
+def seed(eth):
+    transfer(eth, 3, ZERO_ADDRESS, ALICE, 1, 100)  # mint
+    transfer(eth, 5, ALICE, BOB, 1, 30)
+    transfer(eth, 12, BOB, ZERO_ADDRESS, 1, 10)  # burn
+    transfer(eth, 16, ALICE, BOB, 1, 5)
+
+
+def test_indexes_transfers_into_balances_and_supply(chain):
+    eth, indexer = chain
+    seed(eth)
+    assert indexer.run_once() == 4
+    assert balances(indexer) == {ALICE: {1: 65}, BOB: {1: 25}}
+    assert indexer.token_totals(1)["supply"] == 90
+    assert indexer.status()["indexed_block"] == 18
+
+
+def test_replaying_the_same_range_folds_nothing_twice(chain):
+    eth, indexer = chain
+    seed(eth)
+    indexer.run_once()
+    # Checkpoint lost: the whole range is fetched and stored again
+    indexer.state.delete_many({})
+    assert indexer.run_once() == 4
+    assert balances(indexer) == {ALICE: {1: 65}, BOB: {1: 25}}
+    assert indexer.token_totals(1)["supply"] == 90
+
+
+def test_crash_between_folding_and_marking_refolds_nothing(chain, monkeypatch):
+    eth, indexer = chain
+    seed(eth)
+    apply = indexer._apply
+
+    def apply_then_crash(docs, sign):
+        apply(docs, sign)
+        raise SystemError("worker killed")
+
+    monkeypatch.setattr(indexer, "_apply", apply_then_crash)
+    with pytest.raises(SystemError):
+        indexer.run_once()
+    monkeypatch.undo()
+
+    assert indexer.events.count_documents({"folded": False}) == 4
+    indexer.run_once()
+    assert indexer.events.count_documents({"folded": False}) == 0
+    assert balances(indexer) == {ALICE: {1: 65}, BOB: {1: 25}}
+    assert indexer.token_totals(1)["supply"] == 90
+
+
+def test_reorg_rewinds_dropped_blocks_once(chain):
+    eth, indexer = chain
+    seed(eth)
+    indexer.run_once()  # up to block 18
+
+    # Deeper than the 2 confirmations: the rewind has to find the fork itself
+    eth.reorg(from_block=14)  # the transfer in block 16 never happened...
+    transfer(eth, 15, ALICE, BOB, 1, 7)  # ...this one did instead
+    indexer.run_once()
+    assert balances(indexer) == {ALICE: {1: 63}, BOB: {1: 27}}
+    assert indexer.events.count_documents({}) == 4
+
+
+def test_repeated_rewind_undoes_once(chain):
+    eth, indexer = chain
+    seed(eth)
+    indexer.run_once()
+    stale = list(indexer.events.find({"block_number": {"$gt": 10}}))
+    # A rewind that died before deleting the events runs again
+    indexer._apply(stale, -1)
+    indexer._rewind(10)
+    assert balances(indexer) == {ALICE: {1: 70}, BOB: {1: 30}}
+    assert indexer.token_totals(1)["supply"] == 100
+
+
+def test_values_beyond_int64_are_stored_but_not_folded(chain):
+    eth, indexer = chain
+    seed(eth)
+    transfer(eth, 7, ZERO_ADDRESS, BOB, 2, 2**64, index=1)
+    transfer(eth, 8, ZERO_ADDRESS, BOB, 2**200, 1, index=1)
+    indexer.run_once()
+
+    oversized = indexer.events.find_one({"values": str(2**64)})
+    assert oversized["oversized"] and oversized["deltas"] == []
+    assert indexer.events.find_one({"token_ids": str(2**200)})["oversized"]
+    assert balances(indexer) == {ALICE: {1: 65}, BOB: {1: 25}}
+    assert indexer.token_totals(2)["supply"] == 0
+    assert indexer.status()["oversized_events"] == 2
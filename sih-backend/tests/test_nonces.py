@@ -0,0 +1,174 @@
+"""NonceManager in memory and on a shared (mongomock) store"""
+
+import threading
+
+import pytest
+
+from app.blockchain import NonceManager, is_nonce_error
+
+ADDRESS = "0x" + "ab" * 20
+
+
+class FakeEth:
+    def __init__(self, pending: int = 0):
+        self.pending = pending
+        self.calls = 0
+
+    def get_transaction_count(self, address, block_identifier):
+        assert block_identifier == "pending"
+        self.calls += 1
+        return self.pending
+
+
+class FakeW3:
+    def __init__(self, pending: int = 0):
+        self.eth = FakeEth(pending)
+
+
+@pytest.fixture(params=["memory", "store"])
+def make_manager(request, atomic_db):
+    store = atomic_db["nonces"] if request.param == "store" else None
+
+    def make(pending: int = 0, **kwargs):
+        manager = NonceManager(FakeW3(pending), store=store)
+        manager.__dict__.update(kwargs)
+        return manager
+
+    return make
+
+
+def test_allocations_start_at_the_chain_nonce_and_count_up(make_manager):
+    manager = make_manager(pending=7)
+    assert [manager.allocate(ADDRESS) for _ in range(3)] == [7, 8, 9]
+    assert manager.w3.eth.calls == 1
+
+
+def test_concurrent_allocations_are_unique_and_contiguous(make_manager):
+    manager = make_manager(pending=3)
+    got, lock = [], threading.Lock()
+
+    def worker():
+        for _ in range(25):
+            nonce = manager.allocate(ADDRESS)
+            with lock:
+                got.append(nonce)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(got) == list(range(3, 3 + 200))
+
+
+def test_store_is_shared_between_managers(atomic_db):
+    store = atomic_db["nonces"]
+    first, second = NonceManager(FakeW3(0), store=store), NonceManager(FakeW3(0), store=store)
+    assert [first.allocate(ADDRESS), second.allocate(ADDRESS), first.allocate(ADDRESS)] == [0, 1, 2]
+
+
+def test_releasing_the_last_nonce_rewinds_the_counter(make_manager):
+    manager = make_manager()
+    nonces = [manager.allocate(ADDRESS) for _ in range(3)]
+    manager.release(ADDRESS, nonces[-1])
+    assert manager.allocate(ADDRESS) == 2
+
+
+def test_a_released_gap_is_reused_before_fresh_nonces(make_manager):
+    manager = make_manager()
+    a, b, c = (manager.allocate(ADDRESS) for _ in range(3))
+    manager.sent(ADDRESS, a)
+    manager.sent(ADDRESS, c)
+    manager.release(ADDRESS, b)  # c is already out: b becomes a gap
+    assert manager.allocate(ADDRESS) == b
+    assert manager.allocate(ADDRESS) == 3
+
+
+def test_release_after_sent_is_a_no_op(make_manager):
+    manager = make_manager()
+    nonce = manager.allocate(ADDRESS)
+    manager.allocate(ADDRESS)
+    manager.sent(ADDRESS, nonce)
+    manager.release(ADDRESS, nonce)
+    manager.release(ADDRESS, nonce)
+    assert manager.allocate(ADDRESS) == 2
+
+
+def test_releasing_a_middle_nonce_never_reissues_one_still_held(make_manager):
+    manager = make_manager()
+    held = [manager.allocate(ADDRESS) for _ in range(5)]
+    manager.w3.eth.pending = 0  # nothing sent yet
+    manager.release(ADDRESS, held[1])
+    manager.resync(ADDRESS)
+    # Only the given-back nonce comes round again; 0, 2, 3, 4 are still out
+    assert manager.allocate(ADDRESS) == 1
+    assert manager.allocate(ADDRESS) == 5
+
+
+def test_resync_moves_forward_past_nonces_used_elsewhere(make_manager):
+    manager = make_manager()
+    nonce = manager.allocate(ADDRESS)
+    manager.sent(ADDRESS, nonce)
+    manager.w3.eth.pending = 10  # another wallet/process used the key
+    manager.resync(ADDRESS)
+    assert manager.allocate(ADDRESS) == 10
+
+
+def test_resync_moves_back_only_once_nothing_is_in_flight(make_manager):
+    manager = make_manager()
+    for _ in range(3):
+        manager.sent(ADDRESS, manager.allocate(ADDRESS))
+    held = manager.allocate(ADDRESS)  # 3, not sent yet
+    manager.w3.eth.pending = 1  # the node dropped 1 and 2
+    manager.resync(ADDRESS)
+    assert manager.allocate(ADDRESS) == 4
+    manager.release(ADDRESS, 4)
+    manager.release(ADDRESS, held)
+    manager.resync(ADDRESS)
+    assert manager.allocate(ADDRESS) == 1
+
+
+def test_abandoned_leases_do_not_block_a_resync(make_manager):
+    manager = make_manager(lease_seconds=0)
+    manager.allocate(ADDRESS)
+    manager.allocate(ADDRESS)  # both "crashed" before sending
+    manager.resync(ADDRESS)
+    assert manager.allocate(ADDRESS) == 0
+
+
+def test_concurrent_allocate_release_and_resync_never_share_a_nonce(make_manager):
+    manager = make_manager()
+    held, lock, errors = set(), threading.Lock(), []
+
+    def worker(index):
+        for step in range(30):
+            nonce = manager.allocate(ADDRESS)
+            with lock:
+                if nonce in held:
+                    errors.append(nonce)
+                held.add(nonce)
+            if (index + step) % 3 == 0:
+                with lock:
+                    held.discard(nonce)
+                manager.release(ADDRESS, nonce)
+            elif step % 7 == 0:
+                manager.resync(ADDRESS)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+@pytest.mark.parametrize(
+    "message",
+    ["nonce too low", "already known", "replacement transaction underpriced", "Replacement Transaction Underpriced"],
+)
+def test_nonce_errors(message):
+    assert is_nonce_error(ValueError({"code": -32000, "message": message}))
+
+
+def test_other_errors_are_not_nonce_errors():
+    assert not is_nonce_error(ValueError("insufficient funds for gas * price + value"))
@@ -0,0 +1,173 @@
+"""Keyset pagination: cursors, tie-breaking, and the paged routes"""
+
+import base64
+import importlib
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app.pagination import decode_cursor, encode_cursor, keyset_after, split_page
+
+
+def b64(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+TAMPERED = [
+    "%%%",
+    "é",
+    "A",
+    b64("not json"),
+    b64("[1]"),
+    b64('{"a": 1}'),
+    b64('[{"$oid": "zz"}, 1]'),
+    b64('[{"$date": "x"}, 1]'),
+    b64('[{"$date": {"$numberLong": "99999999999999999999"}}, 1]'),
+    b64('[{"$numberDecimal": "x"}, 1]'),
+    b64('[{"$ne": null}, {"$oid": "65f000000000000000000000"}]'),
+    b64('[{"$regularExpression": {"pattern": ".*", "options": ""}}, 1]'),
+    b64("[true, 1]"),
+]
+
+
+# ----------------- HELPERS -----------------
+def test_cursor_round_trip():
+    doc = {"_id": ObjectId(), "created_at": datetime(2024, 5, 1, 12, 30, 15, 123000)}
+    value, _id = decode_cursor(encode_cursor(doc, "created_at"))
+    assert value.replace(tzinfo=None) == doc["created_at"]
+    assert _id == doc["_id"]
+
+
+def test_no_cursor_means_first_page():
+    assert decode_cursor(None) is None and decode_cursor("") is None
+    assert keyset_after("created_at", None) == {}
+
+
+@pytest.mark.parametrize("cursor", TAMPERED)
+def test_tampered_cursors_are_value_errors(cursor):
+    with pytest.raises(ValueError, match="invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_split_page():
+    docs = [{"_id": i, "t": 10 - i} for i in range(4)]
+    page, cursor = split_page(docs, 3, "t")
+    assert page == docs[:3]
+    assert decode_cursor(cursor) == (8, 2)
+    assert split_page(docs[:3], 3, "t") == (docs[:3], None)
+
+
+def test_keyset_walk_breaks_ties_on_id():
+    collection = mongomock.MongoClient().db["rows"]
+    # Three rows per timestamp: pages must split ties without skipping or repeating
+    base = datetime(2024, 1, 1)
+    collection.insert_many([{"t": base + timedelta(minutes=i // 3), "n": i} for i in range(20)])
+    expected = [d["n"] for d in collection.find().sort([("t", -1), ("_id", -1)])]
+
+    seen, after = [], None
+    while True:
+        docs = list(collection.find(keyset_after("t", after)).sort([("t", -1), ("_id", -1)]).limit(5))
+        page, cursor = split_page(docs, 4, "t")
+        seen.extend(d["n"] for d in page)
+        if cursor is None:
+            break
+        after = decode_cursor(cursor)
+    assert seen == expected
+
+
+# ----------------- ROUTES -----------------
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setenv("MONGO_DRIVER", "pymongo")
+    monkeypatch.setattr("app.database.MongoClient", mongomock.MongoClient)
+    main = importlib.import_module("app.main")
+    monkeypatch.setitem(main.startup_state, "ready", True)
+    db = main.db_client.sync_db
+    for name in ("projects", "transactions"):
+        db[name].delete_many({})
+    return TestClient(main.app), db
+
+
+def seed(db):
+    base = datetime(2024, 3, 1)
+    db["projects"].insert_many(
+        [{"project_id": f"P{i:02d}", "name": f"Project {i}", "created_at": base + timedelta(hours=i // 4)} for i in range(11)]
+    )
+    db["transactions"].insert_many(
+        [
+            {
+                "tx_hash": f"0x{i:04x}",
+                "project_id": "P01" if i % 2 else "P02",
+                "type": "credit_issuance",
+                "details": {"amount": i},
+                "timestamp": base + timedelta(minutes=i // 3),
+            }
+            for i in range(13)
+        ]
+    )
+
+
+def walk(client, path, read):
+    """Follow next cursors to the end; returns every row in order"""
+    rows, cursor = [], None
+    for _ in range(50):
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get(path, params=params)
+        assert response.status_code == 200, response.text
+        page, cursor = read(response)
+        assert len(page) <= 3
+        rows.extend(page)
+        if cursor is None:
+            return rows
+    raise AssertionError("pagination never ended")
+
+
+def from_header(response):
+    return response.json(), response.headers.get("X-Next-Cursor")
+
+
+def newest_first(docs, key):
+    return sorted(docs, key=lambda d: (d[key], d["_id"]), reverse=True)
+
+
+def test_projects_pages_cover_every_project_once(api):
+    client, db = api
+    seed(db)
+    rows = walk(client, "/projects", from_header)
+    expected = newest_first(db["projects"].find(), "created_at")
+    assert [r["project_id"] for r in rows] == [p["project_id"] for p in expected]
+
+
+def test_project_history_pages_stay_within_the_project(api):
+    client, db = api
+    seed(db)
+    rows = walk(client, "/projects/P01/history", from_header)
+    expected = newest_first(db["transactions"].find({"project_id": "P01"}), "timestamp")
+    assert [r["tx_hash"] for r in rows] == [t["tx_hash"] for t in expected]
+    assert "details" not in rows[0]
+
+
+def test_transaction_feed_pages_through_ties(api):
+    client, db = api
+    seed(db)
+    rows = walk(client, "/transactions", lambda r: (r.json()["transactions"], r.json()["next_cursor"]))
+    expected = newest_first(db["transactions"].find(), "timestamp")
+    assert [r["tx_hash"] for r in rows] == [t["tx_hash"] for t in expected]
+
+
+@pytest.mark.parametrize("path", ["/projects", "/projects/P01/history", "/transactions"])
+@pytest.mark.parametrize("cursor", TAMPERED)
+def test_tampered_cursor_is_a_400(api, path, cursor):
+    client, _ = api
+    response = client.get(path, params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "invalid cursor"
+
+
+@pytest.mark.parametrize("limit", [0, 501])
+def test_limit_out_of_range_is_a_400(api, limit):
+    client, _ = api
+    assert client.get("/transactions", params={"limit": limit}).status_code == 400
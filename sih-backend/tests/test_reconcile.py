@@ -0,0 +1,123 @@
+"""BalanceReconciler block pinning across endpoints that lag each other"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import mongomock
+import pytest
+from web3.exceptions import BlockNotFound, ContractLogicError
+
+from app.reconcile import BalanceReconciler, is_unknown_block_error
+
+HEAD = 100
+
+
+class LaggingEndpoints:
+    """Head from an up-to-date endpoint; the first `lag` reads land on one still behind it"""
+
+    def __init__(self, lag: int = 0, header_lag: int = 0):
+        self.lag = lag
+        self.header_lag = header_lag
+        self.reads = []
+        self.w3 = SimpleNamespace(eth=SimpleNamespace(block_number=HEAD, get_block=self.get_block))
+
+    def get_block(self, number):
+        if self.header_lag:
+            self.header_lag -= 1
+            raise BlockNotFound(f"Block with id: '{hex(number)}' not found.")
+        return SimpleNamespace(number=number, timestamp=int(datetime.now(timezone.utc).timestamp()))
+
+    def get_project_token_ids(self, project_ids):
+        return {project_id: 0 for project_id in project_ids}
+
+    def get_total_supplies(self, token_ids, block_identifier="latest"):
+        self.reads.append(block_identifier)
+        if self.lag:
+            self.lag -= 1
+            # What the batcher raises for geth's per-call error in a batch reply
+            raise ContractLogicError("header not found")
+        return {token_id: token_id * 10 for token_id in token_ids}
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    db["projects"].insert_many(
+        [
+            {
+                "project_id": f"P{i}",
+                "token_id": i,
+                "balances": {"total_issued": i * 10, "total_retired": 0, "circulating": i * 10, "last_updated": created},
+            }
+            for i in range(1, 6)
+        ]
+    )
+    return db
+
+
+def reconciler(client, db):
+    r = BalanceReconciler(client, db, batch_size=2, confirmations=2)
+    r.block_backoff = 0
+    return r
+
+
+def test_unknown_block_errors_are_recognised():
+    assert is_unknown_block_error(ValueError({"code": -32000, "message": "header not found"}))
+    assert is_unknown_block_error(ContractLogicError("unknown block"))
+    assert is_unknown_block_error(BlockNotFound("Block with id: '0x62' not found."))
+    assert not is_unknown_block_error(ContractLogicError("execution reverted"))
+
+
+def test_lagging_endpoint_is_waited_out_at_the_pinned_block(db):
+    client = LaggingEndpoints(lag=3)
+    summary = reconciler(client, db).run_pass()
+
+    assert summary["checked"] == 5 and summary["matched"] == 5
+    assert summary["to_block"] == HEAD - 2
+    # Retries stay on the pinned block rather than chasing a newer head
+    assert set(client.reads) == {HEAD - 2}
+    assert len(client.reads) == 3 + 3
+
+
+def test_header_from_a_lagging_endpoint_is_retried(db):
+    summary = reconciler(LaggingEndpoints(header_lag=2), db).run_pass()
+    assert summary["checked"] == 5
+
+
+def test_endpoint_that_never_catches_up_fails_the_pass_resumably(db):
+    client = LaggingEndpoints()
+    r = reconciler(client, db)
+    chunks = []
+
+    # First chunk goes through, the second keeps hitting the lagging endpoint
+    def lagging_after_first_chunk(token_ids, block_identifier="latest"):
+        chunks.append(token_ids)
+        if len(chunks) > 1:
+            raise ContractLogicError("header not found")
+        return {token_id: token_id * 10 for token_id in token_ids}
+
+    client.get_total_supplies = lagging_after_first_chunk
+    with pytest.raises(ContractLogicError):
+        r.run_pass()
+    assert len(chunks) == 1 + r.block_retries + 1
+    assert db["reconcile_state"].find_one({"_id": "balances"})["pass"]["cursor"] == "P2"
+
+    # Next pass picks up after the checkpoint once the endpoint has caught up
+    client.get_total_supplies = LaggingEndpoints().get_total_supplies
+    summary = r.run_pass()
+    assert summary["checked"] == 5
+
+
+def test_other_read_errors_are_not_retried(db):
+    client = LaggingEndpoints()
+    calls = []
+
+    def reverts(token_ids, block_identifier="latest"):
+        calls.append(token_ids)
+        raise ContractLogicError("execution reverted")
+
+    client.get_total_supplies = reverts
+    with pytest.raises(ContractLogicError):
+        reconciler(client, db).run_pass()
+    assert len(calls) == 1
@@ -0,0 +1,118 @@
+"""Rollups and tiles kept by streaming ingestion match a rebuild from plots"""
+
+import random
+
+import pytest
+
+from app.ingest import ingest
+from app.rollups import PlotRollups
+
+COLUMNS = [
+    "ID", "Project_Type", "Data_Source", "Monitoring_Year", "Timestamp", "GPS_Lat", "GPS_Long",
+    "NDVI", "Biomass_above_kg", "Biomass_below_kg", "CO2_Flux_mg_m2_day", "CH4_Flux_mg_m2_day", "Carbon_t",
+]
+
+
+@pytest.fixture(autouse=True)
+def shallow_tiles(monkeypatch):
+    # Fewer zoom levels keep mongomock fast; the fold logic is the same at every level
+    monkeypatch.setenv("TILE_MAX_ZOOM", "4")
+
+
+def write_csv(path, rows: int = 300, plots: int = 90, seed: int = 7):
+    """Rows revisiting plot IDs, often moving them to another group or tile"""
+    rng = random.Random(seed)
+    lines = [",".join(COLUMNS)]
+    for _ in range(rows):
+        year = rng.choice([2021, 2022, 2023])
+        lines.append(
+            ",".join(
+                [
+                    f"PLOT-{rng.randrange(plots):03d}",
+                    rng.choice(["Mangrove", "Seagrass", "Saltmarsh"]),
+                    rng.choice(["drone", "field", ""]),
+                    rng.choice([str(year), ""]),
+                    f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T08:00:00Z",
+                    f"{rng.uniform(8, 22):.5f}",
+                    f"{rng.uniform(68, 90):.5f}",
+                    rng.choice([f"{rng.uniform(0.1, 0.9):.3f}", ""]),
+                    f"{rng.uniform(50, 500):.2f}",
+                    rng.choice([f"{rng.uniform(10, 200):.2f}", "n/a"]),
+                    f"{rng.uniform(-5, 40):.2f}",
+                    f"{rng.uniform(0, 3):.3f}",
+                    f"{rng.uniform(0, 9):.3f}",
+                ]
+            )
+        )
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def groups(collection, key_fields):
+    """Non-empty groups with their sums, independent of write order"""
+    out = {}
+    for doc in collection.find({}, {"_id": 0}):
+        if doc["count"] == 0:
+            continue
+        n = {m: v for m, v in doc.get("n", {}).items() if v}
+        out[repr([doc[f] for f in key_fields])] = (
+            doc["count"],
+            n,
+            {m: round(doc["sum"][m], 6) for m in n},
+        )
+    return out
+
+
+def snapshot(rollups: PlotRollups):
+    return groups(rollups.rollups, ["dimension", "key"]), groups(rollups.tiles.tiles, ["z", "x", "y"])
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_ingest_matches_rebuild(tmp_path, atomic_db, workers):
+    path = write_csv(tmp_path / "plots.csv")
+    rollups = PlotRollups(atomic_db)
+    rollups.ensure_built()
+
+    totals = ingest([path], rollups, batch_size=16, workers=workers, chunk_rows=50)
+    assert totals["rows"] == 300
+    plots = len(atomic_db["plots"].distinct("ID"))
+    assert plots == atomic_db["plots"].count_documents({}) == rollups.total_plots()
+
+    incremental = snapshot(rollups)
+    rollups.rebuild()
+    assert incremental == snapshot(rollups)
+
+
+def test_ingest_is_the_same_for_one_and_many_workers(tmp_path, atomic_db):
+    path = write_csv(tmp_path / "plots.csv")
+    results = []
+    for workers in (1, 4):
+        for name in ("plots", "plot_rollups", "plot_tiles", "data_versions"):
+            atomic_db[name].drop()
+        rollups = PlotRollups(atomic_db)
+        ingest([path], rollups, batch_size=16, workers=workers, chunk_rows=50)
+        plots = sorted(atomic_db["plots"].find({}, {"_id": 0, "created_at": 0, "updated_at": 0}), key=lambda p: p["ID"])
+        results.append((plots, snapshot(rollups)))
+    assert results[0] == results[1]
+
+
+def test_ensure_built_creates_the_unique_group_index(atomic_db):
+    rollups = PlotRollups(atomic_db)
+    rollups.ensure_built()
+    assert rollups._has_unique_groups()
+
+
+def test_ensure_built_rebuilds_away_duplicate_groups(tmp_path, atomic_db):
+    rollups = PlotRollups(atomic_db)
+    ingest([write_csv(tmp_path / "plots.csv")], rollups, batch_size=16, workers=1, chunk_rows=50)
+    expected = snapshot(rollups)
+
+    # Two racing upserts without the unique index: one group split over two docs
+    atomic_db["plot_rollups"].drop_indexes()
+    doc = atomic_db["plot_rollups"].find_one({"dimension": "all"}, {"_id": 0})
+    atomic_db["plot_rollups"].insert_one({**doc, "count": 1, "sum": {}, "n": {}})
+
+    rollups.ensure_built()
+    assert rollups._has_unique_groups()
+    assert atomic_db["plot_rollups"].count_documents({"dimension": "all"}) == 1
+    assert snapshot(rollups) == expected
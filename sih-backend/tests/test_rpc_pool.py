@@ -0,0 +1,79 @@
+"""PooledHTTPProvider against local stand-in nodes"""
+
+import pytest
+from web3 import Web3
+
+from app.rpc_pool import PooledHTTPProvider, RpcError
+from benchmarks.standin_node import StandInNode
+
+
+def pooled(*nodes, **kwargs):
+    kwargs.setdefault("backoff", 0.001)
+    kwargs.setdefault("breaker_cooldown", 60)
+    provider = PooledHTTPProvider([node.url for node in nodes], **kwargs)
+    return provider, Web3(provider)
+
+
+def reads(w3, n):
+    for _ in range(n):
+        assert w3.eth.block_number == 1
+
+
+def test_reads_route_to_the_fastest_node():
+    slow, fast = StandInNode(latency_ms=30), StandInNode(latency_ms=0)
+    _, w3 = pooled(slow, fast)
+    reads(w3, 2)  # one probe of each
+    slow.reset()
+    fast.reset()
+    reads(w3, 10)
+    assert fast.posts == 10
+    assert slow.posts == 0
+
+
+def test_reads_fail_over_and_breaker_takes_dead_node_out():
+    primary, dead = StandInNode(latency_ms=10), StandInNode()
+    provider, w3 = pooled(primary, dead, breaker_threshold=2)
+    reads(w3, 2)
+    dead.down = True
+    reads(w3, 10)  # every read still answered
+    stats = {s["endpoint"]: s for s in provider.stats()}
+    dead_stats = stats[provider.endpoints[1].label]
+    assert dead_stats["circuit_open"]
+    assert dead_stats["failures"] == 2
+    dead.reset()
+    reads(w3, 5)
+    assert dead.posts == 0
+
+
+def test_rate_limited_node_is_skipped():
+    limited, backup = StandInNode(latency_ms=0, fail_rate=1, status=429), StandInNode(latency_ms=20)
+    _, w3 = pooled(limited, backup)
+    reads(w3, 3)
+    assert backup.calls["eth_blockNumber"] == 3
+
+
+def test_writes_go_to_the_primary():
+    primary, fast = StandInNode(latency_ms=20), StandInNode(latency_ms=0)
+    _, w3 = pooled(primary, fast)
+    reads(w3, 3)
+    w3.eth.send_raw_transaction("0x00")
+    assert primary.calls.get("eth_sendRawTransaction") == 1
+    assert "eth_sendRawTransaction" not in fast.calls
+
+
+def test_failed_write_is_never_resent_to_another_node():
+    primary, other = StandInNode(), StandInNode()
+    _, w3 = pooled(primary, other, retries=3)
+    primary.down = True  # takes the request, then drops the connection
+    with pytest.raises(RpcError):
+        w3.eth.send_raw_transaction("0x00")
+    assert primary.calls.get("eth_sendRawTransaction") == 1
+    assert "eth_sendRawTransaction" not in other.calls
+
+
+def test_rate_limited_write_fails_over():
+    # HTTP 429 means the node refused the request, so it provably never left
+    primary, other = StandInNode(fail_rate=1, status=429), StandInNode()
+    _, w3 = pooled(primary, other)
+    w3.eth.send_raw_transaction("0x00")
+    assert other.calls.get("eth_sendRawTransaction") == 1
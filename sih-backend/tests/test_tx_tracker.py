@@ -0,0 +1,175 @@
+"""ReceiptTracker settlement: claims, retries and balances moved exactly once"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.tx_tracker import ReceiptTracker
+
+TX = "0x" + "11" * 32
+
+
+class FakeClient:
+    def __init__(self):
+        self.receipts = {}
+        self.gas = SimpleNamespace(observe=lambda fn, used: None)
+
+    def mine(self, tx_hash, status=1, block=10):
+        self.receipts[tx_hash] = SimpleNamespace(status=status, blockNumber=block, gasUsed=21000)
+
+    def get_receipts(self, hashes):
+        return {h: self.receipts[h] for h in hashes if h in self.receipts}
+
+    def registered_token_id(self, receipt):
+        return None
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture
+def setup(database):
+    run(database.store_project({"project_id": "P1", "balances": {"total_issued": 0, "total_retired": 0, "circulating": 0}}))
+    client = FakeClient()
+    return database, client
+
+
+def circulating(database):
+    return run(database.get_project("P1"))["balances"]["circulating"]
+
+
+def tx_doc(database):
+    return run(database.get_transaction(TX))
+
+
+def issue(tracker, amount=5):
+    run(tracker.track("credit_issuance", TX, {"project_id": "P1", "amount": amount}))
+
+
+def test_confirmed_issuance_moves_the_balance_once(setup):
+    database, client = setup
+    tracker = ReceiptTracker(client, database)
+    issue(tracker)
+    client.mine(TX)
+    run(tracker.poll_once())
+    run(tracker.poll_once())
+    assert circulating(database) == 5
+    assert tx_doc(database)["status"] == "confirmed"
+    assert tracker.status(TX) is None
+
+
+def test_two_workers_settle_a_tx_once(setup):
+    database, client = setup
+    first, second = ReceiptTracker(client, database), ReceiptTracker(client, database)
+    issue(first)
+    run(second.resume())
+    client.mine(TX)
+
+    async def both():
+        await asyncio.gather(first.poll_once(), second.poll_once())
+
+    run(both())
+    assert circulating(database) == 5
+    assert first.status(TX) is None and second.status(TX) is None
+
+
+def test_failed_balance_update_releases_the_claim_and_retries(setup, monkeypatch):
+    database, client = setup
+    tracker = ReceiptTracker(client, database)
+    issue(tracker)
+    client.mine(TX)
+
+    real = database.update_project_balance
+    calls = []
+
+    async def flaky(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise ConnectionError("primary stepped down")
+        return await real(*args, **kwargs)
+
+    monkeypatch.setattr(database, "update_project_balance", flaky)
+    run(tracker.poll_once())
+    assert circulating(database) == 0
+    assert tx_doc(database)["status"] == "pending"
+
+    # Any worker can retry it now, not just this one
+    other = ReceiptTracker(client, database)
+    run(other.resume())
+    run(other.poll_once())
+    run(tracker.poll_once())
+    assert circulating(database) == 5
+    assert tx_doc(database)["status"] == "confirmed"
+    assert len(calls) == 2
+
+
+def test_failure_after_the_balance_moved_never_reapplies_it(setup, monkeypatch):
+    database, client = setup
+    tracker = ReceiptTracker(client, database)
+    issue(tracker)
+    client.mine(TX)
+
+    real = database.update_transaction_status
+    failures = [ConnectionError("network blip")]
+
+    async def flaky(*args, **kwargs):
+        if failures:
+            raise failures.pop()
+        return await real(*args, **kwargs)
+
+    monkeypatch.setattr(database, "update_transaction_status", flaky)
+    run(tracker.poll_once())
+    assert circulating(database) == 5
+    assert tx_doc(database)["status"] == "settling"
+    assert tx_doc(database)["balance_applied"] is True
+
+    run(tracker.poll_once())
+    assert circulating(database) == 5
+    assert tx_doc(database)["status"] == "confirmed"
+    assert tracker.status(TX) is None
+
+
+def test_resumed_settling_tx_with_applied_balance_is_finished(setup, monkeypatch):
+    database, client = setup
+    crashed = ReceiptTracker(client, database)
+    issue(crashed)
+    client.mine(TX)
+
+    async def crash(*args, **kwargs):
+        raise SystemError("worker killed")
+
+    monkeypatch.setattr(database, "update_transaction_status", crash)
+    run(crashed.poll_once())
+    monkeypatch.undo()
+
+    restarted = ReceiptTracker(client, database)
+    run(restarted.resume())
+    run(restarted.poll_once())
+    assert circulating(database) == 5
+    assert tx_doc(database)["status"] == "confirmed"
+
+
+def test_resumed_settling_tx_of_unknown_progress_is_left_to_the_reconciler(setup):
+    database, client = setup
+    tracker = ReceiptTracker(client, database)
+    issue(tracker)
+    assert run(database.claim_transaction(TX))  # a worker that died before moving anything
+    client.mine(TX)
+
+    restarted = ReceiptTracker(client, database)
+    run(restarted.resume())
+    run(restarted.poll_once())
+    assert circulating(database) == 0
+    assert tx_doc(database)["status"] == "confirmed"
+
+
+def test_failed_tx_moves_no_balance(setup):
+    database, client = setup
+    tracker = ReceiptTracker(client, database)
+    issue(tracker)
+    client.mine(TX, status=0)
+    run(tracker.poll_once())
+    assert circulating(database) == 0
+    assert tx_doc(database)["status"] == "failed"
@@ -1,109 +1,30 @@
 // upsert-plots.js
-import { MongoClient } from "mongodb";
-import fs from "fs";
-import csv from "csv-parser";
-import dotenv from "dotenv";
-
-dotenv.config();
-
-const uri = process.env.MONGO_URI;
-const dbName = process.env.MONGO_DB || "bluecarbon";
-const collectionName = "plots";
-const csvFilePath = "./plots.csv"; // your input file
-
-// Random data source generator
-const randomSource = () => {
-  const sources = ["Sensor", "Drone", "Manual"];
-  return sources[Math.floor(Math.random() * sources.length)];
-};
-
-// Helper: build clean document
-const toDoc = (r) => {
-  // Sanitize Monitoring_Year → strip non-numbers
-  const rawYear = r.Monitoring_Year ? String(r.Monitoring_Year).trim() : "";
-  let year = rawYear ? Number(rawYear.replace(/[^0-9]/g, "")) : null;
-
-  // If year is missing, fallback to Timestamp
-  if (!year && r.Timestamp) {
-    year = new Date(r.Timestamp).getFullYear();
-  }
-
-  // Debug log for each row
-  console.log(`Parsed year for ${r.ID}:`, r.Monitoring_Year, "→", year);
-
-  return {
-    ...r,
-    Data_Source: r.Data_Source && r.Data_Source.trim() !== "" 
-      ? r.Data_Source 
-      : randomSource(),
-    GPS_Lat: parseFloat(r.GPS_Lat),
-    GPS_Long: parseFloat(r.GPS_Long),
-    Tree_Height_m: parseFloat(r.Tree_Height_m),
-    DBH_cm: parseFloat(r.DBH_cm),
-    Biomass_above_kg: parseFloat(r.Biomass_above_kg),
-    Biomass_below_kg: parseFloat(r.Biomass_below_kg),
-    Soil_Organic_Carbon_g_per_kg: parseFloat(r.Soil_Organic_Carbon_g_per_kg),
-    Soil_Salinity_psu: parseFloat(r.Soil_Salinity_psu),
-    Soil_Moisture_percent: parseFloat(r.Soil_Moisture_percent),
-    Soil_pH: parseFloat(r.Soil_pH),
-    Water_Salinity_psu: parseFloat(r.Water_Salinity_psu),
-    Water_Temperature_C: parseFloat(r.Water_Temperature_C),
-    CO2_Flux_mg_m2_day: parseFloat(r.CO2_Flux_mg_m2_day),
-    CH4_Flux_mg_m2_day: parseFloat(r.CH4_Flux_mg_m2_day),
-    NDVI: parseFloat(r.NDVI),
-    Canopy_Cover_percent: parseFloat(r.Canopy_Cover_percent),
-    Plot_Area_ha: parseFloat(r.Plot_Area_ha),
-    Soil_Bulk_Density_g_cm3: parseFloat(r.Soil_Bulk_Density_g_cm3),
-    Soil_Depth_cm: parseFloat(r.Soil_Depth_cm),
-    Monitoring_Year: year,  // ✅ always a number or null
-    Timestamp: r.Timestamp ? new Date(r.Timestamp.replace(" ", "T") + "Z") : null,
-    location: {
-      type: "Point",
-      coordinates: [
-        parseFloat(r.GPS_Long) || 0,
-        parseFloat(r.GPS_Lat) || 0
-      ]
-    },
-    created_at: new Date(),
-    updated_at: new Date()
-  };
-};
-
-async function main() {
-  const client = new MongoClient(uri);
-
-  try {
-    await client.connect();
-    const col = client.db(dbName).collection(collectionName);
-
-    const rows = [];
-    fs.createReadStream(csvFilePath)
-      .pipe(csv())
-      .on("data", (row) => rows.push(row))
-      .on("end", async () => {
-        console.log(`📥 Loaded ${rows.length} rows from CSV`);
-
-        const ops = rows.map((r) => ({
-          updateOne: {
-            filter: { ID: r.ID },
-            update: { $set: toDoc(r) },
-            upsert: true
-          }
-        }));
-
-        const res = await col.bulkWrite(ops, { ordered: false });
-        console.log("✅ Upsert complete:", {
-          upserted: res.upsertedCount,
-          modified: res.modifiedCount,
-          matched: res.matchedCount
-        });
-
-        await client.close();
-      });
-  } catch (e) {
-    console.error("❌ Error:", e);
-    await client.close();
-  }
+//
+// Deprecated: kept so `node upsert-plots.js` still works, but plots are now
+// loaded by the Python ingester, which also keeps plot_rollups, plot_tiles and
+// the data_versions generation (the aggregation cache key) in step. Writing
+// `plots` directly would leave all three stale.
+//
+//   node upsert-plots.js [plots.csv ...]   →   python -m app.ingest plots.csv ...
+//
+// Set PYTHON to pick the interpreter (default: python3).
+import { spawnSync } from "child_process";
+import path from "path";
+import { fileURLToPath } from "url";
+
+const backendDir = path.dirname(fileURLToPath(import.meta.url));
+const files = process.argv.slice(2);
+const csvFiles = files.length ? files.map((f) => path.resolve(f)) : [path.join(backendDir, "plots.csv")];
+const args = ["-m", "app.ingest", ...csvFiles];
+
+console.warn("⚠️  upsert-plots.js is deprecated; running python -m app.ingest instead");
+const result = spawnSync(process.env.PYTHON || "python3", args, {
+  cwd: backendDir,
+  stdio: "inherit",
+});
+
+if (result.error) {
+  console.error("❌ Error:", result.error);
+  process.exit(1);
 }
-
-main();
+process.exit(result.status ?? 1);